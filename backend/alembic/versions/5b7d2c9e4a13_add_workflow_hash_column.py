@@ -0,0 +1,41 @@
+"""add_workflow_hash_column
+
+Revision ID: 5b7d2c9e4a13
+Revises: 722f8f4a675e
+Create Date: 2026-10-17 10:12:41.381204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b7d2c9e4a13'
+down_revision: Union[str, Sequence[str], None] = '722f8f4a675e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add workflow_hash column (result cache key) to generations table."""
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    existing = {c['name'] for c in inspector.get_columns('generations')}
+
+    if 'workflow_hash' not in existing:
+        op.add_column(
+            'generations',
+            sa.Column('workflow_hash', sa.String(64), nullable=True)
+        )
+
+    indexes = {i['name'] for i in inspector.get_indexes('generations')}
+    if 'ix_generations_workflow_hash' not in indexes:
+        op.create_index('ix_generations_workflow_hash', 'generations', ['workflow_hash'])
+
+
+def downgrade() -> None:
+    """Remove workflow_hash column from generations table."""
+    op.drop_index('ix_generations_workflow_hash', table_name='generations')
+    op.drop_column('generations', 'workflow_hash')
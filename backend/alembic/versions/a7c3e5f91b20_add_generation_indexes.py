@@ -0,0 +1,49 @@
+"""add_generation_indexes
+
+Revision ID: a7c3e5f91b20
+Revises: f1b6c2d8a904
+Create Date: 2026-10-17 16:05:12.407731
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c3e5f91b20'
+down_revision: Union[str, Sequence[str], None] = 'f1b6c2d8a904'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = {
+    'ix_generations_created': ['created_at', 'id'],
+    'ix_generations_portfolio_created': ['portfolio_id', 'created_at', 'id'],
+    'ix_generations_portfolio_type_status': [
+        'portfolio_id', 'generation_type', 'status', 'created_at',
+    ],
+    'ix_generations_source': ['source_generation_id'],
+}
+
+
+def upgrade() -> None:
+    """Index generations for listing, per-portfolio type/status and source lookups."""
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    existing = {i['name'] for i in inspector.get_indexes('generations')}
+
+    for name, columns in INDEXES.items():
+        if name not in existing:
+            op.create_index(name, 'generations', columns)
+
+
+def downgrade() -> None:
+    """Drop the generation indexes."""
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    existing = {i['name'] for i in inspector.get_indexes('generations')}
+
+    for name in reversed(list(INDEXES)):
+        if name in existing:
+            op.drop_index(name, 'generations')
@@ -0,0 +1,36 @@
+"""add_batch_index_column
+
+Revision ID: c3e81f0b6d27
+Revises: 5b7d2c9e4a13
+Create Date: 2026-10-17 11:02:17.540912
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3e81f0b6d27'
+down_revision: Union[str, Sequence[str], None] = '5b7d2c9e4a13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add batch_index column (position within a batched render) to generations table."""
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    existing = {c['name'] for c in inspector.get_columns('generations')}
+
+    if 'batch_index' not in existing:
+        op.add_column(
+            'generations',
+            sa.Column('batch_index', sa.Integer(), nullable=True)
+        )
+
+
+def downgrade() -> None:
+    """Remove batch_index column from generations table."""
+    op.drop_column('generations', 'batch_index')
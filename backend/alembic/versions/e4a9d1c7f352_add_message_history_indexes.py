@@ -0,0 +1,49 @@
+"""add_message_history_indexes
+
+Revision ID: e4a9d1c7f352
+Revises: c3e81f0b6d27
+Create Date: 2026-10-17 14:20:41.118305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a9d1c7f352'
+down_revision: Union[str, Sequence[str], None] = 'c3e81f0b6d27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Index messages for keyset reads of recent and system messages."""
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    existing = {i['name'] for i in inspector.get_indexes('messages')}
+
+    if 'ix_messages_conversation_created' not in existing:
+        op.create_index(
+            'ix_messages_conversation_created',
+            'messages',
+            ['conversation_id', 'created_at', 'id'],
+        )
+    if 'ix_messages_conversation_role' not in existing:
+        op.create_index(
+            'ix_messages_conversation_role',
+            'messages',
+            ['conversation_id', 'role', 'created_at', 'id'],
+        )
+
+
+def downgrade() -> None:
+    """Drop the message history indexes."""
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    existing = {i['name'] for i in inspector.get_indexes('messages')}
+
+    for name in ('ix_messages_conversation_role', 'ix_messages_conversation_created'):
+        if name in existing:
+            op.drop_index(name, 'messages')
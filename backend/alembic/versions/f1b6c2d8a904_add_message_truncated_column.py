@@ -0,0 +1,36 @@
+"""add_message_truncated_column
+
+Revision ID: f1b6c2d8a904
+Revises: e4a9d1c7f352
+Create Date: 2026-10-17 15:05:12.304877
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1b6c2d8a904'
+down_revision: Union[str, Sequence[str], None] = 'e4a9d1c7f352'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add truncated column (reply cut short mid-stream) to messages table."""
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    existing = {c['name'] for c in inspector.get_columns('messages')}
+
+    if 'truncated' not in existing:
+        op.add_column(
+            'messages',
+            sa.Column('truncated', sa.Boolean(), nullable=False, server_default=sa.false())
+        )
+
+
+def downgrade() -> None:
+    """Remove truncated column from messages table."""
+    op.drop_column('messages', 'truncated')
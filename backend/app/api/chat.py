@@ -2,7 +2,9 @@ from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List
+import asyncio
 import json
+import logging
 
 from app.database import get_db
 from app.schemas.chat import (
@@ -15,10 +17,13 @@ from app.schemas.chat import (
     SwitchModelRequest,
 )
 from app.services.chat_service import ChatService
+from app.services.message_writer import StreamingMessageWriter
 from app.services.ollama_manager import ollama_manager
 from app.services.ollama_client import ollama_client
 from app.models.chat import MessageRole
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 
@@ -137,9 +142,9 @@ async def chat(
     """Stream a chat response using SSE."""
     service = ChatService(db)
 
-    # Verify conversation exists
-    conversation = service.get_conversation(conversation_id)
-    if not conversation:
+    # Verify conversation exists (without loading its history)
+    model = service.get_conversation_model(conversation_id)
+    if not model:
         raise HTTPException(status_code=404, detail="Conversation not found")
 
     # Check if Ollama is ready
@@ -149,33 +154,47 @@ async def chat(
     # Add user message
     service.add_message(conversation_id, MessageRole.USER, data.message)
 
-    # Get all messages for context
-    messages = service.get_messages_for_api(conversation_id)
+    # Recent history that fits the model's context budget
+    messages = service.get_messages_for_api(conversation_id, model)
 
     async def generate():
-        full_response = ""
+        writer = StreamingMessageWriter(conversation_id)
+        timings = []
+        finished = False
         try:
+            # The reply is saved as it streams (see StreamingMessageWriter)
             async for chunk in ollama_client.chat_stream(
-                model=conversation.model,
+                model=model,
                 messages=messages,
+                on_timings=timings.append,
             ):
-                full_response += chunk
+                if writer.message_id is None:
+                    # Created on the first token, so a request that fails
+                    # before any output leaves no empty reply behind
+                    await writer.start()
+                writer.append(chunk)
                 yield f"data: {json.dumps({'content': chunk, 'done': False})}\n\n"
 
-            # Save assistant response to database
-            from app.database import SessionLocal
+            await writer.finish()
+            finished = True
 
-            with SessionLocal() as new_db:
-                new_service = ChatService(new_db)
-                new_service.add_message(
-                    conversation_id, MessageRole.ASSISTANT, full_response
-                )
-
-            yield f"data: {json.dumps({'content': '', 'done': True})}\n\n"
+            done = {"content": "", "done": True}
+            if timings:
+                done["timings"] = timings[0].to_dict()
+                logger.info(f"Chat turn {conversation_id}: {done['timings']}")
+            yield f"data: {json.dumps(done)}\n\n"
 
         except Exception as e:
+            # Ollama may be down or have dropped the model; recheck next time
+            ollama_manager.invalidate_inventory()
             yield f"data: {json.dumps({'error': str(e), 'done': True})}\n\n"
 
+        finally:
+            if not finished and writer.message_id is not None:
+                # Stream failed or the client went away: keep the partial
+                # reply. Shielded so it's written even if we're cancelled.
+                await asyncio.shield(writer.finish(truncated=True))
+
     return StreamingResponse(
         generate(),
         media_type="text/event-stream",
@@ -1,5 +1,6 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Header, Query
 from sse_starlette.sse import EventSourceResponse
+from typing import List, Optional
 import asyncio
 
 from app.services.event_bus import event_bus
@@ -8,12 +9,27 @@ router = APIRouter()
 
 
 @router.get("/events/stream")
-async def event_stream():
-    """SSE endpoint for real-time event updates."""
+async def event_stream(
+    portfolio_id: Optional[List[str]] = Query(None),
+    generation_id: Optional[List[str]] = Query(None),
+    event_type: Optional[List[str]] = Query(None, alias="type"),
+    last_event_id: Optional[str] = Header(None),
+):
+    """SSE endpoint for real-time event updates.
+
+    Repeatable ``portfolio_id``, ``generation_id`` and ``type`` query
+    parameters restrict the stream to matching events. Browsers send
+    ``Last-Event-ID`` when they reconnect; the events missed in between are
+    replayed (or ``resync`` is sent if they're no longer buffered).
+    """
 
     async def generate():
-        queue = asyncio.Queue()
-        subscriber_id = event_bus.subscribe(queue)
+        subscription = event_bus.subscribe(
+            event_types=event_type,
+            portfolio_ids=portfolio_id,
+            generation_ids=generation_id,
+            last_event_id=last_event_id,
+        )
 
         try:
             # Send initial connection event
@@ -21,15 +37,24 @@ async def event_stream():
 
             while True:
                 try:
-                    event = await asyncio.wait_for(queue.get(), timeout=30.0)
-                    yield {
+                    event = await asyncio.wait_for(subscription.get(), timeout=30.0)
+                    message = {
                         "event": event["type"],
                         "data": event["data"],
                     }
+                    if event.get("id"):
+                        message["id"] = event["id"]
+                    yield message
                 except asyncio.TimeoutError:
                     # Send keepalive
                     yield {"event": "ping", "data": "{}"}
         finally:
-            event_bus.unsubscribe(subscriber_id)
+            event_bus.unsubscribe(subscription.id)
 
     return EventSourceResponse(generate())
+
+
+@router.get("/events/stats")
+async def event_stats():
+    """Subscriber lag and dropped/coalesced event counts."""
+    return event_bus.stats()
@@ -1,9 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
+from app.config import settings
 from app.database import get_db
-from app.schemas.generation import GenerationCreate, GenerationResponse
+from app.models.generation import GenerationStatus
+from app.schemas.generation import (
+    GenerationCounts,
+    GenerationCreate,
+    GenerationNeighbors,
+    GenerationPage,
+    GenerationResponse,
+)
 from app.services.generation_service import GenerationService
 
 router = APIRouter()
@@ -13,13 +22,61 @@ def get_generation_service(db: Session = Depends(get_db)) -> GenerationService:
     return GenerationService(db)
 
 
-@router.get("/generations", response_model=List[GenerationResponse])
+@router.get("/generations", response_model=GenerationPage)
 async def list_generations(
     portfolio_id: Optional[str] = None,
+    status: Optional[List[GenerationStatus]] = Query(None),
+    generation_type: Optional[List[str]] = Query(None),
+    model: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    source_generation_id: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    service: GenerationService = Depends(get_generation_service),
+):
+    """List generations newest first, a page at a time.
+
+    ``status`` and ``generation_type`` may be repeated. Pass the returned
+    ``next_cursor`` as ``cursor`` to get the following page.
+    """
+    try:
+        return service.list_page(
+            portfolio_id=portfolio_id,
+            statuses=status,
+            generation_types=generation_type,
+            model=model,
+            created_after=created_after,
+            created_before=created_before,
+            source_generation_id=source_generation_id,
+            cursor=cursor,
+            limit=limit,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/generations/counts", response_model=GenerationCounts)
+async def count_generations(
+    portfolio_id: Optional[str] = None,
+    status: Optional[List[GenerationStatus]] = Query(None),
+    generation_type: Optional[List[str]] = Query(None),
+    model: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    source_generation_id: Optional[str] = None,
     service: GenerationService = Depends(get_generation_service),
 ):
-    """List generations, optionally filtered by portfolio."""
-    return service.list_all(portfolio_id=portfolio_id)
+    """Count the generations ``GET /generations`` would list, per status."""
+    return service.count(
+        portfolio_id=portfolio_id,
+        statuses=status,
+        generation_types=generation_type,
+        model=model,
+        created_after=created_after,
+        created_before=created_before,
+        source_generation_id=source_generation_id,
+    )
 
 
 @router.post("/generations", response_model=GenerationResponse, status_code=201)
@@ -27,7 +84,19 @@ async def create_generation(
     data: GenerationCreate,
     service: GenerationService = Depends(get_generation_service),
 ):
-    """Create a new image generation job. If quantity > 1, creates multiple jobs."""
+    """Create a new image generation job. If quantity > 1, creates multiple jobs.
+
+    Multiple txt2img images are rendered as batched ComfyUI prompts when
+    batching is enabled (``generation_max_batch_size`` > 1).
+    """
+    if (
+        data.quantity > 1
+        and data.generation_type == "txt2img"
+        and settings.generation_max_batch_size > 1
+    ):
+        generations = await service.create_batch(data)
+        return generations[0]
+
     first_generation = None
     for i in range(data.quantity):
         # Create a copy of data with seed=None for variations after the first
@@ -54,6 +123,22 @@ async def get_generation(
     return generation
 
 
+@router.get("/generations/{generation_id}/neighbors", response_model=GenerationNeighbors)
+async def get_generation_neighbors(
+    generation_id: str,
+    status: Optional[List[GenerationStatus]] = Query(None),
+    service: GenerationService = Depends(get_generation_service),
+):
+    """Get the generations either side of one in its portfolio, newest first.
+
+    ``status`` (repeatable) limits the neighbours to those statuses.
+    """
+    neighbors = service.neighbors(generation_id, statuses=status)
+    if not neighbors:
+        raise HTTPException(status_code=404, detail="Generation not found")
+    return neighbors
+
+
 @router.delete("/generations/{generation_id}", status_code=204)
 async def delete_generation(
     generation_id: str,
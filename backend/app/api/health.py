@@ -1,7 +1,7 @@
 from fastapi import APIRouter
-import httpx
 
 from app.config import settings
+from app.services.http_pool import get_http_client
 
 router = APIRouter()
 
@@ -12,12 +12,12 @@ async def health_check():
     comfyui_status = "unknown"
 
     try:
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            response = await client.get(f"{settings.comfyui_url}/system_stats")
-            if response.status_code == 200:
-                comfyui_status = "healthy"
-            else:
-                comfyui_status = "unhealthy"
+        client = get_http_client()
+        response = await client.get(f"{settings.comfyui_url}/system_stats", timeout=5.0)
+        if response.status_code == 200:
+            comfyui_status = "healthy"
+        else:
+            comfyui_status = "unhealthy"
     except Exception:
         comfyui_status = "unreachable"
 
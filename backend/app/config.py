@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import List
+from typing import Dict, List
 
 
 class Settings(BaseSettings):
@@ -8,8 +8,79 @@ class Settings(BaseSettings):
     # Database
     database_url: str = "sqlite:///./data/folio.db"
 
+    # SQLite pragmas set on every connection. WAL lets API reads proceed
+    # while job workers commit; synchronous=normal is durable against app
+    # crashes in WAL mode (only an OS crash can lose the last commits);
+    # busy_timeout makes a second writer wait instead of failing with
+    # "database is locked". Cache size is in KiB, mmap size in bytes.
+    sqlite_journal_mode: str = "wal"
+    sqlite_synchronous: str = "normal"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_cache_size_kb: int = 65536
+    sqlite_mmap_size: int = 268435456
+
+    # Pooled connections (WAL readers don't block each other, so size this
+    # for API requests plus blocking_pool_size job threads)
+    database_pool_size: int = 10
+    database_max_overflow: int = 10
+
     # ComfyUI
     comfyui_url: str = "http://localhost:8188"
+    # Optional pool of ComfyUI backends, one queue worker per URL.
+    # When empty, comfyui_url is used as the only backend.
+    comfyui_urls: List[str] = []
+    # Detect job completion via the ComfyUI websocket instead of polling history
+    comfyui_use_websocket: bool = True
+    comfyui_ws_reconnect_delay: float = 2.0
+    comfyui_ws_recheck_interval: float = 5.0
+
+    # Reuse completed renders of identical workflows instead of re-rendering
+    result_cache_enabled: bool = True
+
+    # Render quantity > 1 txt2img requests as batched ComfyUI prompts, at most
+    # this many images per prompt (bounded by VRAM). 1 disables batching.
+    generation_max_batch_size: int = 4
+
+    # Generations per /api/generations page: default and maximum ``limit``
+    generation_page_size: int = 100
+    generation_page_size_max: int = 500
+
+    # Job queue WAL durability: "strict" (fsync per op), "group" (concurrent
+    # ops share one fsync) or "periodic" (fsync on a timer)
+    queue_wal_durability: str = "group"
+    queue_wal_group_window_ms: float = 0.0
+    queue_wal_sync_interval_ms: float = 1000.0
+    # Compact queue.log into a snapshot after this many ops or bytes (0 disables)
+    queue_compact_after_ops: int = 10_000
+    queue_compact_after_bytes: int = 8 * 1024 * 1024
+    # Share each priority level fairly between portfolios instead of strict
+    # FIFO, optionally weighted per portfolio ID (default weight 1.0)
+    queue_fair_share: bool = False
+    queue_tenant_weights: Dict[str, float] = {}
+    # Interrupt running lower-priority jobs when higher-priority work waits
+    queue_preemption_enabled: bool = True
+    queue_preempt_check_interval_ms: float = 250.0
+    # Queue workers per ComfyUI backend: 2 prepares/finalizes the next job
+    # while the current one renders (1 disables the overlap). Jobs whose
+    # finalize stage (downloads, thumbnails, DB writes) may run at once.
+    queue_pipeline_depth: int = 2
+    queue_finalize_concurrency: int = 4
+
+    # Threads for blocking DB/file/image work done by job processors
+    blocking_pool_size: int = 4
+
+    # Concurrent SVD frame downloads per animation job
+    animation_frame_download_concurrency: int = 8
+
+    # Minimum interval between generation progress writes/events
+    progress_update_interval_ms: int = 500
+
+    # Pending SSE events per subscriber before progress events are dropped
+    # (and, past that, the subscriber is told to resync)
+    event_queue_size: int = 256
+
+    # Recent events kept for replay to clients reconnecting with Last-Event-ID
+    event_history_size: int = 1024
 
     # Storage
     storage_path: str = "./storage"
@@ -24,6 +95,34 @@ class Settings(BaseSettings):
     ollama_host: str = "localhost"
     ollama_port: int = 11434
     default_model: str = "llama3.2:1b"
+    # Chat history sent per turn: context window in tokens (per-model
+    # overrides by name; also sent to Ollama as num_ctx), minus room
+    # reserved for the reply. Older turns that don't fit are dropped, down
+    # to chat_context_trim_to of the budget so the prompt prefix then stays
+    # stable (KV cache reuse) for the next several turns.
+    chat_context_tokens: int = 4096
+    chat_context_model_tokens: Dict[str, int] = {}
+    chat_reply_reserve_tokens: int = 1024
+    chat_context_trim_to: float = 0.5
+    chat_context_page_size: int = 32
+    # Minimum interval between saves of a streaming assistant reply
+    chat_checkpoint_interval_ms: int = 1000
+    # Chat through Ollama's native /api/chat (keep_alive, num_ctx, per-turn
+    # timings) instead of the OpenAI-compatible /v1/chat/completions
+    ollama_native_chat: bool = False
+    # How long Ollama keeps the chat model loaded after a request
+    ollama_keep_alive: str = "30m"
+    # Seconds a cached Ollama model list is trusted before a background refresh
+    ollama_inventory_ttl: float = 10.0
+
+    # Shared keep-alive HTTP pool for Ollama and health checks. HTTP/2 needs
+    # the optional h2 package (pip install httpx[http2]).
+    http_pool_max_connections: int = 20
+    http_pool_max_keepalive: int = 10
+    http_pool_keepalive_expiry: float = 30.0
+    http_pool_connect_timeout: float = 5.0
+    http_pool_timeout: float = 30.0
+    http_pool_http2: bool = False
 
     # Testing
     testing: bool = False
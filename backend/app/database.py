@@ -1,5 +1,6 @@
 from contextlib import contextmanager
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 from app.config import settings
 
@@ -8,9 +9,54 @@ class Base(DeclarativeBase):
     pass
 
 
-# SQLite with check_same_thread=False for async compatibility
-connect_args = {"check_same_thread": False} if settings.database_url.startswith("sqlite") else {}
-engine = create_engine(settings.database_url, connect_args=connect_args)
+def sqlite_pragmas() -> dict:
+    """PRAGMAs applied to each new SQLite connection, from settings."""
+    return {
+        "journal_mode": settings.sqlite_journal_mode,
+        "synchronous": settings.sqlite_synchronous,
+        "busy_timeout": settings.sqlite_busy_timeout_ms,
+        # Negative: size in KiB rather than pages
+        "cache_size": -settings.sqlite_cache_size_kb,
+        "mmap_size": settings.sqlite_mmap_size,
+    }
+
+
+def create_db_engine(url: str) -> Engine:
+    """Create the engine, tuning SQLite connections for concurrent readers."""
+    if not url.startswith("sqlite"):
+        return create_engine(url)
+
+    pool_args = {}
+    if make_url(url).database not in (None, "", ":memory:"):
+        # In-memory databases get SQLAlchemy's single-connection pool
+        pool_args = {
+            "pool_size": settings.database_pool_size,
+            "max_overflow": settings.database_max_overflow,
+        }
+    engine = create_engine(
+        url,
+        # Sessions are used from worker threads (run_blocking)
+        connect_args={
+            "check_same_thread": False,
+            "timeout": settings.sqlite_busy_timeout_ms / 1000,
+        },
+        **pool_args,
+    )
+    pragmas = sqlite_pragmas()
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+    return engine
+
+
+engine = create_db_engine(settings.database_url)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
@@ -10,10 +10,14 @@ from fastapi.middleware.cors import CORSMiddleware
 from app.config import settings
 from app.database import SessionLocal
 from app.api import portfolios, generations, images, events, health, models, workflows, chat
+from app.services.blocking import shutdown_executor
+from app.services.http_pool import close_http_client
 from app.services.builtin_workflows import seed_builtin_workflows
 from app.services.job_queue import init_job_queue, JobType, Job
-from app.services.generation_service import process_generation_job
-from app.services.animation_processor import process_animation_job
+from app.services.comfyui_client import comfyui_clients, get_comfyui_client
+from app.services.generation_service import generation_job_stages
+from app.services.animation_processor import animation_job_stages
+from app.services.preemption import interrupt_job
 
 logger = logging.getLogger(__name__)
 
@@ -47,12 +51,22 @@ def run_migrations():
         command.upgrade(alembic_cfg, "head")
 
 
-async def process_job(job: Job):
-    """Route jobs to appropriate processor based on job type."""
+def process_job(job: Job, worker_id: int = 0):
+    """Route jobs to appropriate processor based on job type.
+
+    Each queue worker uses one ComfyUI backend, selected by worker ID.
+    Returns the job's stages; the queue finalizes it in the background
+    once its ComfyUI work is done.
+    """
+    client = get_comfyui_client(worker_id)
     if job.job_type == JobType.ANIMATION:
-        await process_animation_job(job)
-    else:
-        await process_generation_job(job)
+        return animation_job_stages(job, client)
+    return generation_job_stages(job, client)
+
+
+async def preempt_job(job: Job, worker_id: int = 0):
+    """Stop a preempted job on its worker's ComfyUI backend."""
+    await interrupt_job(job, get_comfyui_client(worker_id))
 
 
 @asynccontextmanager
@@ -70,16 +84,38 @@ async def lifespan(app: FastAPI):
     finally:
         db.close()
 
-    # Initialize and start job queue worker
+    # Initialize and start job queue workers (queue_pipeline_depth per ComfyUI backend)
     storage_path = Path(settings.storage_path)
-    job_queue = init_job_queue(storage_path)
+    job_queue = init_job_queue(
+        storage_path,
+        durability=settings.queue_wal_durability,
+        group_window_ms=settings.queue_wal_group_window_ms,
+        sync_interval_ms=settings.queue_wal_sync_interval_ms,
+        compact_after_ops=settings.queue_compact_after_ops,
+        compact_after_bytes=settings.queue_compact_after_bytes,
+        fair_share=settings.queue_fair_share,
+        tenant_weights=settings.queue_tenant_weights,
+        preempt_check_interval_ms=settings.queue_preempt_check_interval_ms,
+        finalize_concurrency=settings.queue_finalize_concurrency,
+    )
     job_queue.set_processor(process_job)
-    await job_queue.start_worker()
+    if settings.queue_preemption_enabled:
+        job_queue.set_preempt_handler(preempt_job)
+    await job_queue.start_worker(
+        num_workers=len(comfyui_clients) * max(1, settings.queue_pipeline_depth),
+        num_backends=len(comfyui_clients),
+    )
 
     yield
 
-    # Shutdown: stop job queue worker
+    # Shutdown: stop job queue workers
     await job_queue.stop_worker()
+    await job_queue.close()
+    # Stop websocket listeners and close each backend's HTTP client
+    for client in comfyui_clients:
+        await client.close()
+    await close_http_client()
+    shutdown_executor()
 
 
 app = FastAPI(
@@ -1,6 +1,9 @@
-from sqlalchemy import Column, String, Text, DateTime, ForeignKey, Enum as SQLEnum
-from sqlalchemy.orm import relationship
+from sqlalchemy import (
+    Column, String, Text, DateTime, Boolean, ForeignKey, Index, Enum as SQLEnum, func,
+)
+from sqlalchemy.orm import object_session, relationship
 from datetime import datetime
+from typing import Optional
 import uuid
 import enum
 
@@ -29,19 +32,42 @@ class Conversation(Base):
         order_by="Message.created_at",
     )
 
-    def to_dict(self):
+    def count_messages(self) -> int:
+        """Count this conversation's messages without loading them."""
+        session = object_session(self)
+        if session is None:
+            return 0
+        return session.query(func.count(Message.id)).filter(
+            Message.conversation_id == self.id
+        ).scalar()
+
+    def to_dict(self, message_count: Optional[int] = None):
+        """Serialize the conversation.
+
+        Listings pass ``message_count`` in (see
+        ``ChatService.list_conversations``); otherwise it is counted with
+        one query.
+        """
+        if message_count is None:
+            message_count = self.count_messages()
         return {
             "id": self.id,
             "title": self.title,
             "model": self.model,
             "created_at": self.created_at.isoformat() if self.created_at else None,
             "updated_at": self.updated_at.isoformat() if self.updated_at else None,
-            "message_count": len(self.messages) if self.messages else 0,
+            "message_count": message_count,
         }
 
 
 class Message(Base):
     __tablename__ = "messages"
+    __table_args__ = (
+        # Keyset reads of a conversation's most recent messages, and of its
+        # system messages without scanning the rest of the history
+        Index("ix_messages_conversation_created", "conversation_id", "created_at", "id"),
+        Index("ix_messages_conversation_role", "conversation_id", "role", "created_at", "id"),
+    )
 
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     conversation_id = Column(
@@ -49,6 +75,8 @@ class Message(Base):
     )
     role = Column(SQLEnum(MessageRole), nullable=False)
     content = Column(Text, nullable=False)
+    # Streamed reply that was cut short (or is still streaming)
+    truncated = Column(Boolean, nullable=False, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     conversation = relationship("Conversation", back_populates="messages")
@@ -59,5 +87,6 @@ class Message(Base):
             "conversation_id": self.conversation_id,
             "role": self.role.value,
             "content": self.content,
+            "truncated": bool(self.truncated),
             "created_at": self.created_at.isoformat() if self.created_at else None,
         }
@@ -1,4 +1,6 @@
-from sqlalchemy import Column, String, Text, Integer, Float, DateTime, ForeignKey, Enum as SQLEnum
+from sqlalchemy import (
+    Column, String, Text, Integer, Float, DateTime, ForeignKey, Index, Enum as SQLEnum,
+)
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import uuid
@@ -24,6 +26,19 @@ class GenerationType(str, enum.Enum):
 
 class Generation(Base):
     __tablename__ = "generations"
+    __table_args__ = (
+        # Newest-first listings, overall and per portfolio (``id`` breaks
+        # ties for keyset paging)
+        Index("ix_generations_created", "created_at", "id"),
+        Index("ix_generations_portfolio_created", "portfolio_id", "created_at", "id"),
+        # Per-portfolio lookups by type and status (animations, auto-animate)
+        Index(
+            "ix_generations_portfolio_type_status",
+            "portfolio_id", "generation_type", "status", "created_at",
+        ),
+        # Finding a source image's animations / edits
+        Index("ix_generations_source", "source_generation_id"),
+    )
 
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     portfolio_id = Column(String(36), ForeignKey("portfolios.id"), nullable=False)
@@ -37,6 +52,9 @@ class Generation(Base):
     width = Column(Integer, default=1024)
     height = Column(Integer, default=1024)
     seed = Column(Integer, nullable=True)
+    # Position in a batched render: the image is latent ``batch_index`` of a
+    # batch sampled with ``seed`` (None for single renders)
+    batch_index = Column(Integer, nullable=True)
     steps = Column(Integer, default=30)
     cfg_scale = Column(Float, default=5.5)
     sampler = Column(String(50), default="dpmpp_2m")
@@ -88,6 +106,9 @@ class Generation(Base):
     # ComfyUI tracking
     comfyui_prompt_id = Column(String(100), nullable=True)
 
+    # Canonical hash of the prepared workflow (result cache key)
+    workflow_hash = Column(String(64), nullable=True, index=True)
+
     # Timestamps
     created_at = Column(DateTime, default=datetime.utcnow)
     completed_at = Column(DateTime, nullable=True)
@@ -111,6 +132,7 @@ class Generation(Base):
             "width": self.width,
             "height": self.height,
             "seed": self.seed,
+            "batch_index": self.batch_index,
             "steps": self.steps,
             "cfg_scale": self.cfg_scale,
             "sampler": self.sampler,
@@ -1,6 +1,7 @@
-from sqlalchemy import Column, String, Text, DateTime
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, Text, DateTime, func
+from sqlalchemy.orm import object_session, relationship
 from datetime import datetime
+from typing import Optional
 import uuid
 
 from app.database import Base
@@ -21,7 +22,25 @@ class Portfolio(Base):
         "Generation", back_populates="portfolio", cascade="all, delete-orphan"
     )
 
-    def to_dict(self):
+    def count_images(self) -> int:
+        """Count this portfolio's generations without loading them."""
+        from app.models.generation import Generation
+
+        session = object_session(self)
+        if session is None:
+            return 0
+        return session.query(func.count(Generation.id)).filter(
+            Generation.portfolio_id == self.id
+        ).scalar()
+
+    def to_dict(self, image_count: Optional[int] = None):
+        """Serialize the portfolio.
+
+        Listings pass ``image_count`` in (see ``PortfolioService.list_all``);
+        otherwise it is counted with one query.
+        """
+        if image_count is None:
+            image_count = self.count_images()
         return {
             "id": self.id,
             "name": self.name,
@@ -29,5 +48,5 @@ class Portfolio(Base):
             "cover_image_id": self.cover_image_id,
             "created_at": self.created_at.isoformat() if self.created_at else None,
             "updated_at": self.updated_at.isoformat() if self.updated_at else None,
-            "image_count": len(self.generations) if self.generations else 0,
+            "image_count": image_count,
         }
@@ -10,6 +10,7 @@ class MessageResponse(BaseModel):
     conversation_id: str
     role: Literal["user", "assistant", "system"]
     content: str
+    truncated: bool = False
     created_at: datetime
 
 
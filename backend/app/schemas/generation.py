@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, Literal
+from typing import Dict, List, Optional, Literal
 from datetime import datetime
 
 
@@ -53,6 +53,7 @@ class GenerationResponse(BaseModel):
     width: int
     height: int
     seed: Optional[int]
+    batch_index: Optional[int] = None
     steps: int
     cfg_scale: float
     sampler: str
@@ -92,3 +93,21 @@ class GenerationResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class GenerationPage(BaseModel):
+    items: List[GenerationResponse]
+    # Pass as ``cursor`` to fetch the next page; None on the last page
+    next_cursor: Optional[str] = None
+
+
+class GenerationCounts(BaseModel):
+    total: int
+    # Matching generations per status; statuses with none are left out
+    by_status: Dict[str, int]
+
+
+class GenerationNeighbors(BaseModel):
+    # Adjacent generations in listing order (newest first) in the portfolio
+    previous: Optional[GenerationResponse] = None
+    next: Optional[GenerationResponse] = None
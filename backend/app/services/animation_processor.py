@@ -1,18 +1,33 @@
 """Animation processing service for SVD animations."""
+import asyncio
+import io
 import json
-import shutil
-import subprocess
 from datetime import datetime
 from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 
 from PIL import Image
+from sqlalchemy.orm import Session
 
 from app.config import settings
 from app.database import get_db_session
 from app.models.generation import Generation, GenerationStatus
-from app.services.comfyui_client import comfyui_client
+from app.services.blocking import run_blocking
+from app.services.comfyui_client import ComfyUIClient, comfyui_client
 from app.services.event_bus import event_bus
 from app.services.job_queue import Job
+from app.services.progress import ProgressReporter
+
+
+def _get_generation(db: Session, generation_id: Optional[str]) -> Optional[Generation]:
+    """Load a generation by ID (blocking)."""
+    return db.query(Generation).filter(Generation.id == generation_id).first()
+
+
+def _image_size(image_data: bytes) -> Tuple[int, int]:
+    """Read image dimensions from encoded bytes (blocking)."""
+    with Image.open(io.BytesIO(image_data)) as img:
+        return img.size
 
 
 class AnimationProcessor:
@@ -77,70 +92,86 @@ class AnimationProcessor:
 
         return workflow
 
-    def _create_video_from_frames(
-        self, generation_id: str, frames_dir: Path, fps: int
-    ) -> Path:
-        """Combine frames into video using ffmpeg."""
+    def _video_path(self, generation_id: str) -> Path:
+        """Destination path for an animation video, creating its directory."""
         now = datetime.utcnow()
         dir_path = self.storage_path / "animations" / str(now.year) / f"{now.month:02d}"
         dir_path.mkdir(parents=True, exist_ok=True)
+        return dir_path / f"{generation_id}.mp4"
 
-        video_path = dir_path / f"{generation_id}.mp4"
-
+    async def _create_video_from_stream(
+        self, generation_id: str, frames: AsyncIterator[bytes], fps: int
+    ) -> Path:
+        """Encode frames into a video by piping them into ffmpeg's stdin.
+
+        Frames are written as they arrive (``image2pipe``), so encoding
+        overlaps with downloading and nothing is staged on disk.
+        """
+        video_path = await run_blocking(self._video_path, generation_id)
+
+        process = await asyncio.create_subprocess_exec(
+            "ffmpeg",
+            "-y",
+            "-f",
+            "image2pipe",
+            "-framerate",
+            str(fps),
+            "-i",
+            "-",
+            "-c:v",
+            "libx264",
+            "-pix_fmt",
+            "yuv420p",
+            "-crf",
+            "18",
+            str(video_path),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        # Drain stderr concurrently so ffmpeg never blocks on a full pipe
+        stderr_task = asyncio.create_task(process.stderr.read())
+
+        pipe_error: Optional[OSError] = None
         try:
-            subprocess.run(
-                [
-                    "ffmpeg",
-                    "-y",
-                    "-framerate",
-                    str(fps),
-                    "-i",
-                    str(frames_dir / "frame_%05d.png"),
-                    "-c:v",
-                    "libx264",
-                    "-pix_fmt",
-                    "yuv420p",
-                    "-crf",
-                    "18",
-                    str(video_path),
-                ],
-                capture_output=True,
-                check=True,
-            )
-        except subprocess.CalledProcessError as e:
-            raise RuntimeError(f"Failed to create video: {e.stderr.decode()}")
+            try:
+                async for frame in frames:
+                    process.stdin.write(frame)
+                    await process.stdin.drain()
+                process.stdin.close()
+            except (BrokenPipeError, ConnectionResetError) as e:
+                # ffmpeg exited early; its stderr explains why
+                pipe_error = e
+            await process.wait()
+        except BaseException:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            stderr_task.cancel()
+            await run_blocking(video_path.unlink, missing_ok=True)
+            raise
+
+        stderr = await stderr_task
+        if pipe_error is not None or process.returncode != 0:
+            await run_blocking(video_path.unlink, missing_ok=True)
+            raise RuntimeError(
+                f"Failed to create video: {stderr.decode(errors='replace')}"
+            ) from pipe_error
 
         return video_path.relative_to(self.storage_path)
 
-    def _create_video_thumbnail(self, generation_id: str, video_path: Path) -> Path:
-        """Extract first frame as thumbnail using ffmpeg."""
-        full_video_path = self.storage_path / video_path
+    def _create_thumbnail_from_frame(self, generation_id: str, frame: Optional[bytes]) -> Path:
+        """Create the video thumbnail from its first frame (blocking)."""
         thumb_dir = self.storage_path / "images"
         thumb_dir.mkdir(parents=True, exist_ok=True)
 
         thumb_path = thumb_dir / f"{generation_id}_thumb.webp"
 
         try:
-            subprocess.run(
-                [
-                    "ffmpeg",
-                    "-y",
-                    "-i",
-                    str(full_video_path),
-                    "-vframes",
-                    "1",
-                    "-vf",
-                    "scale=256:-1",
-                    "-c:v",
-                    "libwebp",
-                    "-quality",
-                    "80",
-                    str(thumb_path),
-                ],
-                capture_output=True,
-                check=True,
-            )
-        except (subprocess.CalledProcessError, FileNotFoundError):
+            with Image.open(io.BytesIO(frame)) as img:
+                img.thumbnail((256, 256), Image.Resampling.LANCZOS)
+                img.save(thumb_path, "WEBP", quality=80)
+        except Exception:
             # Fallback: create placeholder thumbnail
             img = Image.new("RGB", (256, 256), color=(100, 100, 100))
             img.save(thumb_path, "WEBP", quality=80)
@@ -148,46 +179,107 @@ class AnimationProcessor:
         return thumb_path.relative_to(self.storage_path)
 
 
-async def process_animation_job(job: Job):
-    """Process an animation job."""
+async def _download_frames(
+    client: ComfyUIClient,
+    images: List[Dict[str, str]],
+    storage_path: Path,
+    concurrency: int,
+) -> AsyncIterator[bytes]:
+    """Download frames concurrently, yielding them in order.
+
+    At most ``concurrency`` downloads are in flight. Each frame's ComfyUI
+    output file is removed once fetched.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(image_info: Dict[str, str]) -> bytes:
+        async with semaphore:
+            frame_data = await client.get_image(
+                image_info["filename"], image_info.get("subfolder", "")
+            )
+
+        # Clean up from ComfyUI output directory
+        subfolder = image_info.get("subfolder", "")
+        comfyui_output = storage_path / "comfyui-output"
+        if subfolder:
+            comfyui_file = comfyui_output / subfolder / image_info["filename"]
+        else:
+            comfyui_file = comfyui_output / image_info["filename"]
+        await run_blocking(comfyui_file.unlink, missing_ok=True)
+        return frame_data
+
+    tasks = [asyncio.create_task(fetch(image_info)) for image_info in images]
+    try:
+        for task in tasks:
+            yield await task
+    finally:
+        for task in tasks:
+            task.cancel()
+        # Retrieve every outcome so no failed fetch goes unobserved
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def process_animation_job(job: Job, client: Optional[ComfyUIClient] = None):
+    """Process an animation job from start to finish.
+
+    Runs every stage of ``animation_job_stages`` in turn.
+    """
+    async for _ in animation_job_stages(job, client):
+        pass
+
+
+async def animation_job_stages(
+    job: Job, client: Optional[ComfyUIClient] = None
+) -> AsyncIterator[None]:
+    """Process an animation job as pipeline stages.
+
+    Uploads the source image and runs SVD on ComfyUI, then yields once the
+    GPU work is done. Resuming the generator finalizes the job (frame
+    download, ffmpeg encode, thumbnail, DB update).
+
+    Args:
+        job: The queued job
+        client: ComfyUI backend to run on (defaults to the first configured backend)
+    """
     generation_id = job.params["generation_id"]
+    client = client or comfyui_client
 
     processor = AnimationProcessor(Path(settings.storage_path))
 
     with get_db_session() as db:
-        generation = db.query(Generation).filter(Generation.id == generation_id).first()
+        # Attribute reads must not lazily refresh from the DB on the event loop
+        db.expire_on_commit = False
+
+        generation = await run_blocking(_get_generation, db, generation_id)
         if not generation:
             return
 
         try:
             # Update status to processing
             generation.status = GenerationStatus.PROCESSING
-            db.commit()
+            await run_blocking(db.commit)
 
             await event_bus.publish("generation.processing", {
                 "id": generation_id,
+                "portfolio_id": generation.portfolio_id,
                 "status": "processing",
             })
 
             # Get source generation
-            source_gen = db.query(Generation).filter(
-                Generation.id == generation.source_generation_id
-            ).first()
+            source_gen = await run_blocking(_get_generation, db, generation.source_generation_id)
             if not source_gen or not source_gen.image_path:
                 raise ValueError("Source generation image not found")
 
             # Upload source image to ComfyUI
             storage_path = Path(settings.storage_path)
             source_path = storage_path / source_gen.image_path
-            with open(source_path, "rb") as f:
-                source_data = f.read()
-            source_image_name = await comfyui_client.upload_image(
+            source_data = await run_blocking(source_path.read_bytes)
+            source_image_name = await client.upload_image(
                 source_data, f"{generation_id}_source.webp"
             )
 
             # Get source image dimensions
-            with Image.open(source_path) as img:
-                source_width, source_height = img.size
+            source_width, source_height = await run_blocking(_image_size, source_data)
 
             # Use seed from generation or generate new one
             import random
@@ -199,63 +291,67 @@ async def process_animation_job(job: Job):
             )
 
             # Submit to ComfyUI
-            prompt_id = await comfyui_client.submit_workflow(workflow)
+            prompt_id = await client.submit_workflow(workflow)
             generation.comfyui_prompt_id = prompt_id
-            db.commit()
+            await run_blocking(db.commit)
 
             # Wait for completion (animations can take longer)
-            result = await comfyui_client.wait_for_completion(prompt_id, timeout=600.0)
+            result = await client.wait_for_completion(
+                prompt_id,
+                timeout=600.0,
+                on_progress=ProgressReporter(generation_id, generation.portfolio_id),
+            )
+
+            # GPU work done - the rest is the finalize stage
+            yield
 
             if result.status == "completed" and result.images:
-                # Download all frames from ComfyUI
-                frames_dir = storage_path / "temp_frames" / generation_id
-                frames_dir.mkdir(parents=True, exist_ok=True)
-
-                for i, image_info in enumerate(result.images):
-                    frame_data = await comfyui_client.get_image(
-                        image_info["filename"], image_info.get("subfolder", "")
-                    )
-                    frame_path = frames_dir / f"frame_{i:05d}.png"
-                    frame_path.write_bytes(frame_data)
-
-                    # Clean up from ComfyUI output directory
-                    subfolder = image_info.get("subfolder", "")
-                    filename = image_info["filename"]
-                    comfyui_output = storage_path / "comfyui-output"
-                    if subfolder:
-                        comfyui_file = comfyui_output / subfolder / filename
-                    else:
-                        comfyui_file = comfyui_output / filename
-                    if comfyui_file.exists():
-                        comfyui_file.unlink()
-
-                # Create video from frames
-                fps = generation.fps or 8
-                video_path = processor._create_video_from_frames(generation_id, frames_dir, fps)
-                thumbnail_path = processor._create_video_thumbnail(generation_id, video_path)
+                # Download frames concurrently and stream them into ffmpeg
+                first_frame: List[bytes] = []
+
+                async def frames() -> AsyncIterator[bytes]:
+                    async for frame in _download_frames(
+                        client,
+                        result.images,
+                        storage_path,
+                        settings.animation_frame_download_concurrency,
+                    ):
+                        if not first_frame:
+                            first_frame.append(frame)
+                        yield frame
 
-                # Clean up temp frames
-                shutil.rmtree(frames_dir, ignore_errors=True)
+                fps = generation.fps or 8
+                video_path = await processor._create_video_from_stream(
+                    generation_id, frames(), fps
+                )
+                thumbnail_path = await run_blocking(
+                    processor._create_thumbnail_from_frame,
+                    generation_id,
+                    first_frame[0] if first_frame else None,
+                )
 
                 # Update generation
                 generation.video_path = str(video_path)
                 generation.thumbnail_path = str(thumbnail_path)
                 generation.status = GenerationStatus.COMPLETED
+                generation.progress = 100
                 generation.completed_at = datetime.utcnow()
-                db.commit()
+                await run_blocking(db.commit)
 
                 await event_bus.publish("generation.completed", {
                     "id": generation_id,
+                    "portfolio_id": generation.portfolio_id,
                     "status": "completed",
                     "video_path": generation.video_path,
                 })
             else:
                 generation.status = GenerationStatus.FAILED
                 generation.error_message = result.error or "Animation failed"
-                db.commit()
+                await run_blocking(db.commit)
 
                 await event_bus.publish("generation.failed", {
                     "id": generation_id,
+                    "portfolio_id": generation.portfolio_id,
                     "status": "failed",
                     "error": generation.error_message,
                 })
@@ -263,10 +359,11 @@ async def process_animation_job(job: Job):
         except Exception as e:
             generation.status = GenerationStatus.FAILED
             generation.error_message = str(e)
-            db.commit()
+            await run_blocking(db.commit)
 
             await event_bus.publish("generation.failed", {
                 "id": generation_id,
+                "portfolio_id": generation.portfolio_id,
                 "status": "failed",
                 "error": str(e),
             })
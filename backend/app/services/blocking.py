@@ -0,0 +1,57 @@
+"""Bounded thread pool for blocking work (database, file I/O, image processing).
+
+Job processors run on the single asyncio event loop that also serves API
+requests. Anything that blocks - synchronous SQLAlchemy calls, disk reads
+and writes, PIL decoding/resizing/encoding - goes through ``run_blocking``
+so the loop stays responsive while jobs complete.
+"""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from app.config import settings
+
+T = TypeVar("T")
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Get (creating on first use) the shared blocking-work pool."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.blocking_pool_size,
+            thread_name_prefix="folio-blocking",
+        )
+    return _executor
+
+
+async def run_blocking(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a blocking callable in the shared pool and await its result.
+
+    A pool thread can't be stopped, so if the caller is cancelled (e.g. a
+    job being preempted) this waits for the call to finish before raising
+    ``CancelledError``. Otherwise the caller's cleanup - closing the
+    Session the call is still using - would race with the thread.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(get_executor(), functools.partial(func, *args, **kwargs))
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        while not future.done():
+            try:
+                await asyncio.wait({future})
+            except asyncio.CancelledError:
+                pass
+        raise
+
+
+def shutdown_executor() -> None:
+    """Wait for in-flight blocking work and release the pool."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
@@ -0,0 +1,166 @@
+"""Token-budgeted context assembly for chat turns.
+
+Instead of resending a conversation's whole history on every turn, the
+prompt is built from the system messages plus as many of the most recent
+messages as fit the model's context budget. Recent messages are read
+newest-first in pages with a keyset query on ``(created_at, id)``, so the
+cost of building a prompt depends on the budget, not on how long the
+conversation is. Older turns are dropped.
+
+To let Ollama reuse its KV cache between turns, the prompt prefix must stay
+byte-identical from one turn to the next. So the window start is sticky:
+once history overflows the budget, older turns are dropped down to a low
+watermark (``chat_context_trim_to`` of the budget) and the window then
+keeps that start, only growing at the end, until it overflows again.
+"""
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.chat import Message, MessageRole
+
+# Per-message overhead of the chat template (role markers, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Conversations whose window start is remembered (least recently used evicted)
+_WINDOW_CACHE_SIZE = 1024
+
+# Conversation ID -> (created_at, id) of the first message in its window
+_window_starts: "OrderedDict[str, Tuple[datetime, str]]" = OrderedDict()
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for a piece of text (~4 characters per token).
+
+    Deliberately tokenizer-free: it only has to keep prompts safely under
+    the model's context window, not be exact.
+    """
+    return (len(text) + 3) // 4
+
+
+def message_tokens(message: Dict[str, str]) -> int:
+    return estimate_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+
+def context_window(model: Optional[str]) -> int:
+    """Context window size (``num_ctx``) in tokens to run ``model`` with."""
+    return settings.chat_context_model_tokens.get(model or "", settings.chat_context_tokens)
+
+
+def context_budget(model: Optional[str]) -> int:
+    """Tokens of history to send to ``model``, leaving room for the reply."""
+    return max(0, context_window(model) - settings.chat_reply_reserve_tokens)
+
+
+def _as_api(message: Message) -> Dict[str, str]:
+    return {"role": message.role.value, "content": message.content}
+
+
+def _newest_first(db: Session, conversation_id: str) -> Iterator[Message]:
+    """Yield a conversation's non-system messages newest first, a page at a time."""
+    cursor: Optional[Message] = None
+    page_size = settings.chat_context_page_size
+    while True:
+        query = db.query(Message).filter(
+            Message.conversation_id == conversation_id,
+            Message.role != MessageRole.SYSTEM,
+        )
+        if cursor is not None:
+            # Keyset: strictly older than the last message of the previous page
+            query = query.filter(
+                or_(
+                    Message.created_at < cursor.created_at,
+                    and_(Message.created_at == cursor.created_at, Message.id < cursor.id),
+                )
+            )
+        page = query.order_by(Message.created_at.desc(), Message.id.desc()).limit(page_size).all()
+        yield from page
+        if len(page) < page_size:
+            return
+        cursor = page[-1]
+
+
+def _remember_window_start(conversation_id: str, start: Tuple[datetime, str]) -> None:
+    _window_starts[conversation_id] = start
+    _window_starts.move_to_end(conversation_id)
+    while len(_window_starts) > _WINDOW_CACHE_SIZE:
+        _window_starts.popitem(last=False)
+
+
+def build_context(
+    db: Session,
+    conversation_id: str,
+    model: Optional[str] = None,
+    budget: Optional[int] = None,
+) -> List[Dict[str, str]]:
+    """Build the messages to send for the next turn of a conversation.
+
+    System messages are always kept. The newest message is always kept, even
+    if it alone exceeds the budget. Older messages are kept back to the
+    conversation's current window start (see module docstring) as long as
+    they fit. The result never starts with an orphaned assistant reply.
+
+    Args:
+        db: Database session
+        conversation_id: Conversation to build the prompt for
+        model: Model the prompt is for (selects the budget)
+        budget: Token budget override (defaults to ``context_budget(model)``)
+
+    Returns:
+        Messages in chronological order, formatted for the chat API
+    """
+    if budget is None:
+        budget = context_budget(model)
+
+    system = [
+        _as_api(m)
+        for m in db.query(Message)
+        .filter(Message.conversation_id == conversation_id, Message.role == MessageRole.SYSTEM)
+        .order_by(Message.created_at, Message.id)
+        .all()
+    ]
+    remaining = budget - sum(message_tokens(m) for m in system)
+    window_start = _window_starts.get(conversation_id)
+
+    # Newest first: (message, api entry, tokens)
+    recent: List[Tuple[Message, Dict[str, str], int]] = []
+    used = 0
+    overflow = False
+    for message in _newest_first(db, conversation_id):
+        if window_start is not None and (message.created_at, message.id) < window_start:
+            break
+        entry = _as_api(message)
+        tokens = message_tokens(entry)
+        if recent and used + tokens > remaining:
+            overflow = True
+            break
+        recent.append((message, entry, tokens))
+        used += tokens
+
+    if overflow:
+        # Move the window start forward in one jump, so the next several
+        # turns share this prefix
+        low_water = remaining * settings.chat_context_trim_to
+        kept = 0
+        used = 0
+        for _, _, tokens in recent:
+            if kept and used + tokens > low_water:
+                break
+            kept += 1
+            used += tokens
+        recent = recent[:kept]
+
+    recent.reverse()
+    # Don't open the history with a reply to a question that was dropped
+    while len(recent) > 1 and recent[0][0].role == MessageRole.ASSISTANT:
+        recent.pop(0)
+
+    if overflow:
+        first = recent[0][0]
+        _remember_window_start(conversation_id, (first.created_at, first.id))
+
+    return system + [entry for _, entry, _ in recent]
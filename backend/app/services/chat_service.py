@@ -1,7 +1,9 @@
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
 from app.models.chat import Conversation, Message, MessageRole
+from app.services.chat_context import build_context
 from app.schemas.chat import (
     ConversationCreate,
     ConversationUpdate,
@@ -20,7 +22,11 @@ class ChatService:
     def list_conversations(
         self, limit: int = 10, offset: int = 0
     ) -> List[ConversationResponse]:
-        """List conversations, ordered by most recent."""
+        """List conversations, ordered by most recent, with message counts.
+
+        Two queries however long the conversations are: the page, then one
+        GROUP BY over just its conversations' messages.
+        """
         conversations = (
             self.db.query(Conversation)
             .order_by(Conversation.updated_at.desc())
@@ -28,7 +34,18 @@ class ChatService:
             .limit(limit)
             .all()
         )
-        return [ConversationResponse(**c.to_dict()) for c in conversations]
+        counts = {}
+        if conversations:
+            counts = dict(
+                self.db.query(Message.conversation_id, func.count(Message.id))
+                .filter(Message.conversation_id.in_([c.id for c in conversations]))
+                .group_by(Message.conversation_id)
+                .all()
+            )
+        return [
+            ConversationResponse(**c.to_dict(message_count=counts.get(c.id, 0)))
+            for c in conversations
+        ]
 
     def count_conversations(self) -> int:
         """Count total conversations."""
@@ -47,7 +64,9 @@ class ChatService:
             return None
 
         messages = [MessageResponse(**m.to_dict()) for m in conversation.messages]
-        return ConversationWithMessages(**conversation.to_dict(), messages=messages)
+        return ConversationWithMessages(
+            **conversation.to_dict(message_count=len(messages)), messages=messages
+        )
 
     def create_conversation(self, data: ConversationCreate) -> ConversationResponse:
         """Create a new conversation."""
@@ -122,16 +141,20 @@ class ChatService:
         self.db.refresh(message)
         return MessageResponse(**message.to_dict())
 
-    def get_messages_for_api(self, conversation_id: str) -> List[dict]:
-        """Get messages formatted for OpenAI-compatible API."""
-        conversation = (
-            self.db.query(Conversation)
+    def get_conversation_model(self, conversation_id: str) -> Optional[str]:
+        """Get a conversation's model without loading its messages."""
+        return (
+            self.db.query(Conversation.model)
             .filter(Conversation.id == conversation_id)
-            .first()
+            .scalar()
         )
-        if not conversation:
-            return []
 
-        return [
-            {"role": m.role.value, "content": m.content} for m in conversation.messages
-        ]
+    def get_messages_for_api(
+        self, conversation_id: str, model: Optional[str] = None
+    ) -> List[dict]:
+        """Get the context for the next turn, formatted for the chat API.
+
+        Only the system messages and the recent turns that fit ``model``'s
+        token budget are loaded (see ``app.services.chat_context``).
+        """
+        return build_context(self.db, conversation_id, model)
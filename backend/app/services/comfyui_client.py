@@ -1,10 +1,24 @@
 import httpx
 import asyncio
-from typing import Dict, Any, Optional, List
+import json
+import logging
+import uuid
+from collections import OrderedDict
+from typing import Dict, Any, Optional, List, Callable, Awaitable
 from dataclasses import dataclass
 
+import websockets
+
 from app.config import settings
 
+logger = logging.getLogger(__name__)
+
+# How many finished prompt results to remember for late waiters
+_FINISHED_CACHE_SIZE = 256
+
+# Called with (value, max) for each sampler step reported by ComfyUI
+ProgressCallback = Callable[[int, int], Awaitable[None]]
+
 
 @dataclass
 class JobResult:
@@ -16,32 +30,150 @@ class JobResult:
 
 
 class ComfyUIClient:
-    """HTTP client for ComfyUI API."""
+    """HTTP client for ComfyUI API.
 
-    def __init__(self, base_url: Optional[str] = None):
+    Job completion is detected via ComfyUI's websocket channel
+    (``/ws?clientId=``). History polling is only used as a fallback
+    while the socket is down.
+    """
+
+    def __init__(self, base_url: Optional[str] = None, use_websocket: Optional[bool] = None):
         self.base_url = base_url or settings.comfyui_url
+        self.client_id = str(uuid.uuid4())
+        self.use_websocket = (
+            settings.comfyui_use_websocket if use_websocket is None else use_websocket
+        )
         self._client: Optional[httpx.AsyncClient] = None
 
+        # Websocket listener state
+        self._ws_task: Optional[asyncio.Task] = None
+        self._ws_connected = False
+        self._ws_epoch = 0  # Incremented on every (re)connect
+        self._waiters: Dict[str, asyncio.Future] = {}
+        self._finished: "OrderedDict[str, Optional[str]]" = OrderedDict()
+        self._submit_epochs: Dict[str, Optional[int]] = {}
+        self._progress_callbacks: Dict[str, ProgressCallback] = {}
+
     async def _get_client(self) -> httpx.AsyncClient:
         if self._client is None:
             self._client = httpx.AsyncClient(timeout=300.0)
         return self._client
 
     async def close(self):
+        if self._ws_task:
+            self._ws_task.cancel()
+            try:
+                await self._ws_task
+            except asyncio.CancelledError:
+                pass
+            self._ws_task = None
+            self._ws_connected = False
         if self._client:
             await self._client.aclose()
             self._client = None
 
+    @property
+    def ws_url(self) -> str:
+        """Websocket URL for this client's event stream."""
+        scheme, _, rest = self.base_url.partition("://")
+        ws_scheme = "wss" if scheme == "https" else "ws"
+        return f"{ws_scheme}://{rest}/ws?clientId={self.client_id}"
+
+    def _ensure_listener(self) -> None:
+        """Start the websocket listener if it is not already running."""
+        if not self.use_websocket:
+            return
+        if self._ws_task is None or self._ws_task.done():
+            self._ws_task = asyncio.create_task(self._listen())
+
+    async def _listen(self) -> None:
+        """Consume ComfyUI websocket events, reconnecting on failure."""
+        while True:
+            try:
+                async with websockets.connect(self.ws_url, max_size=None) as ws:
+                    self._ws_epoch += 1
+                    self._ws_connected = True
+                    async for message in ws:
+                        # Binary frames are latent previews - not needed here
+                        if isinstance(message, bytes):
+                            continue
+                        try:
+                            message = json.loads(message)
+                        except json.JSONDecodeError:
+                            continue
+                        if isinstance(message, dict):
+                            await self._dispatch_ws_message(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.debug(f"ComfyUI websocket at {self.base_url} unavailable: {e}")
+            finally:
+                self._ws_connected = False
+            await asyncio.sleep(settings.comfyui_ws_reconnect_delay)
+
+    async def _dispatch_ws_message(self, message: Dict[str, Any]) -> None:
+        """Handle a websocket event, running any progress callback it triggers."""
+        self._handle_ws_message(message)
+
+        if message.get("type") != "progress":
+            return
+        data = message.get("data") or {}
+        callback = self._progress_callbacks.get(data.get("prompt_id"))
+        if callback is None:
+            return
+        try:
+            await callback(int(data.get("value", 0)), int(data.get("max", 0)))
+        except Exception as e:
+            logger.warning(f"Progress callback failed for {data.get('prompt_id')}: {e}")
+
+    def _handle_ws_message(self, message: Dict[str, Any]) -> None:
+        """Dispatch a single websocket event."""
+        msg_type = message.get("type")
+        data = message.get("data") or {}
+        prompt_id = data.get("prompt_id")
+        if not prompt_id:
+            return
+
+        if msg_type == "executing" and data.get("node") is None:
+            # node == None means the prompt has finished executing
+            self._finish(prompt_id, None)
+        elif msg_type == "execution_error":
+            self._finish(prompt_id, data.get("exception_message") or "Unknown error")
+        elif msg_type == "execution_interrupted":
+            self._finish(prompt_id, "Interrupted")
+
+    def _finish(self, prompt_id: str, error: Optional[str]) -> None:
+        """Record a finished prompt and wake its waiter."""
+        # Nothing waits on the socket for it any more (a waiter already took it)
+        self._submit_epochs.pop(prompt_id, None)
+        if prompt_id in self._finished:
+            # First terminal event wins (execution_error precedes executing=None)
+            return
+        self._finished[prompt_id] = error
+        while len(self._finished) > _FINISHED_CACHE_SIZE:
+            self._finished.popitem(last=False)
+
+        waiter = self._waiters.get(prompt_id)
+        if waiter and not waiter.done():
+            waiter.set_result(error)
+
     async def submit_workflow(self, workflow: Dict[str, Any]) -> str:
         """Submit a workflow to ComfyUI. Returns prompt_id."""
+        self._ensure_listener()
+        # Remember whether the socket was up at submit time; if it was, any
+        # completion event for this prompt will arrive on the same connection.
+        epoch = self._ws_epoch if self._ws_connected else None
+
         client = await self._get_client()
         response = await client.post(
             f"{self.base_url}/prompt",
-            json={"prompt": workflow}
+            json={"prompt": workflow, "client_id": self.client_id}
         )
         response.raise_for_status()
         data = response.json()
-        return data["prompt_id"]
+        prompt_id = data["prompt_id"]
+        self._submit_epochs[prompt_id] = epoch
+        return prompt_id
 
     async def get_history(self, prompt_id: str) -> Optional[Dict[str, Any]]:
         """Get the history/status for a prompt."""
@@ -56,45 +188,75 @@ class ComfyUIClient:
         prompt_id: str,
         timeout: float = 300.0,
         poll_interval: float = 0.5,
+        on_progress: Optional[ProgressCallback] = None,
     ) -> JobResult:
-        """Poll until job completes."""
-        elapsed = 0.0
+        """Wait until a job completes.
 
-        while elapsed < timeout:
-            history = await self.get_history(prompt_id)
+        Completion is signalled by the websocket listener. While the socket is
+        down (or was down when the prompt was submitted), falls back to polling
+        ``/history/{prompt_id}`` every ``poll_interval`` seconds.
 
-            if history:
-                status = history.get("status", {})
+        If given, ``on_progress`` is awaited with (value, max) for each
+        sampler ``progress`` event received on the socket.
+        """
+        loop = asyncio.get_running_loop()
+        if on_progress is not None:
+            self._progress_callbacks[prompt_id] = on_progress
+        deadline = loop.time() + timeout
+        waiter = self._waiters.setdefault(prompt_id, loop.create_future())
+        if prompt_id in self._finished and not waiter.done():
+            waiter.set_result(self._finished[prompt_id])
+        epoch = self._submit_epochs.pop(prompt_id, None)
 
-                # Check for completion
-                if status.get("completed", False):
-                    outputs = history.get("outputs", {})
-                    images = self._extract_images(outputs)
-                    return JobResult(
-                        prompt_id=prompt_id,
-                        status="completed",
-                        images=images,
-                    )
+        try:
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
 
-                # Check for errors
-                if status.get("status_str") == "error":
-                    messages = status.get("messages", [])
-                    error_msg = "Unknown error"
-                    # Find the execution_error message
-                    for msg in messages:
-                        if msg[0] == "execution_error" and len(msg) > 1:
-                            error_data = msg[1]
-                            error_msg = error_data.get("exception_message", str(error_data))
-                            break
+                if waiter.done():
+                    error = waiter.result()
+                    if error is not None:
+                        return JobResult(
+                            prompt_id=prompt_id, status="failed", images=[], error=error
+                        )
+                    # Fetch outputs once; history is written before node=None is sent
+                    history = await self.get_history(prompt_id)
+                    result = self._result_from_history(prompt_id, history)
+                    if result:
+                        return result
                     return JobResult(
                         prompt_id=prompt_id,
                         status="failed",
                         images=[],
-                        error=error_msg,
+                        error="Prompt finished without history",
                     )
 
-            await asyncio.sleep(poll_interval)
-            elapsed += poll_interval
+                if self._ws_connected and epoch == self._ws_epoch:
+                    # Socket has been up since submit - just wait for the event,
+                    # waking periodically to notice a dropped connection
+                    try:
+                        await asyncio.wait_for(
+                            asyncio.shield(waiter),
+                            timeout=min(remaining, settings.comfyui_ws_recheck_interval),
+                        )
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                # Fallback: poll history
+                if self._ws_connected:
+                    # Anything finishing after this poll will arrive on the socket
+                    epoch = self._ws_epoch
+                history = await self.get_history(prompt_id)
+                result = self._result_from_history(prompt_id, history)
+                if result:
+                    return result
+                if not (self._ws_connected and epoch == self._ws_epoch):
+                    await asyncio.sleep(min(poll_interval, max(remaining, 0)))
+        finally:
+            self._waiters.pop(prompt_id, None)
+            self._progress_callbacks.pop(prompt_id, None)
 
         return JobResult(
             prompt_id=prompt_id,
@@ -103,6 +265,44 @@ class ComfyUIClient:
             error="Timeout waiting for completion",
         )
 
+    def _result_from_history(
+        self, prompt_id: str, history: Optional[Dict[str, Any]]
+    ) -> Optional[JobResult]:
+        """Build a JobResult from a history entry, or None if still running."""
+        if not history:
+            return None
+
+        status = history.get("status", {})
+
+        # Check for completion
+        if status.get("completed", False):
+            outputs = history.get("outputs", {})
+            images = self._extract_images(outputs)
+            return JobResult(
+                prompt_id=prompt_id,
+                status="completed",
+                images=images,
+            )
+
+        # Check for errors
+        if status.get("status_str") == "error":
+            messages = status.get("messages", [])
+            error_msg = "Unknown error"
+            # Find the execution_error message
+            for msg in messages:
+                if msg[0] == "execution_error" and len(msg) > 1:
+                    error_data = msg[1]
+                    error_msg = error_data.get("exception_message", str(error_data))
+                    break
+            return JobResult(
+                prompt_id=prompt_id,
+                status="failed",
+                images=[],
+                error=error_msg,
+            )
+
+        return None
+
     def _extract_images(self, outputs: Dict[str, Any]) -> List[Dict[str, str]]:
         """Extract image info from ComfyUI outputs."""
         images = []
@@ -151,6 +351,44 @@ class ComfyUIClient:
         # Returns {"name": "filename.png", "subfolder": "", "type": "input"}
         return result["name"]
 
+    async def delete_queued(self, prompt_ids: List[str]) -> bool:
+        """Remove prompts that have not started yet from the ComfyUI queue."""
+        try:
+            client = await self._get_client()
+            response = await client.post(
+                f"{self.base_url}/queue", json={"delete": prompt_ids}
+            )
+            response.raise_for_status()
+            return True
+        except Exception:
+            return False
+
+    async def get_queue(self) -> Dict[str, Any]:
+        """Get the running and pending prompts in the ComfyUI queue."""
+        client = await self._get_client()
+        response = await client.get(f"{self.base_url}/queue")
+        response.raise_for_status()
+        return response.json()
+
+    async def cancel_prompt(self, prompt_id: str) -> bool:
+        """Stop one prompt, whether it is pending or running.
+
+        ``interrupt`` stops whatever is executing, which with several
+        workers per backend may be another job's prompt, so only interrupt
+        when ``prompt_id`` is the one running.
+        """
+        # Its waiter (if any) is gone, so nobody else will clear this
+        self._submit_epochs.pop(prompt_id, None)
+        try:
+            queue = await self.get_queue()
+        except Exception:
+            return False
+        # Queue items are [number, prompt_id, prompt, extra_data, outputs]
+        running = {item[1] for item in queue.get("queue_running", [])}
+        if prompt_id in running:
+            return await self.interrupt()
+        return await self.delete_queued([prompt_id])
+
     async def interrupt(self) -> bool:
         """Interrupt the currently running job. Returns True if successful."""
         try:
@@ -162,5 +400,18 @@ class ComfyUIClient:
             return False
 
 
-# Global client instance
-comfyui_client = ComfyUIClient()
+def get_backend_urls() -> List[str]:
+    """Get the configured ComfyUI backend URLs (at least one)."""
+    return list(settings.comfyui_urls) or [settings.comfyui_url]
+
+
+# Global client pool - one client per ComfyUI backend, indexed by worker ID
+comfyui_clients: List[ComfyUIClient] = [ComfyUIClient(url) for url in get_backend_urls()]
+
+# Default client (first backend)
+comfyui_client = comfyui_clients[0]
+
+
+def get_comfyui_client(worker_id: int = 0) -> ComfyUIClient:
+    """Get the ComfyUI client for a queue worker."""
+    return comfyui_clients[worker_id % len(comfyui_clients)]
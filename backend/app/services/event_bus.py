@@ -1,38 +1,324 @@
+"""In-memory pub/sub for server-sent events.
+
+Subscribers may narrow what they receive by event type, portfolio and
+generation. The bus indexes each subscription under the values of its most
+selective filter, so publishing an event only visits subscribers that could
+want it (plus any unfiltered ones) rather than every open connection.
+
+Every event gets an ID, ``<epoch>-<seq>``: ``seq`` increases monotonically
+and ``epoch`` identifies this process, so IDs from before a restart are
+recognised as stale. The most recent events are kept in a ring buffer; a
+client reconnecting with ``Last-Event-ID`` is replayed just the events it
+missed, or sent ``resync`` if they are no longer all in the buffer.
+"""
 import asyncio
 import json
 import uuid
-from typing import Dict, Any
+from collections import OrderedDict, deque
+from itertools import chain
+from typing import Any, Deque, Dict, FrozenSet, Hashable, Iterable, Optional, Tuple
+
+from app.config import settings
+
+# Events superseded by a newer event of the same type for the same ID: a
+# subscriber only needs the latest one, so a pending one is replaced
+COALESCED_EVENTS = {"generation.progress"}
+
+# Sent in place of a subscriber's backlog when it overflowed; the client
+# should refetch its state instead of relying on the events it missed
+RESYNC_EVENT = "resync"
+
+
+def _coalesce_key(event_type: str, generation_id: Optional[str]) -> Optional[Hashable]:
+    if event_type in COALESCED_EVENTS and generation_id is not None:
+        return (event_type, generation_id)
+    return None
+
+
+def _as_filter(values: Optional[Iterable[str]]) -> Optional[FrozenSet[str]]:
+    return frozenset(values) if values else None
+
+
+class Subscription:
+    """A subscriber's bounded event queue.
+
+    Holds at most ``maxsize`` events. Coalesced events (progress) replace any
+    pending event for the same ID, and are the first to be dropped when the
+    queue is full. Other events (created, completed, failed, ...) are never
+    dropped individually: if they alone would exceed the bound, the backlog
+    is discarded and replaced by a single ``resync`` event, so a stalled
+    client costs bounded memory and still learns that it missed something.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        event_types: Optional[Iterable[str]] = None,
+        portfolio_ids: Optional[Iterable[str]] = None,
+        generation_ids: Optional[Iterable[str]] = None,
+    ):
+        self.id = str(uuid.uuid4())
+        self.maxsize = maxsize
+        # Filters: None accepts anything; otherwise the event's value must be
+        # one of the given ones. All given filters must match.
+        self.event_types = _as_filter(event_types)
+        self.portfolio_ids = _as_filter(portfolio_ids)
+        self.generation_ids = _as_filter(generation_ids)
+        # Pending events in delivery order; coalesced events are keyed by
+        # (type, id) so a newer one replaces them in place
+        self._events: "OrderedDict[Hashable, Dict[str, Any]]" = OrderedDict()
+        self._seq = 0
+        self._ready = asyncio.Event()
+
+        # Metrics
+        self.delivered = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.resyncs = 0
+        self.max_lag = 0
+
+    def matches(
+        self, event_type: str, portfolio_id: Optional[str], generation_id: Optional[str]
+    ) -> bool:
+        """Whether an event passes this subscription's filters."""
+        return (
+            (self.event_types is None or event_type in self.event_types)
+            and (self.portfolio_ids is None or portfolio_id in self.portfolio_ids)
+            and (self.generation_ids is None or generation_id in self.generation_ids)
+        )
+
+    @property
+    def lag(self) -> int:
+        """Events waiting to be delivered."""
+        return len(self._events)
+
+    def offer(self, event: Dict[str, Any], coalesce_key: Optional[Hashable] = None) -> None:
+        """Queue an event without blocking, applying the drop/coalesce policy."""
+        if coalesce_key is not None and coalesce_key in self._events:
+            self._events[coalesce_key] = event
+            self.coalesced += 1
+            return
+
+        if len(self._events) >= self.maxsize:
+            if not self._drop_coalescable():
+                if coalesce_key is not None:
+                    # Full of events that must be delivered; progress can wait
+                    self.dropped += 1
+                    return
+                self._overflow(event)
+                return
+
+        self._seq += 1
+        self._events[coalesce_key if coalesce_key is not None else self._seq] = event
+        self.max_lag = max(self.max_lag, len(self._events))
+        self._ready.set()
+
+    def _drop_coalescable(self) -> bool:
+        """Drop the oldest pending progress event. Returns False if there is none."""
+        for key in self._events:
+            if isinstance(key, tuple):
+                del self._events[key]
+                self.dropped += 1
+                return True
+        return False
+
+    def _overflow(self, event: Dict[str, Any]) -> None:
+        self.dropped += len(self._events) + 1
+        self._events.clear()
+        self.resync(event.get("id"))
+
+    def resync(self, event_id: Optional[str] = None) -> None:
+        """Queue a ``resync`` event.
+
+        ``event_id`` is the newest event the client's refetched state will
+        cover, so a later reconnect resumes from there.
+        """
+        self.resyncs += 1
+        self._seq += 1
+        self._events[self._seq] = {"type": RESYNC_EVENT, "data": "{}", "id": event_id}
+        self._ready.set()
+
+    async def get(self) -> Dict[str, Any]:
+        """Wait for and return the next event."""
+        while not self._events:
+            self._ready.clear()
+            await self._ready.wait()
+        _, event = self._events.popitem(last=False)
+        self.delivered += 1
+        return event
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "lag": self.lag,
+            "max_lag": self.max_lag,
+            "delivered": self.delivered,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "resyncs": self.resyncs,
+        }
 
 
 class EventBus:
     """In-memory event bus for real-time updates."""
 
-    def __init__(self):
-        self._subscribers: Dict[str, asyncio.Queue] = {}
+    def __init__(self, queue_size: Optional[int] = None, history_size: Optional[int] = None):
+        self.queue_size = queue_size or settings.event_queue_size
+        self._subscribers: Dict[str, Subscription] = {}
+        # Topic index. Each subscription is filed under exactly one of these:
+        # its generation IDs, else its portfolio IDs, else its event types,
+        # else (no filters) the wildcard set. An event carries one value per
+        # dimension, so it reaches each candidate at most once.
+        self._wildcard: Dict[str, Subscription] = {}
+        self._by_generation: Dict[str, Dict[str, Subscription]] = {}
+        self._by_portfolio: Dict[str, Dict[str, Subscription]] = {}
+        self._by_type: Dict[str, Dict[str, Subscription]] = {}
+        # Recent events for Last-Event-ID replay:
+        # (seq, event, event type, portfolio ID, generation ID)
+        self._history: Deque[Tuple[int, Dict[str, Any], str, Optional[str], Optional[str]]] = (
+            deque(maxlen=history_size or settings.event_history_size)
+        )
+        self.epoch = uuid.uuid4().hex[:8]
+        self.published = 0
+        self.deliveries = 0
+        self.replayed = 0
+        # Drop counters of subscribers that have since disconnected
+        self._closed_totals = {"dropped": 0, "coalesced": 0, "resyncs": 0}
+
+    def _index_for(self, subscription: Subscription):
+        """The index a subscription is filed in and the keys it's filed under."""
+        if subscription.generation_ids is not None:
+            return self._by_generation, subscription.generation_ids
+        if subscription.portfolio_ids is not None:
+            return self._by_portfolio, subscription.portfolio_ids
+        if subscription.event_types is not None:
+            return self._by_type, subscription.event_types
+        return None, ()
+
+    def subscribe(
+        self,
+        event_types: Optional[Iterable[str]] = None,
+        portfolio_ids: Optional[Iterable[str]] = None,
+        generation_ids: Optional[Iterable[str]] = None,
+        last_event_id: Optional[str] = None,
+    ) -> Subscription:
+        """Subscribe to events. Returns the subscription to read them from.
+
+        Args:
+            event_types: Only receive these event types
+            portfolio_ids: Only receive events for these portfolios
+            generation_ids: Only receive events for these generations
+            last_event_id: ID of the last event the client saw; the events
+                published since are queued first
 
-    def subscribe(self, queue: asyncio.Queue) -> str:
-        """Subscribe to events. Returns subscriber ID."""
-        subscriber_id = str(uuid.uuid4())
-        self._subscribers[subscriber_id] = queue
-        return subscriber_id
+        A filter that is omitted (or empty) accepts everything; an event is
+        delivered only if it passes every filter given.
+        """
+        subscription = Subscription(self.queue_size, event_types, portfolio_ids, generation_ids)
+        if last_event_id:
+            # Before registering, but with no await in between: nothing is
+            # published between the replay and the first live event
+            self._replay(subscription, last_event_id)
+        self._subscribers[subscription.id] = subscription
+
+        index, keys = self._index_for(subscription)
+        if index is None:
+            self._wildcard[subscription.id] = subscription
+        for key in keys:
+            index.setdefault(key, {})[subscription.id] = subscription
+        return subscription
 
     def unsubscribe(self, subscriber_id: str):
         """Unsubscribe from events."""
-        self._subscribers.pop(subscriber_id, None)
+        subscription = self._subscribers.pop(subscriber_id, None)
+        if subscription is None:
+            return
+        for key in self._closed_totals:
+            self._closed_totals[key] += getattr(subscription, key)
+
+        index, keys = self._index_for(subscription)
+        if index is None:
+            self._wildcard.pop(subscriber_id, None)
+        for key in keys:
+            bucket = index.get(key)
+            if bucket is not None:
+                bucket.pop(subscriber_id, None)
+                if not bucket:
+                    del index[key]
+
+    def _parse_event_id(self, event_id: str) -> Optional[int]:
+        """Sequence number of an event ID from this process, else None."""
+        epoch, _, seq = event_id.rpartition("-")
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        return int(seq)
+
+    @property
+    def last_event_id(self) -> Optional[str]:
+        """ID of the most recently published event."""
+        return f"{self.epoch}-{self.published}" if self.published else None
+
+    def _replay(self, subscription: Subscription, last_event_id: str) -> None:
+        """Queue the events a reconnecting client missed, or a resync."""
+        seq = self._parse_event_id(last_event_id)
+        oldest = self._history[0][0] if self._history else self.published + 1
+        if seq is None or seq > self.published or seq < oldest - 1:
+            # Unknown (e.g. from before a restart) or already evicted
+            subscription.resync(self.last_event_id)
+            return
+        for event_seq, event, event_type, portfolio_id, generation_id in self._history:
+            if event_seq > seq and subscription.matches(event_type, portfolio_id, generation_id):
+                subscription.offer(event, _coalesce_key(event_type, generation_id))
+                self.replayed += 1
+
+    def _candidates(
+        self, event_type: str, portfolio_id: Optional[str], generation_id: Optional[str]
+    ) -> Iterable[Subscription]:
+        empty: Dict[str, Subscription] = {}
+        return chain(
+            self._wildcard.values(),
+            self._by_generation.get(generation_id, empty).values(),
+            self._by_portfolio.get(portfolio_id, empty).values(),
+            self._by_type.get(event_type, empty).values(),
+        )
 
     async def publish(self, event_type: str, data: Dict[str, Any]):
-        """Publish an event to all subscribers."""
+        """Publish an event to the subscribers whose filters it passes.
+
+        The event's generation and portfolio are taken from ``data["id"]``
+        and ``data["portfolio_id"]``.
+        """
+        self.published += 1
         event = {
             "type": event_type,
             "data": json.dumps(data),
+            "id": f"{self.epoch}-{self.published}",
         }
+        generation_id = data.get("id")
+        portfolio_id = data.get("portfolio_id")
+        coalesce_key = _coalesce_key(event_type, generation_id)
+        self._history.append((self.published, event, event_type, portfolio_id, generation_id))
 
-        # Send to all subscribers
-        for queue in list(self._subscribers.values()):
-            try:
-                queue.put_nowait(event)
-            except asyncio.QueueFull:
-                pass  # Skip if queue is full
+        # offer() never awaits, so subscribers can't change mid-iteration
+        for subscription in self._candidates(event_type, portfolio_id, generation_id):
+            if subscription.matches(event_type, portfolio_id, generation_id):
+                subscription.offer(event, coalesce_key)
+                self.deliveries += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Subscriber lag and drop metrics (drop counters are lifetime totals)."""
+        subscribers = [s.stats() for s in self._subscribers.values()]
+        result: Dict[str, Any] = {
+            "published": self.published,
+            "deliveries": self.deliveries,
+            "replayed": self.replayed,
+            "history": len(self._history),
+            "subscribers": len(subscribers),
+            "unfiltered_subscribers": len(self._wildcard),
+            "max_lag": max((s["lag"] for s in subscribers), default=0),
+        }
+        for key, closed in self._closed_totals.items():
+            result[key] = closed + sum(s[key] for s in subscribers)
+        return result
 
 
 # Global event bus instance
@@ -3,18 +3,33 @@ import json
 import random
 from pathlib import Path
 from datetime import datetime
+from sqlalchemy import and_, func, or_
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional, Tuple
 from PIL import Image
 import io
 
 from app.config import settings
 from app.models.generation import Generation, GenerationStatus
 from app.models.workflow import WorkflowTemplate
-from app.schemas.generation import GenerationCreate, GenerationResponse
+from app.schemas.generation import (
+    GenerationCounts,
+    GenerationCreate,
+    GenerationNeighbors,
+    GenerationPage,
+    GenerationResponse,
+)
 from app.services.event_bus import event_bus
 from app.services.job_queue import get_job_queue, Job, JobType, JobPriority
-from app.services.comfyui_client import comfyui_client
+from app.services.blocking import run_blocking
+from app.services.comfyui_client import (
+    ComfyUIClient,
+    JobResult,
+    ProgressCallback,
+    comfyui_client,
+)
+from app.services.progress import ProgressReporter
+from app.services.result_cache import find_cached, link_cached_files, workflow_hash
 
 
 class GenerationService:
@@ -24,13 +39,158 @@ class GenerationService:
         self.db = db
         self._workflow_cache = {}
 
-    def list_all(self, portfolio_id: Optional[str] = None) -> List[GenerationResponse]:
-        """List all generations, optionally filtered by portfolio."""
-        query = self.db.query(Generation)
+    def list_page(
+        self,
+        portfolio_id: Optional[str] = None,
+        statuses: Optional[List[GenerationStatus]] = None,
+        generation_types: Optional[List[str]] = None,
+        model: Optional[str] = None,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+        source_generation_id: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> GenerationPage:
+        """List generations newest first, one page at a time.
+
+        Pages are keyset-paginated on ``(created_at, id)``: ``cursor`` is the
+        ``next_cursor`` of the previous page, so fetching a page costs the
+        same however deep it is.
+
+        Args:
+            portfolio_id: Only this portfolio's generations
+            statuses: Only generations in one of these statuses
+            generation_types: Only generations of one of these types
+            model: Only generations rendered with this checkpoint
+            created_after: Only generations created at or after this time
+            created_before: Only generations created before this time
+            source_generation_id: Only generations derived from this one
+            cursor: Continue after the page that returned this cursor
+            limit: Page size (defaults to ``generation_page_size``, capped
+                at ``generation_page_size_max``)
+
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        limit = min(limit or settings.generation_page_size, settings.generation_page_size_max)
+
+        query = self._filtered(
+            self.db.query(Generation),
+            portfolio_id=portfolio_id,
+            statuses=statuses,
+            generation_types=generation_types,
+            model=model,
+            created_after=created_after,
+            created_before=created_before,
+            source_generation_id=source_generation_id,
+        )
+        if cursor:
+            created_at, generation_id = _decode_cursor(cursor)
+            query = query.filter(_older_than(created_at, generation_id))
+
+        # One extra row tells whether there is a next page
+        rows = (
+            query.order_by(Generation.created_at.desc(), Generation.id.desc())
+            .limit(limit + 1)
+            .all()
+        )
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = _encode_cursor(rows[-1].created_at, rows[-1].id)
+        return GenerationPage(
+            items=[GenerationResponse(**g.to_dict()) for g in rows],
+            next_cursor=next_cursor,
+        )
+
+    def count(
+        self,
+        portfolio_id: Optional[str] = None,
+        statuses: Optional[List[GenerationStatus]] = None,
+        generation_types: Optional[List[str]] = None,
+        model: Optional[str] = None,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+        source_generation_id: Optional[str] = None,
+    ) -> GenerationCounts:
+        """Count the generations ``list_page`` would return, per status.
+
+        Takes the same filters, so callers get totals without loading
+        every page.
+        """
+        query = self._filtered(
+            self.db.query(Generation.status, func.count(Generation.id)),
+            portfolio_id=portfolio_id,
+            statuses=statuses,
+            generation_types=generation_types,
+            model=model,
+            created_after=created_after,
+            created_before=created_before,
+            source_generation_id=source_generation_id,
+        )
+        by_status = {status.value: count for status, count in query.group_by(Generation.status)}
+        return GenerationCounts(total=sum(by_status.values()), by_status=by_status)
+
+    def neighbors(
+        self, generation_id: str, statuses: Optional[List[GenerationStatus]] = None
+    ) -> Optional[GenerationNeighbors]:
+        """The generations either side of one in its portfolio's listing.
+
+        Uses the listing order (newest first) and keyset lookups, so it
+        costs the same wherever the generation is; nothing is counted, so
+        callers wanting totals use ``count``. ``statuses`` restricts the
+        neighbours to those statuses. Returns None if the generation
+        doesn't exist.
+        """
+        generation = _get_generation(self.db, generation_id)
+        if not generation:
+            return None
+
+        query = self._filtered(
+            self.db.query(Generation), portfolio_id=generation.portfolio_id, statuses=statuses
+        )
+        previous = (
+            query.filter(_newer_than(generation.created_at, generation.id))
+            .order_by(Generation.created_at, Generation.id)
+            .first()
+        )
+        following = (
+            query.filter(_older_than(generation.created_at, generation.id))
+            .order_by(Generation.created_at.desc(), Generation.id.desc())
+            .first()
+        )
+        return GenerationNeighbors(
+            previous=GenerationResponse(**previous.to_dict()) if previous else None,
+            next=GenerationResponse(**following.to_dict()) if following else None,
+        )
+
+    @staticmethod
+    def _filtered(
+        query,
+        portfolio_id: Optional[str] = None,
+        statuses: Optional[List[GenerationStatus]] = None,
+        generation_types: Optional[List[str]] = None,
+        model: Optional[str] = None,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+        source_generation_id: Optional[str] = None,
+    ):
+        """Apply the listing filters (see ``list_page``) to a query."""
         if portfolio_id:
             query = query.filter(Generation.portfolio_id == portfolio_id)
-        generations = query.order_by(Generation.created_at.desc()).all()
-        return [GenerationResponse(**g.to_dict()) for g in generations]
+        if statuses:
+            query = query.filter(Generation.status.in_(statuses))
+        if generation_types:
+            query = query.filter(Generation.generation_type.in_(generation_types))
+        if model:
+            query = query.filter(Generation.model_filename == model)
+        if created_after:
+            query = query.filter(Generation.created_at >= created_after)
+        if created_before:
+            query = query.filter(Generation.created_at < created_before)
+        if source_generation_id:
+            query = query.filter(Generation.source_generation_id == source_generation_id)
+        return query
 
     def list_animations(self, portfolio_id: str) -> List[GenerationResponse]:
         """List completed animate-type generations for a portfolio."""
@@ -106,9 +266,7 @@ class GenerationService:
 
     async def create_animation(self, source_generation_id: str) -> Optional[GenerationResponse]:
         """Create an animation for a source generation with LOW priority."""
-        source = self.db.query(Generation).filter(
-            Generation.id == source_generation_id
-        ).first()
+        source = await run_blocking(_get_generation, self.db, source_generation_id)
         if not source:
             return None
         if source.status != GenerationStatus.COMPLETED:
@@ -132,14 +290,19 @@ class GenerationService:
 
         Called after txt2img generation completes to maintain 25% animation ratio.
         """
-        if not self.should_auto_animate(portfolio_id):
+        source_id = await run_blocking(self._pick_animation_source, portfolio_id)
+        if not source_id:
             return None
 
-        source = self.get_unanimated_generation(portfolio_id)
-        if not source:
+        return await self.create_animation(source_id)
+
+    def _pick_animation_source(self, portfolio_id: str) -> Optional[str]:
+        """ID of an image to auto-animate, if the portfolio needs one (blocking)."""
+        if not self.should_auto_animate(portfolio_id):
             return None
 
-        return await self.create_animation(source.id)
+        source = self.get_unanimated_generation(portfolio_id)
+        return source.id if source else None
 
     def get(self, generation_id: str) -> Optional[GenerationResponse]:
         """Get a generation by ID."""
@@ -150,6 +313,65 @@ class GenerationService:
 
     async def create(self, data: GenerationCreate) -> GenerationResponse:
         """Create a new generation job."""
+        generation, cached = await run_blocking(self._insert_generation, data)
+
+        # Identical workflow already rendered - complete immediately, skip the queue
+        if cached:
+            await event_bus.publish("generation.created", {
+                "id": generation.id,
+                "portfolio_id": generation.portfolio_id,
+                "status": "completed",
+            })
+            await event_bus.publish("generation.completed", {
+                "id": generation.id,
+                "portfolio_id": generation.portfolio_id,
+                "status": "completed",
+                "image_path": generation.image_path,
+            })
+            # A cached image counts towards the animation ratio like a render
+            await self.maybe_auto_animate(generation.portfolio_id)
+            return generation
+
+        # Determine priority and job type based on generation type
+        if data.generation_type == "animate":
+            priority = JobPriority.LOW
+            job_type = JobType.ANIMATION
+        elif data.generation_type in ("inpaint", "upscale", "outpaint"):
+            priority = JobPriority.CRITICAL
+            job_type = JobType.GENERATION
+        else:
+            priority = JobPriority.HIGH
+            job_type = JobType.GENERATION
+
+        # Create job
+        job = Job(
+            id=generation.id,
+            job_type=job_type,
+            priority=priority,
+            params={
+                "generation_id": generation.id,
+                "portfolio_id": generation.portfolio_id,
+            },
+            created_at=datetime.utcnow().isoformat(),
+        )
+
+        # Enqueue job
+        await get_job_queue().enqueue(job)
+
+        # Publish event
+        await event_bus.publish("generation.created", {
+            "id": generation.id,
+            "portfolio_id": generation.portfolio_id,
+            "status": "pending",
+        })
+
+        return generation
+
+    def _insert_generation(self, data: GenerationCreate) -> Tuple[GenerationResponse, bool]:
+        """Validate and store a new generation (blocking).
+
+        Returns it and whether it was completed from the result cache.
+        """
         # Generate seed if not provided
         seed = data.seed if data.seed is not None else random.randint(0, 2**32 - 1)
 
@@ -190,41 +412,11 @@ class GenerationService:
                 data.height = source_generation.height
 
         # Create generation record
-        generation = Generation(
-            portfolio_id=data.portfolio_id,
-            generation_type=data.generation_type,
-            source_generation_id=data.source_generation_id,
-            prompt=data.prompt,
-            negative_prompt=data.negative_prompt,
-            width=data.width,
-            height=data.height,
-            seed=seed,
-            steps=data.steps,
-            cfg_scale=data.cfg_scale,
-            sampler=data.sampler,
-            scheduler=data.scheduler,
-            workflow_id=data.workflow_id,
-            model_filename=data.model_filename,
-            lora_filename=data.lora_filename,
-            # Inpainting fields
-            denoising_strength=data.denoising_strength,
-            grow_mask_by=data.grow_mask_by,
-            # Upscaling fields
-            upscale_factor=data.upscale_factor,
-            upscale_model=data.upscale_model,
-            sharpen_amount=data.sharpen_amount,
-            # Outpainting fields
-            outpaint_left=data.outpaint_left,
-            outpaint_right=data.outpaint_right,
-            outpaint_top=data.outpaint_top,
-            outpaint_bottom=data.outpaint_bottom,
-            outpaint_feather=data.outpaint_feather,
-            # Animation fields
-            motion_bucket_id=data.motion_bucket_id,
-            fps=data.fps,
-            duration_seconds=data.duration_seconds,
-            status=GenerationStatus.PENDING,
-        )
+        generation = self._build_generation(data, seed)
+        # Result cache key - only txt2img workflows are fully determined by their
+        # parameters (other types embed per-generation uploaded image names)
+        if data.generation_type == "txt2img":
+            generation.workflow_hash = workflow_hash(self._prepare_workflow(generation))
         self.db.add(generation)
         self.db.commit()
         self.db.refresh(generation)
@@ -235,38 +427,68 @@ class GenerationService:
             generation.mask_path = str(mask_path)
             self.db.commit()
 
-        # Determine priority and job type based on generation type
-        if data.generation_type == "animate":
-            priority = JobPriority.LOW
-            job_type = JobType.ANIMATION
-        elif data.generation_type in ("inpaint", "upscale", "outpaint"):
-            priority = JobPriority.CRITICAL
-            job_type = JobType.GENERATION
-        else:
-            priority = JobPriority.HIGH
-            job_type = JobType.GENERATION
+        cached = self._complete_from_cache(generation)
+        return GenerationResponse(**generation.to_dict()), cached
 
-        # Create job
-        job = Job(
-            id=generation.id,
-            job_type=job_type,
-            priority=priority,
-            params={
-                "generation_id": generation.id,
-            },
-            created_at=datetime.utcnow().isoformat(),
-        )
+    async def create_batch(self, data: GenerationCreate) -> List[GenerationResponse]:
+        """Create ``data.quantity`` txt2img generations rendered as batched prompts.
 
-        # Enqueue job
-        await get_job_queue().enqueue(job)
+        Rows are split into chunks of at most ``generation_max_batch_size``;
+        each chunk becomes one queue job that samples every image in a single
+        ComfyUI prompt. Seeds follow an offset convention: chunk ``k`` (starting
+        at image ``offset``) is sampled with ``seed + offset`` and each row stores
+        that chunk seed plus its ``batch_index``, which is enough to re-render
+        the exact image alone (see ``_prepare_workflow``).
+        """
+        chunks = await run_blocking(self._insert_batch, data)
+
+        for chunk in chunks:
+            params = {"generation_id": chunk[0].id, "portfolio_id": data.portfolio_id}
+            if len(chunk) > 1:
+                params["batch_generation_ids"] = [g.id for g in chunk]
+            await get_job_queue().enqueue(Job(
+                id=chunk[0].id,
+                job_type=JobType.GENERATION,
+                priority=JobPriority.HIGH,
+                params=params,
+                created_at=datetime.utcnow().isoformat(),
+            ))
+
+        generations = [g for chunk in chunks for g in chunk]
+        for generation in generations:
+            await event_bus.publish("generation.created", {
+                "id": generation.id,
+                "portfolio_id": generation.portfolio_id,
+                "status": "pending",
+            })
 
-        # Publish event
-        await event_bus.publish("generation.created", {
-            "id": generation.id,
-            "status": "pending",
-        })
+        return generations
 
-        return GenerationResponse(**generation.to_dict())
+    def _insert_batch(self, data: GenerationCreate) -> List[List[GenerationResponse]]:
+        """Store the rows of a batched request, chunked per prompt (blocking)."""
+        base_seed = data.seed if data.seed is not None else random.randint(0, 2**32 - 1)
+        max_batch = max(1, settings.generation_max_batch_size)
+
+        chunks: List[List[Generation]] = []
+        for offset in range(0, data.quantity, max_batch):
+            size = min(max_batch, data.quantity - offset)
+            chunks.append([
+                self._build_generation(
+                    data, base_seed + offset, batch_index=i if size > 1 else None
+                )
+                for i in range(size)
+            ])
+
+        # Every row shares the workflow template; only seed and batch slot vary
+        template = self._txt2img_template(data.workflow_id)
+        generations = [g for chunk in chunks for g in chunk]
+        for generation in generations:
+            generation.workflow_hash = workflow_hash(
+                self._prepare_workflow(generation, template=template)
+            )
+        self.db.add_all(generations)
+        self.db.commit()
+        return [[GenerationResponse(**g.to_dict()) for g in chunk] for chunk in chunks]
 
     async def iterate(self, generation_id: str) -> Optional[GenerationResponse]:
         """Create a variation of an existing generation."""
@@ -320,6 +542,70 @@ class GenerationService:
         self.db.commit()
         return True
 
+    def _build_generation(
+        self, data: GenerationCreate, seed: int, batch_index: Optional[int] = None
+    ) -> Generation:
+        """Build a pending Generation row from request data."""
+        return Generation(
+            portfolio_id=data.portfolio_id,
+            generation_type=data.generation_type,
+            source_generation_id=data.source_generation_id,
+            prompt=data.prompt,
+            negative_prompt=data.negative_prompt,
+            width=data.width,
+            height=data.height,
+            seed=seed,
+            batch_index=batch_index,
+            steps=data.steps,
+            cfg_scale=data.cfg_scale,
+            sampler=data.sampler,
+            scheduler=data.scheduler,
+            workflow_id=data.workflow_id,
+            model_filename=data.model_filename,
+            lora_filename=data.lora_filename,
+            # Inpainting fields
+            denoising_strength=data.denoising_strength,
+            grow_mask_by=data.grow_mask_by,
+            # Upscaling fields
+            upscale_factor=data.upscale_factor,
+            upscale_model=data.upscale_model,
+            sharpen_amount=data.sharpen_amount,
+            # Outpainting fields
+            outpaint_left=data.outpaint_left,
+            outpaint_right=data.outpaint_right,
+            outpaint_top=data.outpaint_top,
+            outpaint_bottom=data.outpaint_bottom,
+            outpaint_feather=data.outpaint_feather,
+            # Animation fields
+            motion_bucket_id=data.motion_bucket_id,
+            fps=data.fps,
+            duration_seconds=data.duration_seconds,
+            status=GenerationStatus.PENDING,
+        )
+
+    def _complete_from_cache(self, generation: Generation) -> bool:
+        """Complete a generation from a cached render of the same workflow.
+
+        Hard-links the cached image and thumbnail. Returns True on a cache hit.
+        """
+        if not settings.result_cache_enabled or not generation.workflow_hash:
+            return False
+
+        cached = find_cached(self.db, generation.workflow_hash, exclude_id=generation.id)
+        if not cached:
+            return False
+
+        paths = link_cached_files(Path(settings.storage_path), cached, generation.id)
+        if not paths:
+            return False
+
+        generation.image_path, generation.thumbnail_path = paths
+        generation.status = GenerationStatus.COMPLETED
+        generation.progress = 100
+        generation.completed_at = datetime.utcnow()
+        self.db.commit()
+        return True
+
     def _load_workflow(self, name: str) -> dict:
         """Load and cache workflow template."""
         if name not in self._workflow_cache:
@@ -395,8 +681,17 @@ class GenerationService:
         generation: Generation,
         source_image_name: Optional[str] = None,
         mask_image_name: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        template: Optional[dict] = None,
     ) -> dict:
-        """Prepare workflow with generation parameters."""
+        """Prepare workflow with generation parameters.
+
+        For txt2img, ``batch_size`` renders a whole batch in one prompt. Without
+        it, a batched generation (``batch_index`` set) gets a workflow that
+        reproduces just its own image: the batch is sampled up to its index and
+        that latent is picked out before decoding. ``template`` is the txt2img
+        workflow from ``_txt2img_template``, when the caller already has it.
+        """
         import copy
 
         gen_type = generation.generation_type or "txt2img"
@@ -433,22 +728,16 @@ class GenerationService:
 
         else:
             # txt2img - default
-            if generation.workflow_id:
-                workflow_template = self.db.query(WorkflowTemplate).filter(
-                    WorkflowTemplate.id == generation.workflow_id
-                ).first()
-                if workflow_template:
-                    workflow = copy.deepcopy(workflow_template.workflow_json)
-                else:
-                    workflow = copy.deepcopy(self._load_workflow("txt2img_sdxl"))
-            else:
-                workflow = copy.deepcopy(self._load_workflow("txt2img_sdxl"))
+            if template is None:
+                template = self._txt2img_template(generation.workflow_id)
+            workflow = copy.deepcopy(template)
 
             # Empty Latent Image (dimensions) - only for txt2img
             for node_id, node in workflow.items():
                 if isinstance(node, dict) and node.get("class_type") == "EmptyLatentImage":
                     node["inputs"]["width"] = generation.width
                     node["inputs"]["height"] = generation.height
+                    node["inputs"]["batch_size"] = batch_size or (generation.batch_index or 0) + 1
                     break
 
         # Common settings for all workflows (except upscale which returns early)
@@ -469,6 +758,21 @@ class GenerationService:
             workflow["3"]["inputs"]["sampler_name"] = generation.sampler
             workflow["3"]["inputs"]["scheduler"] = generation.scheduler or "karras"
 
+            # Single image out of a batch - select its latent before VAEDecode
+            if batch_size is None and generation.batch_index:
+                workflow["latent_from_batch"] = {
+                    "class_type": "LatentFromBatch",
+                    "inputs": {
+                        "samples": ["3", 0],
+                        "batch_index": generation.batch_index,
+                        "length": 1,
+                    },
+                }
+                for node in workflow.values():
+                    if isinstance(node, dict) and node.get("class_type") == "VAEDecode":
+                        if node["inputs"].get("samples") == ["3", 0]:
+                            node["inputs"]["samples"] = ["latent_from_batch", 0]
+
         # Inject model filename if specified
         if generation.model_filename:
             for node in workflow.values():
@@ -485,6 +789,16 @@ class GenerationService:
 
         return workflow
 
+    def _txt2img_template(self, workflow_id: Optional[str]) -> dict:
+        """The txt2img workflow to fill in: a saved template, else the built-in one."""
+        if workflow_id:
+            workflow_template = self.db.query(WorkflowTemplate).filter(
+                WorkflowTemplate.id == workflow_id
+            ).first()
+            if workflow_template:
+                return workflow_template.workflow_json
+        return self._load_workflow("txt2img_sdxl")
+
     def _prepare_upscale_workflow(
         self,
         generation: Generation,
@@ -509,29 +823,159 @@ class GenerationService:
         return workflow
 
 
-async def process_generation_job(job: Job):
-    """Process a generation job."""
-    import asyncio
-    from app.database import get_db_session
+def _get_generation(db: Session, generation_id: Optional[str]) -> Optional[Generation]:
+    """Load a generation by ID (blocking)."""
+    return db.query(Generation).filter(Generation.id == generation_id).first()
 
-    generation_id = job.params["generation_id"]
+
+def _older_than(created_at: datetime, generation_id: str):
+    """Rows after ``(created_at, id)`` in listing order (newest first)."""
+    return or_(
+        Generation.created_at < created_at,
+        and_(Generation.created_at == created_at, Generation.id < generation_id),
+    )
+
+
+def _newer_than(created_at: datetime, generation_id: str):
+    """Rows before ``(created_at, id)`` in listing order (newest first)."""
+    return or_(
+        Generation.created_at > created_at,
+        and_(Generation.created_at == created_at, Generation.id > generation_id),
+    )
+
+
+def _encode_cursor(created_at: datetime, generation_id: str) -> str:
+    """Opaque page cursor for the position after ``(created_at, id)``."""
+    raw = json.dumps([created_at.isoformat(), generation_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, generation_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), str(generation_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def _get_generations(db: Session, generation_ids: List[str]) -> List[Generation]:
+    """Load the still-existing generations of a batch in ``batch_index`` order (blocking)."""
+    generations = db.query(Generation).filter(Generation.id.in_(generation_ids)).all()
+    return sorted(generations, key=lambda g: g.batch_index or 0)
+
+
+def _save_image_files(image_bytes: bytes, image_path: Path, thumb_path: Path) -> None:
+    """Write the full image and a 256px LANCZOS thumbnail (blocking, CPU-heavy)."""
+    image_path.parent.mkdir(parents=True, exist_ok=True)
+    image_path.write_bytes(image_bytes)
+
+    with Image.open(io.BytesIO(image_bytes)) as img:
+        img.thumbnail((256, 256), Image.Resampling.LANCZOS)
+        img.save(thumb_path, "WEBP", quality=80)
+
+
+def _comfyui_output_file(storage_path: Path, img_info: dict) -> Path:
+    """Path of a ComfyUI output image in the shared output volume."""
+    comfyui_output_path = storage_path / "comfyui-output"
+    subfolder = img_info.get("subfolder", "")
+    if subfolder:
+        return comfyui_output_path / subfolder / img_info["filename"]
+    return comfyui_output_path / img_info["filename"]
+
+
+async def _run_workflow(
+    client: ComfyUIClient,
+    db: Session,
+    generations: List[Generation],
+    workflow: dict,
+    on_progress: ProgressCallback,
+) -> JobResult:
+    """Submit a workflow and wait for it, retrying transient model-loading errors."""
+    import asyncio
 
     # Retry settings for model loading race condition
     max_retries = 3
     retry_delay = 2.0
 
+    result = None
+    for attempt in range(max_retries):
+        # Submit to ComfyUI
+        prompt_id = await client.submit_workflow(workflow)
+        for generation in generations:
+            generation.comfyui_prompt_id = prompt_id
+        await run_blocking(db.commit)
+
+        # Wait for completion, reporting sampler progress as it arrives
+        result = await client.wait_for_completion(prompt_id, on_progress=on_progress)
+
+        # Check if it's a retryable error (model not loaded yet)
+        if result.status == "failed" and result.error:
+            error_lower = result.error.lower()
+            is_model_loading_error = (
+                "clip input is invalid" in error_lower
+                or "none" in error_lower
+            )
+            if is_model_loading_error and attempt < max_retries - 1:
+                await asyncio.sleep(retry_delay)
+                continue
+        break
+    return result
+
+
+async def process_generation_job(job: Job, client: Optional[ComfyUIClient] = None):
+    """Process a generation job from start to finish.
+
+    Runs every stage of ``generation_job_stages`` in turn.
+    """
+    async for _ in generation_job_stages(job, client):
+        pass
+
+
+async def generation_job_stages(
+    job: Job, client: Optional[ComfyUIClient] = None
+) -> AsyncIterator[None]:
+    """Process a generation job as pipeline stages.
+
+    Prepares the job (source uploads, workflow) and runs it on ComfyUI, then
+    yields once the GPU work is done. Resuming the generator finalizes the
+    job (image download, thumbnail, DB update); the queue runs that part in
+    the background so the backend can execute the next job meanwhile.
+
+    All blocking stages (SQLAlchemy queries/commits, file reads and writes,
+    PIL thumbnailing) run through ``run_blocking`` so the event loop keeps
+    serving API requests while the job completes.
+
+    Args:
+        job: The queued job
+        client: ComfyUI backend to run on (defaults to the first configured backend)
+    """
+    from app.database import get_db_session
+
+    if job.params.get("batch_generation_ids"):
+        async for _ in generation_batch_job_stages(job, client):
+            yield
+        return
+
+    generation_id = job.params["generation_id"]
+    client = client or comfyui_client
+
     with get_db_session() as db:
-        generation = db.query(Generation).filter(Generation.id == generation_id).first()
+        # Attribute reads must not lazily refresh from the DB on the event loop
+        db.expire_on_commit = False
+
+        generation = await run_blocking(_get_generation, db, generation_id)
         if not generation:
             return
 
         try:
             # Update status to processing
             generation.status = GenerationStatus.PROCESSING
-            db.commit()
+            await run_blocking(db.commit)
 
             await event_bus.publish("generation.processing", {
                 "id": generation_id,
+                "portfolio_id": generation.portfolio_id,
                 "status": "processing",
             })
 
@@ -539,21 +983,20 @@ async def process_generation_job(job: Job):
             source_image_name = None
             mask_image_name = None
             gen_type = generation.generation_type or "txt2img"
+            storage_path = Path(settings.storage_path)
 
             if gen_type in ("inpaint", "upscale", "outpaint"):
                 # Get source generation image
-                source_gen = db.query(Generation).filter(
-                    Generation.id == generation.source_generation_id
-                ).first()
+                source_gen = await run_blocking(
+                    _get_generation, db, generation.source_generation_id
+                )
                 if not source_gen or not source_gen.image_path:
                     raise ValueError("Source generation image not found")
 
                 # Read source image and upload to ComfyUI
-                storage_path = Path(settings.storage_path)
                 source_path = storage_path / source_gen.image_path
-                with open(source_path, "rb") as f:
-                    source_data = f.read()
-                source_image_name = await comfyui_client.upload_image(
+                source_data = await run_blocking(source_path.read_bytes)
+                source_image_name = await client.upload_image(
                     source_data, f"{generation_id}_source.webp"
                 )
 
@@ -563,83 +1006,72 @@ async def process_generation_job(job: Job):
                         raise ValueError("Mask image not found")
 
                     mask_path = storage_path / generation.mask_path
-                    with open(mask_path, "rb") as f:
-                        mask_data = f.read()
-                    mask_image_name = await comfyui_client.upload_image(
+                    mask_data = await run_blocking(mask_path.read_bytes)
+                    mask_image_name = await client.upload_image(
                         mask_data, f"{generation_id}_mask.png"
                     )
 
-            # Prepare workflow - need a service instance for this
+            # Prepare workflow - need a service instance for this (may query templates)
             service = GenerationService(db)
-            workflow = service._prepare_workflow(generation, source_image_name, mask_image_name)
-
-            # Retry loop for transient ComfyUI errors (e.g., model not loaded yet)
-            result = None
-            for attempt in range(max_retries):
-                # Submit to ComfyUI
-                prompt_id = await comfyui_client.submit_workflow(workflow)
-                generation.comfyui_prompt_id = prompt_id
-                db.commit()
-
-                # Wait for completion
-                result = await comfyui_client.wait_for_completion(prompt_id)
-
-                # Check if it's a retryable error (model not loaded yet)
-                if result.status == "failed" and result.error:
-                    error_lower = result.error.lower()
-                    is_model_loading_error = (
-                        "clip input is invalid" in error_lower
-                        or "none" in error_lower
-                    )
-                    if is_model_loading_error and attempt < max_retries - 1:
-                        await asyncio.sleep(retry_delay)
-                        continue
-                break
+            workflow = await run_blocking(
+                service._prepare_workflow, generation, source_image_name, mask_image_name
+            )
+
+            if gen_type == "txt2img":
+                # Key on the workflow actually rendered (templates may have changed)
+                generation.workflow_hash = workflow_hash(workflow)
+
+                # A duplicate submitted while the original was rendering may now be cached
+                if await run_blocking(service._complete_from_cache, generation):
+                    await event_bus.publish("generation.completed", {
+                        "id": generation_id,
+                        "portfolio_id": generation.portfolio_id,
+                        "status": "completed",
+                        "image_path": generation.image_path,
+                    })
+                    await service.maybe_auto_animate(generation.portfolio_id)
+                    return
+
+            reporter = ProgressReporter(generation_id, generation.portfolio_id)
+            result = await _run_workflow(client, db, [generation], workflow, reporter)
+
+            # GPU work done - the rest is the finalize stage
+            yield
 
             if result.status == "completed" and result.images:
                 # Download and save image
                 img_info = result.images[0]
-                image_bytes = await comfyui_client.get_image(
+                image_bytes = await client.get_image(
                     img_info["filename"],
                     img_info.get("subfolder", ""),
                 )
 
-                # Save image
-                storage_path = Path(settings.storage_path)
+                # Save image and thumbnail off the event loop
                 images_path = storage_path / "images"
-                images_path.mkdir(parents=True, exist_ok=True)
-
                 image_filename = f"{generation_id}.webp"
-                image_path = images_path / image_filename
-                with open(image_path, "wb") as f:
-                    f.write(image_bytes)
-
-                # Create thumbnail with LANCZOS resampling for quality
                 thumb_filename = f"{generation_id}_thumb.webp"
-                thumb_path = images_path / thumb_filename
-                img = Image.open(io.BytesIO(image_bytes))
-                img.thumbnail((256, 256), Image.Resampling.LANCZOS)
-                img.save(thumb_path, "WEBP", quality=80)
+                await run_blocking(
+                    _save_image_files,
+                    image_bytes,
+                    images_path / image_filename,
+                    images_path / thumb_filename,
+                )
 
                 # Clean up ComfyUI output file
-                comfyui_output_path = storage_path / "comfyui-output"
-                subfolder = img_info.get("subfolder", "")
-                if subfolder:
-                    comfyui_file = comfyui_output_path / subfolder / img_info["filename"]
-                else:
-                    comfyui_file = comfyui_output_path / img_info["filename"]
-                if comfyui_file.exists():
-                    comfyui_file.unlink()
+                comfyui_file = _comfyui_output_file(storage_path, img_info)
+                await run_blocking(comfyui_file.unlink, missing_ok=True)
 
                 # Update generation
                 generation.image_path = f"images/{image_filename}"
                 generation.thumbnail_path = f"images/{thumb_filename}"
                 generation.status = GenerationStatus.COMPLETED
+                generation.progress = 100
                 generation.completed_at = datetime.utcnow()
-                db.commit()
+                await run_blocking(db.commit)
 
                 await event_bus.publish("generation.completed", {
                     "id": generation_id,
+                    "portfolio_id": generation.portfolio_id,
                     "status": "completed",
                     "image_path": generation.image_path,
                 })
@@ -651,10 +1083,11 @@ async def process_generation_job(job: Job):
             else:
                 generation.status = GenerationStatus.FAILED
                 generation.error_message = result.error or "Unknown error"
-                db.commit()
+                await run_blocking(db.commit)
 
                 await event_bus.publish("generation.failed", {
                     "id": generation_id,
+                    "portfolio_id": generation.portfolio_id,
                     "status": "failed",
                     "error": generation.error_message,
                 })
@@ -662,10 +1095,139 @@ async def process_generation_job(job: Job):
         except Exception as e:
             generation.status = GenerationStatus.FAILED
             generation.error_message = str(e)
-            db.commit()
+            await run_blocking(db.commit)
 
             await event_bus.publish("generation.failed", {
                 "id": generation_id,
+                "portfolio_id": generation.portfolio_id,
                 "status": "failed",
                 "error": str(e),
             })
+
+
+async def generation_batch_job_stages(
+    job: Job, client: Optional[ComfyUIClient] = None
+) -> AsyncIterator[None]:
+    """Process a batched txt2img job (see ``GenerationService.create_batch``).
+
+    Samples every image of the batch in one ComfyUI prompt and fans the
+    outputs back out to their generations in ``batch_index`` order. Staged
+    like ``generation_job_stages``.
+    """
+    from app.database import get_db_session
+
+    generation_ids = job.params["batch_generation_ids"]
+    client = client or comfyui_client
+    storage_path = Path(settings.storage_path)
+
+    with get_db_session() as db:
+        db.expire_on_commit = False
+
+        generations = await run_blocking(_get_generations, db, generation_ids)
+        if not generations:
+            return
+
+        # The whole batch shares one sampler run, so fan progress out to every row
+        reporters = [ProgressReporter(g.id, g.portfolio_id) for g in generations]
+
+        async def on_progress(value: int, maximum: int) -> None:
+            for reporter in reporters:
+                await reporter(value, maximum)
+
+        try:
+            for generation in generations:
+                generation.status = GenerationStatus.PROCESSING
+            await run_blocking(db.commit)
+
+            for generation in generations:
+                await event_bus.publish("generation.processing", {
+                    "id": generation.id,
+                    "portfolio_id": generation.portfolio_id,
+                    "status": "processing",
+                })
+
+            # Rows deleted since enqueue still occupy their slot in the batch
+            lead = generations[0]
+            batch_size = max(g.batch_index or 0 for g in generations) + 1
+            service = GenerationService(db)
+            workflow = await run_blocking(
+                service._prepare_workflow, lead, batch_size=batch_size
+            )
+
+            result = await _run_workflow(client, db, generations, workflow, on_progress)
+
+            # GPU work done - the rest is the finalize stage
+            yield
+
+            if result.status != "completed" or not result.images:
+                raise RuntimeError(result.error or "Unknown error")
+
+            images_path = storage_path / "images"
+            by_index = {g.batch_index or 0: g for g in generations}
+            for index, img_info in enumerate(result.images):
+                comfyui_file = _comfyui_output_file(storage_path, img_info)
+                generation = by_index.get(index)
+                if generation is None:
+                    # Generation deleted while queued - just drop its output
+                    await run_blocking(comfyui_file.unlink, missing_ok=True)
+                    continue
+
+                image_bytes = await client.get_image(
+                    img_info["filename"],
+                    img_info.get("subfolder", ""),
+                )
+                await run_blocking(comfyui_file.unlink, missing_ok=True)
+
+                image_filename = f"{generation.id}.webp"
+                thumb_filename = f"{generation.id}_thumb.webp"
+                await run_blocking(
+                    _save_image_files,
+                    image_bytes,
+                    images_path / image_filename,
+                    images_path / thumb_filename,
+                )
+                generation.image_path = f"images/{image_filename}"
+                generation.thumbnail_path = f"images/{thumb_filename}"
+                generation.status = GenerationStatus.COMPLETED
+                generation.progress = 100
+                generation.completed_at = datetime.utcnow()
+                await run_blocking(db.commit)
+
+                await event_bus.publish("generation.completed", {
+                    "id": generation.id,
+                    "portfolio_id": generation.portfolio_id,
+                    "status": "completed",
+                    "image_path": generation.image_path,
+                })
+
+            missing = [g for g in generations if g.status != GenerationStatus.COMPLETED]
+            for generation in missing:
+                generation.status = GenerationStatus.FAILED
+                generation.error_message = "Batch returned too few images"
+            if missing:
+                await run_blocking(db.commit)
+                for generation in missing:
+                    await event_bus.publish("generation.failed", {
+                        "id": generation.id,
+                        "portfolio_id": generation.portfolio_id,
+                        "status": "failed",
+                        "error": generation.error_message,
+                    })
+
+            if len(missing) < len(generations):
+                await service.maybe_auto_animate(lead.portfolio_id)
+
+        except Exception as e:
+            failed = [g for g in generations if g.status != GenerationStatus.COMPLETED]
+            for generation in failed:
+                generation.status = GenerationStatus.FAILED
+                generation.error_message = str(e)
+            await run_blocking(db.commit)
+
+            for generation in failed:
+                await event_bus.publish("generation.failed", {
+                    "id": generation.id,
+                    "portfolio_id": generation.portfolio_id,
+                    "status": "failed",
+                    "error": str(e),
+                })
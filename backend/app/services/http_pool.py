@@ -0,0 +1,65 @@
+"""Shared HTTP connection pool for Ollama and health checks.
+
+One ``httpx.AsyncClient`` is reused by every call so TCP connections stay
+alive between requests instead of being set up (and torn down) per call.
+It is created on first use and closed in the app lifespan shutdown. Call
+sites pass their own ``timeout=request_timeout(...)`` where it differs from
+the pool default.
+"""
+import logging
+from typing import Optional
+
+import httpx
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get the shared HTTP client, creating it on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        http2 = settings.http_pool_http2
+        if http2 and not _http2_available():
+            logger.warning("http_pool_http2 is set but h2 is not installed; using HTTP/1.1")
+            http2 = False
+        _client = httpx.AsyncClient(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=settings.http_pool_max_connections,
+                max_keepalive_connections=settings.http_pool_max_keepalive,
+                keepalive_expiry=settings.http_pool_keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(
+                settings.http_pool_timeout, connect=settings.http_pool_connect_timeout
+            ),
+        )
+    return _client
+
+
+def request_timeout(seconds: Optional[float]) -> httpx.Timeout:
+    """Per-call timeout that keeps the pool's connect limit.
+
+    A bare float would apply to the connect phase too, so an unreachable
+    host could hang for the whole read budget.
+    """
+    return httpx.Timeout(seconds, connect=settings.http_pool_connect_timeout)
+
+
+async def close_http_client() -> None:
+    """Close the shared HTTP client and its pooled connections."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
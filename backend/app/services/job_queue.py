@@ -1,12 +1,17 @@
 """Priority job queue with Write-Ahead Log (WAL) persistence."""
 import asyncio
+import heapq
+import inspect
+import itertools
 import json
-import os
+from collections import OrderedDict
 from dataclasses import dataclass
 from datetime import datetime
 from enum import Enum
 from pathlib import Path
-from typing import Dict, Any, Optional, Callable, List
+from typing import Dict, Any, Optional, Callable, List, Set
+
+from app.services.wal import DurabilityMode, WriteAheadLog
 
 
 class JobPriority(str, Enum):
@@ -16,6 +21,10 @@ class JobPriority(str, Enum):
     LOW = "low"            # Future: animations
 
 
+# Lower rank = more urgent
+_PRIORITY_RANK = {JobPriority.CRITICAL: 0, JobPriority.HIGH: 1, JobPriority.LOW: 2}
+
+
 class JobType(str, Enum):
     """Types of jobs that can be queued."""
     GENERATION = "generation"
@@ -56,87 +65,300 @@ class Job:
         )
 
 
+class JobLane:
+    """FIFO lane of jobs with O(1) append, pop and removal by job ID.
+
+    Jobs are held in an ordered id -> job index. In fair mode the lane is
+    additionally split per tenant (``params["portfolio_id"]``) and ``popleft``
+    serves tenants by weighted fair queuing: each tenant carries a virtual
+    finish time advanced by ``1 / weight`` per job served, and the tenant
+    with the earliest one (kept in a heap) goes next. A tenant with a large
+    backlog therefore gets its weighted share instead of starving the rest.
+    """
+
+    def __init__(self, fair: bool = False, weights: Optional[Dict[str, float]] = None):
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._fair = fair
+        self._weights = weights or {}
+        # Fair mode state
+        self._tenants: Dict[str, "OrderedDict[str, Job]"] = {}
+        self._finish: Dict[str, float] = {}
+        self._heap: List[tuple] = []
+        self._heap_seq: Dict[str, int] = {}  # tenant -> seq of its live heap entry
+        self._seq = itertools.count()
+        self._vtime = 0.0
+
+    @staticmethod
+    def tenant_of(job: Job) -> str:
+        return str(job.params.get("portfolio_id") or "")
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def __iter__(self):
+        return iter(list(self._jobs.values()))
+
+    def __contains__(self, job_id: str) -> bool:
+        return job_id in self._jobs
+
+    def append(self, job: Job) -> None:
+        """Add a job at the back of the lane."""
+        self._jobs[job.id] = job
+        if self._fair:
+            self._tenant_append(job)
+
+    def appendleft(self, job: Job) -> None:
+        """Add a job at the front of the lane (served next)."""
+        self._jobs[job.id] = job
+        self._jobs.move_to_end(job.id, last=False)
+        if self._fair:
+            self._tenant_append(job)
+            self._tenants[self.tenant_of(job)].move_to_end(job.id, last=False)
+
+    def popleft(self) -> Optional[Job]:
+        """Remove and return the next job, or None if the lane is empty."""
+        if not self._jobs:
+            return None
+        if not self._fair:
+            return self._jobs.popitem(last=False)[1]
+
+        while True:
+            finish, seq, tenant = heapq.heappop(self._heap)
+            if self._heap_seq.get(tenant) == seq:
+                break
+
+        jobs = self._tenants[tenant]
+        job = jobs.popitem(last=False)[1]
+        del self._jobs[job.id]
+
+        self._vtime = finish
+        self._finish[tenant] = finish + 1.0 / self._weights.get(tenant, 1.0)
+        if jobs:
+            self._push_tenant(tenant)
+        else:
+            del self._tenants[tenant]
+            del self._heap_seq[tenant]
+        return job
+
+    def remove(self, job_id: str) -> Optional[Job]:
+        """Remove a job by ID, returning it if it was in the lane."""
+        job = self._jobs.pop(job_id, None)
+        if job is not None and self._fair:
+            tenant = self.tenant_of(job)
+            jobs = self._tenants[tenant]
+            del jobs[job_id]
+            if not jobs:
+                # Its heap entry goes stale and is skipped by popleft
+                del self._tenants[tenant]
+                del self._heap_seq[tenant]
+        return job
+
+    def _tenant_append(self, job: Job) -> None:
+        tenant = self.tenant_of(job)
+        if tenant not in self._tenants:
+            # A tenant returning from idle starts at the current virtual time,
+            # so it cannot bank credit while it had nothing queued
+            self._tenants[tenant] = OrderedDict()
+            self._finish[tenant] = max(self._finish.get(tenant, 0.0), self._vtime)
+            self._push_tenant(tenant)
+        self._tenants[tenant][job.id] = job
+
+    def _push_tenant(self, tenant: str) -> None:
+        seq = next(self._seq)
+        self._heap_seq[tenant] = seq
+        heapq.heappush(self._heap, (self._finish[tenant], seq, tenant))
+
+
 class PriorityJobQueue:
     """Priority job queue with Write-Ahead Log persistence.
 
     Jobs are processed in priority order: CRITICAL > HIGH > preempted > LOW.
-    All mutations are immediately persisted to a log file for crash recovery.
+    All mutations are persisted to a log file for crash recovery before the
+    mutating call returns (fsync timing depends on the durability mode).
     """
 
-    def __init__(self, storage_path: Path):
+    def __init__(
+        self,
+        storage_path: Path,
+        durability: DurabilityMode = DurabilityMode.GROUP,
+        group_window_ms: float = 0.0,
+        sync_interval_ms: float = 1000.0,
+        compact_after_ops: int = 10_000,
+        compact_after_bytes: int = 8 * 1024 * 1024,
+        fair_share: bool = False,
+        tenant_weights: Optional[Dict[str, float]] = None,
+        preempt_check_interval_ms: float = 250.0,
+        finalize_concurrency: int = 4,
+    ):
         """Initialize queue with storage path for WAL file.
 
         Args:
             storage_path: Directory where queue.log will be stored
+            durability: When log entries are fsynced (strict, group or periodic)
+            group_window_ms: Group commit window in ``group`` mode
+            sync_interval_ms: fsync interval in ``periodic`` mode
+            compact_after_ops: Compact once this many entries follow the last
+                snapshot (0 disables)
+            compact_after_bytes: Compact once the log reaches this size (0 disables)
+            fair_share: Serve portfolios by weighted fair queuing within each
+                priority level instead of strict FIFO
+            tenant_weights: Per-portfolio weights for fair share (default 1.0)
+            preempt_check_interval_ms: How often a running job is checked for
+                preemption (only when a preempt handler is set)
+            finalize_concurrency: Jobs whose finalize stage may run at once
+                (see ``_run_job``)
         """
         self._storage_path = Path(storage_path)
         self._storage_path.mkdir(parents=True, exist_ok=True)
         self._log_file = self._storage_path / "queue.log"
+        self._wal = WriteAheadLog(
+            self._log_file,
+            mode=durability,
+            group_window_ms=group_window_ms,
+            sync_interval_ms=sync_interval_ms,
+        )
 
         # In-memory queues by priority
-        self._critical: List[Job] = []
-        self._high: List[Job] = []
-        self._low: List[Job] = []
-        self._preempted: List[Job] = []
-
-        # Current running job
-        self._current_job: Optional[Job] = None
-
-        # Worker management (kept for backward compatibility)
-        self._worker_task: Optional[asyncio.Task] = None
+        self._critical = JobLane(fair_share, tenant_weights)
+        self._high = JobLane(fair_share, tenant_weights)
+        self._low = JobLane(fair_share, tenant_weights)
+        # Preempted jobs resume LIFO, regardless of tenant
+        self._preempted = JobLane()
+
+        # Currently running job per worker (worker_id -> job)
+        self._current_jobs: Dict[int, Job] = {}
+        # Order in which workers took their current job (worker_id -> seq)
+        self._started: Dict[int, int] = {}
+        self._start_seq = itertools.count()
+
+        # Worker management
+        self._worker_tasks: List[asyncio.Task] = []
         self._processor: Optional[Callable] = None
+        self._preempt_handler: Optional[Callable] = None
+        self._preempt_check_interval = preempt_check_interval_ms / 1000.0
+        # Worker N submits to backend N % num_backends (see start_worker)
+        self._num_backends = 1
         self._running = False
+        # Wakes idle workers blocked in get() when a job becomes available
+        self._job_available = asyncio.Condition()
+        # Per-worker wakeups for the preemption watchdog
+        self._preempt_wakeups: Dict[int, asyncio.Event] = {}
+        # Background finalize stages of staged processors
+        self._finalize_slots = asyncio.Semaphore(finalize_concurrency)
+        self._finalize_tasks: Set[asyncio.Task] = set()
+
+        # Automatic compaction
+        self._compact_after_ops = compact_after_ops
+        self._compact_after_bytes = compact_after_bytes
+        self._compact_task: Optional[asyncio.Task] = None
+
+        # Restore state from log, compacting up front if replay was long
+        self._wal.entry_count = self._load_from_log()
+        if self._needs_compaction():
+            self.compact_log()
+
+    async def _append_log(self, entry: Dict[str, Any]) -> None:
+        """Append entry to the write-ahead log and wait for durability."""
+        entry["ts"] = datetime.utcnow().isoformat()
+        await self._wal.append(entry)
+        if self._needs_compaction() and (
+            self._compact_task is None or self._compact_task.done()
+        ):
+            self._compact_task = asyncio.create_task(self._compact_in_background())
+
+    def _needs_compaction(self) -> bool:
+        """Whether the log has grown past a compaction threshold."""
+        return bool(
+            (self._compact_after_ops and self._wal.entry_count >= self._compact_after_ops)
+            or (self._compact_after_bytes and self._wal.size_bytes >= self._compact_after_bytes)
+        )
 
-        # Restore state from log
-        self._load_from_log()
+    def _snapshot_entry(self) -> Dict[str, Any]:
+        """Log entry capturing the full queue state (see ``_load_from_log``)."""
+        return {
+            "op": "snapshot",
+            "critical": [job.to_dict() for job in self._critical],
+            "high": [job.to_dict() for job in self._high],
+            "low": [job.to_dict() for job in self._low],
+            "preempted": [job.to_dict() for job in self._preempted],
+            "current": {
+                str(worker_id): job.to_dict() for worker_id, job in self._current_jobs.items()
+            },
+            "ts": datetime.utcnow().isoformat(),
+        }
 
-    def _append_log(self, entry: Dict[str, Any]) -> None:
-        """Append entry to log file with fsync for durability."""
-        entry["ts"] = datetime.utcnow().isoformat()
-        with open(self._log_file, "a") as f:
-            f.write(json.dumps(entry) + "\n")
-            f.flush()
-            os.fsync(f.fileno())
+    async def _compact_in_background(self) -> None:
+        """Compact the log without blocking concurrent queue operations."""
+        try:
+            await self._wal.compact([self._snapshot_entry()])
+        except Exception as e:
+            print(f"Job queue log compaction failed: {e}")
 
-    def _load_from_log(self) -> None:
-        """Replay log to reconstruct queue state."""
+    def _load_from_log(self) -> int:
+        """Replay log to reconstruct queue state.
+
+        The log is a ``snapshot`` entry (written by compaction) followed by
+        the ops since, so replay cost is bounded by the compaction threshold
+        rather than the queue's lifetime. Returns the number of entries read.
+        """
         if not self._log_file.exists():
-            return
+            return 0
 
         # Track jobs by ID for replay
         jobs: Dict[str, Job] = {}
         dequeued: set = set()
         completed: set = set()
         preempted_jobs: Dict[str, Dict[str, Any]] = {}  # job_id -> preempted_state
-        current_job_id: Optional[str] = None
+        current_job_ids: Dict[int, str] = {}  # worker_id -> job_id
+        entry_count = 0
 
         with open(self._log_file, "r") as f:
             for line in f:
                 line = line.strip()
                 if not line:
                     continue
+                entry_count += 1
                 try:
                     entry = json.loads(line)
                     op = entry.get("op")
 
-                    if op == "enqueue":
+                    if op == "snapshot":
+                        # Full state as of compaction - discard anything earlier
+                        jobs.clear()
+                        dequeued.clear()
+                        completed.clear()
+                        preempted_jobs.clear()
+                        current_job_ids.clear()
+                        for key in ("critical", "high", "low", "preempted"):
+                            for data in entry[key]:
+                                job = Job.from_dict(data)
+                                jobs[job.id] = job
+                                if key == "preempted":
+                                    preempted_jobs[job.id] = job.preempted_state
+                        for worker, data in entry["current"].items():
+                            job = Job.from_dict(data)
+                            jobs[job.id] = job
+                            dequeued.add(job.id)
+                            current_job_ids[int(worker)] = job.id
+                    elif op == "enqueue":
                         job = Job.from_dict(entry["job"])
                         jobs[job.id] = job
                     elif op == "dequeue":
                         dequeued.add(entry["job_id"])
-                    elif op == "complete":
+                    elif op in ("complete", "remove"):
                         completed.add(entry["job_id"])
                     elif op == "preempt":
                         job_id = entry["job_id"]
                         preempted_jobs[job_id] = entry.get("state")
                     elif op == "set_current":
-                        current_job_id = entry["job_id"]
+                        current_job_ids[entry.get("worker", 0)] = entry["job_id"]
                     elif op == "clear_current":
-                        current_job_id = None
+                        current_job_ids.pop(entry.get("worker", 0), None)
                 except (json.JSONDecodeError, KeyError):
                     continue
 
         # Reconstruct queues
+        worker_by_job = {job_id: worker for worker, job_id in current_job_ids.items()}
         for job_id, job in jobs.items():
             if job_id in completed:
                 continue
@@ -146,29 +368,60 @@ class PriorityJobQueue:
                 job.preempted_state = preempted_jobs[job_id]
                 self._preempted.append(job)
             elif job_id in dequeued:
-                # Was dequeued but not completed - might have been current job
-                if job_id == current_job_id:
-                    self._current_job = job
+                # Was dequeued but not completed - might have been a current job
+                if job_id in worker_by_job:
+                    self._current_jobs[worker_by_job[job_id]] = job
                 # Otherwise it's lost (crash during processing)
             else:
                 # Still in queue
-                if job.priority == JobPriority.CRITICAL:
-                    self._critical.append(job)
-                elif job.priority == JobPriority.HIGH:
-                    self._high.append(job)
-                else:
-                    self._low.append(job)
+                self._lane_for(job.priority).append(job)
+
+        return entry_count
 
     async def enqueue(self, job: Job) -> None:
         """Add a job to the appropriate priority queue."""
-        self._append_log({"op": "enqueue", "job": job.to_dict()})
-
-        if job.priority == JobPriority.CRITICAL:
-            self._critical.append(job)
-        elif job.priority == JobPriority.HIGH:
-            self._high.append(job)
-        else:
-            self._low.append(job)
+        await self._append_log({"op": "enqueue", "job": job.to_dict()})
+        self._lane_for(job.priority).append(job)
+        await self._notify_job_available()
+
+        # Running jobs this one outranks may need to yield to it
+        if any(
+            _PRIORITY_RANK[job.priority] < _PRIORITY_RANK[current.priority]
+            for current in self._current_jobs.values()
+        ):
+            self._wake_watchdogs()
+
+    async def _notify_job_available(self) -> None:
+        """Wake one worker waiting in ``get``."""
+        async with self._job_available:
+            self._job_available.notify()
+
+    def _wake_watchdogs(self) -> None:
+        """Make every running job's preemption watchdog re-check immediately."""
+        for event in self._preempt_wakeups.values():
+            event.set()
+
+    async def get(self) -> Job:
+        """Wait for and dequeue the next job (ordering as in ``dequeue``).
+
+        Idle workers block here until ``enqueue`` (or a preemption) makes a
+        job available, rather than polling.
+        """
+        while True:
+            async with self._job_available:
+                await self._job_available.wait_for(lambda: self.size > 0)
+            # Another worker may win the race for it - then wait again
+            job = await self.dequeue()
+            if job:
+                return job
+
+    def _lane_for(self, priority: JobPriority) -> JobLane:
+        """Pending lane for a priority level."""
+        if priority == JobPriority.CRITICAL:
+            return self._critical
+        if priority == JobPriority.HIGH:
+            return self._high
+        return self._low
 
     async def dequeue(self) -> Optional[Job]:
         """Get the next job by priority: CRITICAL > HIGH > preempted > LOW."""
@@ -176,48 +429,64 @@ class PriorityJobQueue:
 
         # Try critical first
         if self._critical:
-            job = self._critical.pop(0)
+            job = self._critical.popleft()
         # Then high
         elif self._high:
-            job = self._high.pop(0)
+            job = self._high.popleft()
         # Then preempted (resume interrupted jobs)
         elif self._preempted:
-            job = self._preempted.pop(0)
+            job = self._preempted.popleft()
         # Finally low
         elif self._low:
-            job = self._low.pop(0)
+            job = self._low.popleft()
 
         if job:
-            self._append_log({"op": "dequeue", "job_id": job.id})
+            await self._append_log({"op": "dequeue", "job_id": job.id})
 
         return job
 
-    async def set_current_job(self, job: Job) -> None:
-        """Mark a job as currently running."""
-        self._current_job = job
-        self._append_log({"op": "set_current", "job_id": job.id})
-
-    async def get_current_job(self) -> Optional[Job]:
-        """Get the currently running job."""
-        return self._current_job
-
-    async def clear_current_job(self) -> None:
-        """Clear the current job marker."""
-        self._current_job = None
-        self._append_log({"op": "clear_current"})
+    async def set_current_job(self, job: Job, worker_id: int = 0) -> None:
+        """Mark a job as currently running on a worker."""
+        self._current_jobs[worker_id] = job
+        self._started[worker_id] = next(self._start_seq)
+        await self._append_log({"op": "set_current", "job_id": job.id, "worker": worker_id})
+
+        # A pipelined sibling may now be holding up this job on their backend
+        if any(
+            _PRIORITY_RANK[job.priority] < _PRIORITY_RANK[current.priority]
+            for current in self._current_jobs.values()
+        ):
+            self._wake_watchdogs()
+
+    async def get_current_job(self, worker_id: int = 0) -> Optional[Job]:
+        """Get the job currently running on a worker."""
+        return self._current_jobs.get(worker_id)
+
+    async def get_current_jobs(self) -> Dict[int, Job]:
+        """Get all currently running jobs keyed by worker ID."""
+        return dict(self._current_jobs)
+
+    async def clear_current_job(self, worker_id: int = 0) -> None:
+        """Clear the current job marker for a worker."""
+        self._current_jobs.pop(worker_id, None)
+        self._started.pop(worker_id, None)
+        await self._append_log({"op": "clear_current", "worker": worker_id})
 
     async def complete(self, job_id: str) -> None:
         """Mark a job as completed."""
-        self._append_log({"op": "complete", "job_id": job_id})
-        if self._current_job and self._current_job.id == job_id:
-            self._current_job = None
-
-    async def should_preempt(self) -> bool:
-        """Check if current job should be preempted for higher priority."""
-        if not self._current_job:
+        await self._append_log({"op": "complete", "job_id": job_id})
+        for worker_id, job in list(self._current_jobs.items()):
+            if job.id == job_id:
+                del self._current_jobs[worker_id]
+                self._started.pop(worker_id, None)
+
+    async def should_preempt(self, worker_id: int = 0) -> bool:
+        """Check if a worker's current job should be preempted for higher priority."""
+        current_job = self._current_jobs.get(worker_id)
+        if not current_job:
             return False
 
-        current_priority = self._current_job.priority
+        current_priority = current_job.priority
 
         if current_priority == JobPriority.LOW:
             # LOW can be preempted by CRITICAL or HIGH
@@ -229,23 +498,30 @@ class PriorityJobQueue:
         # CRITICAL is never preempted
         return False
 
-    async def preempt_current(self, state: Optional[Dict[str, Any]] = None) -> Optional[Job]:
-        """Preempt the current job and save for later resumption."""
-        if not self._current_job:
+    async def preempt_current(
+        self, state: Optional[Dict[str, Any]] = None, worker_id: int = 0
+    ) -> Optional[Job]:
+        """Preempt a worker's current job and save for later resumption."""
+        job = self._current_jobs.get(worker_id)
+        if not job:
             return None
 
-        job = self._current_job
         job.preempted_state = state
 
-        self._append_log({
+        await self._append_log({
             "op": "preempt",
             "job_id": job.id,
             "state": state,
+            "worker": worker_id,
         })
 
         # Add to preempted queue (front for LIFO resumption)
-        self._preempted.insert(0, job)
-        self._current_job = None
+        self._preempted.appendleft(job)
+        del self._current_jobs[worker_id]
+        self._started.pop(worker_id, None)
+        await self._notify_job_available()
+        # Victim selection changed - other watchdogs may now need to act
+        self._wake_watchdogs()
 
         return job
 
@@ -253,16 +529,18 @@ class PriorityJobQueue:
         """Remove a specific job from the queue."""
         # Check all queues
         for queue in [self._critical, self._high, self._low, self._preempted]:
-            for i, job in enumerate(queue):
-                if job.id == job_id:
-                    queue.pop(i)
-                    self._append_log({"op": "remove", "job_id": job_id})
-                    return True
+            if queue.remove(job_id) is not None:
+                await self._append_log({"op": "remove", "job_id": job_id})
+                return True
         return False
 
     async def get_status(self) -> Dict[str, Any]:
         """Get current queue statistics."""
-        running = 1 if self._current_job else 0
+        running = len(self._current_jobs)
+        current_jobs = [
+            {"id": job.id, "priority": job.priority.value, "worker": worker_id}
+            for worker_id, job in sorted(self._current_jobs.items())
+        ]
         pending = len(self._critical) + len(self._high) + len(self._low) + len(self._preempted)
 
         return {
@@ -273,98 +551,241 @@ class PriorityJobQueue:
             "high_pending": len(self._high),
             "low_pending": len(self._low),
             "preempted": len(self._preempted),
-            "current_job": {
-                "id": self._current_job.id,
-                "priority": self._current_job.priority.value,
-            } if self._current_job else None,
+            "current_job": current_jobs[0] if current_jobs else None,
+            "current_jobs": current_jobs,
         }
 
     def compact_log(self) -> None:
-        """Rewrite log with only active jobs (removes completed entries)."""
+        """Rewrite the log as a single snapshot of the current state (blocking).
+
+        Normally compaction runs automatically in the background once the
+        log passes ``compact_after_ops`` entries or ``compact_after_bytes``.
+        """
         if not self._log_file.exists():
             return
-
-        # Collect current state
-        active_jobs: List[Job] = []
-        active_jobs.extend(self._critical)
-        active_jobs.extend(self._high)
-        active_jobs.extend(self._low)
-        active_jobs.extend(self._preempted)
-
-        # Write new compacted log
-        temp_file = self._storage_path / "queue.log.tmp"
-        with open(temp_file, "w") as f:
-            for job in active_jobs:
-                entry = {
-                    "op": "enqueue",
-                    "job": job.to_dict(),
-                    "ts": datetime.utcnow().isoformat(),
-                }
-                # If preempted, add that info
-                if job.preempted_state is not None:
-                    f.write(json.dumps(entry) + "\n")
-                    preempt_entry = {
-                        "op": "preempt",
-                        "job_id": job.id,
-                        "state": job.preempted_state,
-                        "ts": datetime.utcnow().isoformat(),
-                    }
-                    f.write(json.dumps(preempt_entry) + "\n")
-                else:
-                    f.write(json.dumps(entry) + "\n")
-            f.flush()
-            os.fsync(f.fileno())
-
-        # Atomic replace
-        temp_file.replace(self._log_file)
+        self._wal.replace([self._snapshot_entry()])
 
     @property
     def size(self) -> int:
         """Get total number of jobs waiting in queue."""
         return len(self._critical) + len(self._high) + len(self._low) + len(self._preempted)
 
-    # Backward compatibility methods for existing code
+    # Worker management
 
     def set_processor(self, processor: Callable) -> None:
-        """Set the job processor function."""
+        """Set the job processor function.
+
+        The processor is called as ``processor(job, worker_id)`` and returns
+        either a coroutine or a staged async generator (see ``_run_job``).
+        """
         self._processor = processor
 
-    async def start_worker(self) -> None:
-        """Start the background worker."""
+    def set_preempt_handler(self, handler: Optional[Callable]) -> None:
+        """Enable preemption of running jobs.
+
+        While a job runs, its worker watches for higher-priority arrivals
+        (see ``should_preempt``). When one needs the worker, the processor
+        task is cancelled, ``await handler(job, worker_id)`` stops the
+        backend work and returns the state to record (if any), and the job moves to
+        the preempted lane to be resumed later.
+        """
+        self._preempt_handler = handler
+
+    async def start_worker(self, num_workers: int = 1, num_backends: Optional[int] = None) -> None:
+        """Start background workers sharing this queue.
+
+        Worker N submits to backend ``N % num_backends``; by default there is
+        one worker per backend. More workers than backends pipeline jobs:
+        a backend's next prompt is queued while the current one renders.
+        """
         if self._running:
             return
         self._running = True
-        self._worker_task = asyncio.create_task(self._worker_loop())
+        self._num_backends = max(1, num_backends or num_workers)
+        self._worker_tasks = [
+            asyncio.create_task(self._worker_loop(worker_id))
+            for worker_id in range(num_workers)
+        ]
 
     async def stop_worker(self) -> None:
-        """Stop the background worker."""
+        """Stop all background workers and in-flight finalize stages."""
         self._running = False
-        if self._worker_task:
-            self._worker_task.cancel()
+        tasks = self._worker_tasks + list(self._finalize_tasks)
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
             try:
-                await self._worker_task
+                await task
             except asyncio.CancelledError:
                 pass
+        self._worker_tasks = []
+
+    async def close(self) -> None:
+        """Finish any running compaction, then flush and close the write-ahead log."""
+        if self._compact_task is not None:
+            await self._compact_task
+            self._compact_task = None
+        await self._wal.close()
+
+    @property
+    def num_workers(self) -> int:
+        """Number of running worker loops."""
+        return len(self._worker_tasks)
+
+    def _is_preemption_victim(self, worker_id: int) -> bool:
+        """Whether this worker should yield to a waiting higher-priority job.
+
+        Only when every worker is busy (an idle one will pick the job up),
+        and only the worker running the lowest-priority job, so a single
+        arrival claims one worker. Anything still ahead of it on that
+        worker's backend then yields via ``_is_blocking_backend``.
+        """
+        if len(self._current_jobs) < self.num_workers:
+            return False
+        victim = max(
+            self._current_jobs,
+            key=lambda w: (_PRIORITY_RANK[self._current_jobs[w].priority], w),
+        )
+        return victim == worker_id
+
+    def _is_blocking_backend(self, worker_id: int) -> bool:
+        """Whether a higher-priority job is queued behind this one on its backend.
+
+        With pipelining, an arrival is taken by an idle sibling worker and
+        submitted to the same backend, where it waits for this worker's
+        prompt; the pending lanes are then empty. Only jobs started before
+        the outranking one are held up by it, so resumed work that lands
+        behind it is left alone.
+        """
+        job = self._current_jobs.get(worker_id)
+        if job is None:
+            return False
+        backend = worker_id % self._num_backends
+        started = self._started.get(worker_id, -1)
+        return any(
+            other_id % self._num_backends == backend
+            and self._started.get(other_id, -1) > started
+            and _PRIORITY_RANK[other.priority] < _PRIORITY_RANK[job.priority]
+            for other_id, other in self._current_jobs.items()
+        )
+
+    async def _run_job(self, job: Job, worker_id: int) -> str:
+        """Run the processor for a job, preempting it if needed.
 
-    async def _worker_loop(self) -> None:
+        A processor is either a coroutine function (the whole job runs on
+        the worker) or returns an async generator that yields once its GPU
+        work is done. The rest of the generator - downloads, thumbnails, DB
+        writes - then runs as a background finalize stage, limited to
+        ``finalize_concurrency`` at a time, while the worker takes the next
+        job. Only the part before the yield can be preempted.
+
+        Returns ``"done"``, ``"preempted"`` (the job was requeued) or
+        ``"finalizing"`` (``complete`` is logged when finalize ends).
+        """
+        stages = self._processor(job, worker_id)
+        staged = inspect.isasyncgen(stages)
+
+        async def execute() -> bool:
+            """Run up to the stage boundary; True if a finalize stage follows."""
+            if not staged:
+                await stages
+                return False
+            try:
+                await stages.__anext__()
+            except StopAsyncIteration:
+                return False
+            return True
+
+        task = asyncio.create_task(execute())
+        if self._preempt_handler is None:
+            return await self._after_execute(job, stages, await task)
+
+        # Woken by outranking enqueues; the interval is only a fallback
+        wakeup = self._preempt_wakeups.setdefault(worker_id, asyncio.Event())
+        try:
+            while True:
+                wakeup.clear()
+                if self._is_blocking_backend(worker_id):
+                    break
+                if await self.should_preempt(worker_id) and self._is_preemption_victim(worker_id):
+                    break
+                waiter = asyncio.create_task(wakeup.wait())
+                try:
+                    await asyncio.wait(
+                        {task, waiter},
+                        timeout=self._preempt_check_interval,
+                        return_when=asyncio.FIRST_COMPLETED,
+                    )
+                finally:
+                    waiter.cancel()
+                if task.done():
+                    return await self._after_execute(job, stages, task.result())
+        except asyncio.CancelledError:
+            task.cancel()
+            raise
+
+        # Stop the processor first so it never observes the interrupted prompt
+        task.cancel()
+        try:
+            has_finalize = await task
+        except asyncio.CancelledError:
+            pass
+        else:
+            # Finished before the cancellation landed - nothing to preempt
+            return await self._after_execute(job, stages, has_finalize)
+
+        state = None
+        try:
+            state = await self._preempt_handler(job, worker_id)
+        except Exception as e:
+            print(f"Preempt handler error (worker {worker_id}): {e}")
+        await self.preempt_current(state, worker_id)
+        return "preempted"
+
+    async def _after_execute(self, job: Job, stages: Any, has_finalize: bool) -> str:
+        """Hand a job's finalize stage off to a background task, if it has one."""
+        if not has_finalize:
+            return "done"
+        # Backpressure: don't take more GPU work while finalize is saturated
+        await self._finalize_slots.acquire()
+        task = asyncio.create_task(self._finalize(job, stages))
+        self._finalize_tasks.add(task)
+        task.add_done_callback(self._finalize_tasks.discard)
+        return "finalizing"
+
+    async def _finalize(self, job: Job, stages: Any) -> None:
+        """Run a job's remaining stages, then mark it complete."""
+        try:
+            async for _ in stages:
+                pass
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Job finalize error ({job.id}): {e}")
+        finally:
+            self._finalize_slots.release()
+        await self.complete(job.id)
+
+    async def _worker_loop(self, worker_id: int = 0) -> None:
         """Background worker that processes jobs."""
         while self._running:
             try:
-                # Non-blocking check with small sleep
-                job = await self.dequeue()
-                if job:
-                    await self.set_current_job(job)
-                    if self._processor:
-                        try:
-                            await self._processor(job)
-                        finally:
+                job = await self.get()
+                await self.set_current_job(job, worker_id)
+                if self._processor:
+                    outcome = "done"
+                    try:
+                        outcome = await self._run_job(job, worker_id)
+                    finally:
+                        if outcome == "done":
                             await self.complete(job.id)
-                else:
-                    await asyncio.sleep(0.1)
+                        elif outcome == "finalizing":
+                            # Worker is free for the next job
+                            await self.clear_current_job(worker_id)
             except asyncio.CancelledError:
                 break
             except Exception as e:
-                print(f"Job processing error: {e}")
+                print(f"Job processing error (worker {worker_id}): {e}")
 
 
 # Global job queue instance - will be initialized with storage path
@@ -372,10 +793,13 @@ class PriorityJobQueue:
 job_queue: Optional[PriorityJobQueue] = None
 
 
-def init_job_queue(storage_path: Path) -> PriorityJobQueue:
-    """Initialize the global job queue with storage path."""
+def init_job_queue(storage_path: Path, **kwargs: Any) -> PriorityJobQueue:
+    """Initialize the global job queue with storage path.
+
+    Extra keyword arguments (durability settings) go to ``PriorityJobQueue``.
+    """
     global job_queue
-    job_queue = PriorityJobQueue(storage_path)
+    job_queue = PriorityJobQueue(storage_path, **kwargs)
     return job_queue
 
 
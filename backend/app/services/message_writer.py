@@ -0,0 +1,116 @@
+"""Write-behind persistence for streamed assistant messages.
+
+The assistant's message row is created when the first token arrives and
+its content is checkpointed while the rest stream in, so a client disconnect or a
+crash mid-stream keeps the partial answer instead of losing it. Chunks are
+buffered in a list (joined once per write, not concatenated per chunk),
+and each checkpoint is a single UPDATE run in the background, at most one
+at a time, so writes never hold up token delivery.
+
+The row is marked ``truncated`` until the stream finishes cleanly.
+"""
+import asyncio
+import time
+from typing import List, Optional
+
+from sqlalchemy import update
+
+from app.config import settings
+from app.database import get_db_session
+from app.models.chat import Message, MessageRole
+from app.services.blocking import run_blocking
+
+
+def _insert_message(conversation_id: str) -> str:
+    """Create an empty, truncated assistant message (blocking). Returns its ID."""
+    with get_db_session() as db:
+        message = Message(
+            conversation_id=conversation_id,
+            role=MessageRole.ASSISTANT,
+            content="",
+            truncated=True,
+        )
+        db.add(message)
+        db.flush()
+        return message.id
+
+
+def _write_message(message_id: str, content: str, truncated: bool) -> None:
+    """Overwrite a message's content in one statement (blocking)."""
+    with get_db_session() as db:
+        db.execute(
+            update(Message)
+            .where(Message.id == message_id)
+            .values(content=content, truncated=truncated)
+        )
+
+
+class StreamingMessageWriter:
+    """Persists an assistant message as it streams in."""
+
+    def __init__(self, conversation_id: str, checkpoint_interval_ms: Optional[float] = None):
+        """Initialize the writer.
+
+        Args:
+            conversation_id: Conversation the reply belongs to
+            checkpoint_interval_ms: Minimum time between checkpoints
+                (defaults to ``chat_checkpoint_interval_ms``)
+        """
+        if checkpoint_interval_ms is None:
+            checkpoint_interval_ms = settings.chat_checkpoint_interval_ms
+        self.conversation_id = conversation_id
+        self.message_id: Optional[str] = None
+        self._interval = checkpoint_interval_ms / 1000.0
+        self._chunks: List[str] = []
+        self._written = 0  # Chunks covered by the last checkpoint
+        self._last_checkpoint = 0.0
+        self._pending: Optional[asyncio.Task] = None
+
+        # Number of database writes issued (for tests)
+        self.write_count = 0
+
+    @property
+    def content(self) -> str:
+        return "".join(self._chunks)
+
+    async def start(self) -> str:
+        """Create the message row. Returns its ID."""
+        self.message_id = await run_blocking(_insert_message, self.conversation_id)
+        self.write_count += 1
+        self._last_checkpoint = time.monotonic()
+        return self.message_id
+
+    def append(self, chunk: str) -> None:
+        """Buffer a chunk, starting a background checkpoint when one is due."""
+        self._chunks.append(chunk)
+        now = time.monotonic()
+        if now - self._last_checkpoint < self._interval:
+            return
+        if self._pending is not None and not self._pending.done():
+            return  # The next due chunk checkpoints the backlog
+        self._last_checkpoint = now
+        self._pending = asyncio.create_task(self._checkpoint())
+
+    async def _checkpoint(self) -> None:
+        count = len(self._chunks)
+        if count == self._written:
+            return
+        await run_blocking(_write_message, self.message_id, "".join(self._chunks[:count]), True)
+        self.write_count += 1
+        self._written = count
+
+    async def finish(self, truncated: bool = False) -> None:
+        """Write the final content; ``truncated`` if the stream was cut short.
+
+        Creates the row first if no chunk ever started it.
+        """
+        if self.message_id is None:
+            await self.start()
+        if self._pending is not None:
+            try:
+                await self._pending
+            except Exception:
+                pass  # Superseded by the final write
+        await run_blocking(_write_message, self.message_id, self.content, truncated)
+        self.write_count += 1
+        self._written = len(self._chunks)
@@ -1,31 +1,68 @@
 import json
-from typing import List, Dict, Any, AsyncGenerator
-
-import httpx
+from dataclasses import asdict, dataclass
+from typing import List, Dict, Any, AsyncGenerator, Callable, Optional
 
 from app.config import settings
+from app.services.chat_context import context_window
+from app.services.http_pool import get_http_client, request_timeout
+
+
+@dataclass
+class ChatTimings:
+    """Per-turn timings reported by Ollama's native /api/chat."""
+    prompt_tokens: int
+    prompt_eval_ms: float  # Prompt processing (near zero on a KV cache hit)
+    completion_tokens: int
+    eval_ms: float  # Token generation
+    load_ms: float  # Model load (non-zero when the model was not resident)
+    total_ms: float
+
+    @classmethod
+    def from_response(cls, data: Dict[str, Any]) -> "ChatTimings":
+        """Build from the final ``done`` chunk (durations are in nanoseconds)."""
+        return cls(
+            prompt_tokens=data.get("prompt_eval_count", 0),
+            prompt_eval_ms=data.get("prompt_eval_duration", 0) / 1e6,
+            completion_tokens=data.get("eval_count", 0),
+            eval_ms=data.get("eval_duration", 0) / 1e6,
+            load_ms=data.get("load_duration", 0) / 1e6,
+            total_ms=data.get("total_duration", 0) / 1e6,
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        result = asdict(self)
+        result["tokens_per_second"] = (
+            self.completion_tokens / (self.eval_ms / 1000) if self.eval_ms else None
+        )
+        return result
 
 
 class OllamaClient:
-    """Client for interacting with Ollama's API."""
+    """Client for interacting with Ollama's API.
+
+    Chat goes through the OpenAI-compatible endpoint by default, or through
+    the native /api/chat when ``ollama_native_chat`` is set. The native API
+    pins the model in memory (``keep_alive``), runs it with the same context
+    window the prompt was budgeted for (``num_ctx``) and reports timings.
+    """
 
     def __init__(self):
         self.base_url = f"http://{settings.ollama_host}:{settings.ollama_port}"
 
     async def list_models(self) -> List[Dict[str, Any]]:
         """List available models from Ollama."""
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(f"{self.base_url}/api/tags")
-            response.raise_for_status()
-            data = response.json()
-            return data.get("models", [])
+        client = get_http_client()
+        response = await client.get(f"{self.base_url}/api/tags", timeout=request_timeout(10.0))
+        response.raise_for_status()
+        data = response.json()
+        return data.get("models", [])
 
     async def check_health(self) -> bool:
         """Check if Ollama server is responding."""
         try:
-            async with httpx.AsyncClient(timeout=5.0) as client:
-                response = await client.get(f"{self.base_url}/api/tags")
-                return response.status_code == 200
+            client = get_http_client()
+            response = await client.get(f"{self.base_url}/api/tags", timeout=request_timeout(5.0))
+            return response.status_code == 200
         except Exception:
             return False
 
@@ -44,20 +81,76 @@ class OllamaClient:
 
     async def pull_model(self, model: str) -> AsyncGenerator[Dict[str, Any], None]:
         """Pull a model from Ollama registry. Yields progress updates."""
-        async with httpx.AsyncClient(timeout=None) as client:
-            async with client.stream(
-                "POST",
-                f"{self.base_url}/api/pull",
-                json={"name": model, "stream": True},
-            ) as response:
-                response.raise_for_status()
-                async for line in response.aiter_lines():
-                    if line:
-                        try:
-                            data = json.loads(line)
-                            yield data
-                        except json.JSONDecodeError:
-                            continue
+        client = get_http_client()
+        async with client.stream(
+            "POST",
+            f"{self.base_url}/api/pull",
+            json={"name": model, "stream": True},
+            timeout=request_timeout(None),
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line:
+                    try:
+                        data = json.loads(line)
+                        yield data
+                    except json.JSONDecodeError:
+                        continue
+
+    @staticmethod
+    def _native_payload(
+        model: str,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        stream: bool,
+    ) -> Dict[str, Any]:
+        # Everything but the messages is identical across turns, so the
+        # prompt prefix (and Ollama's KV cache for it) carries over
+        return {
+            "model": model,
+            "messages": messages,
+            "stream": stream,
+            "keep_alive": settings.ollama_keep_alive,
+            "options": {
+                "temperature": temperature,
+                "num_predict": max_tokens,
+                "num_ctx": context_window(model),
+            },
+        }
+
+    async def _native_chat_stream(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        on_timings: Optional[Callable[[ChatTimings], None]],
+    ) -> AsyncGenerator[str, None]:
+        client = get_http_client()
+        async with client.stream(
+            "POST",
+            f"{self.base_url}/api/chat",
+            json=self._native_payload(model, messages, temperature, max_tokens, True),
+            timeout=request_timeout(300.0),
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                try:
+                    data = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if "error" in data:
+                    raise RuntimeError(data["error"])
+                content = data.get("message", {}).get("content", "")
+                if content:
+                    yield content
+                if data.get("done"):
+                    if on_timings:
+                        on_timings(ChatTimings.from_response(data))
+                    break
 
     async def chat_stream(
         self,
@@ -65,8 +158,20 @@ class OllamaClient:
         messages: List[Dict[str, str]],
         temperature: float = 0.7,
         max_tokens: int = 2048,
+        on_timings: Optional[Callable[[ChatTimings], None]] = None,
     ) -> AsyncGenerator[str, None]:
-        """Stream chat completion from Ollama using OpenAI-compatible API."""
+        """Stream chat completion from Ollama.
+
+        ``on_timings`` is called with the turn's timings once it finishes
+        (native API only).
+        """
+        if settings.ollama_native_chat:
+            async for content in self._native_chat_stream(
+                model, messages, temperature, max_tokens, on_timings
+            ):
+                yield content
+            return
+
         payload = {
             "model": model,
             "messages": messages,
@@ -75,26 +180,27 @@ class OllamaClient:
             "stream": True,
         }
 
-        async with httpx.AsyncClient(timeout=300.0) as client:
-            async with client.stream(
-                "POST",
-                f"{self.base_url}/v1/chat/completions",
-                json=payload,
-            ) as response:
-                response.raise_for_status()
-                async for line in response.aiter_lines():
-                    if line.startswith("data: "):
-                        data_str = line[6:]
-                        if data_str.strip() == "[DONE]":
-                            break
-                        try:
-                            data = json.loads(data_str)
-                            delta = data.get("choices", [{}])[0].get("delta", {})
-                            content = delta.get("content", "")
-                            if content:
-                                yield content
-                        except json.JSONDecodeError:
-                            continue
+        client = get_http_client()
+        async with client.stream(
+            "POST",
+            f"{self.base_url}/v1/chat/completions",
+            json=payload,
+            timeout=request_timeout(300.0),
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line.startswith("data: "):
+                    data_str = line[6:]
+                    if data_str.strip() == "[DONE]":
+                        break
+                    try:
+                        data = json.loads(data_str)
+                        delta = data.get("choices", [{}])[0].get("delta", {})
+                        content = delta.get("content", "")
+                        if content:
+                            yield content
+                    except json.JSONDecodeError:
+                        continue
 
     async def chat(
         self,
@@ -104,6 +210,16 @@ class OllamaClient:
         max_tokens: int = 2048,
     ) -> str:
         """Non-streaming chat completion."""
+        if settings.ollama_native_chat:
+            client = get_http_client()
+            response = await client.post(
+                f"{self.base_url}/api/chat",
+                json=self._native_payload(model, messages, temperature, max_tokens, False),
+                timeout=request_timeout(300.0),
+            )
+            response.raise_for_status()
+            return response.json()["message"]["content"]
+
         payload = {
             "model": model,
             "messages": messages,
@@ -112,14 +228,15 @@ class OllamaClient:
             "stream": False,
         }
 
-        async with httpx.AsyncClient(timeout=300.0) as client:
-            response = await client.post(
-                f"{self.base_url}/v1/chat/completions",
-                json=payload,
-            )
-            response.raise_for_status()
-            data = response.json()
-            return data["choices"][0]["message"]["content"]
+        client = get_http_client()
+        response = await client.post(
+            f"{self.base_url}/v1/chat/completions",
+            json=payload,
+            timeout=request_timeout(300.0),
+        )
+        response.raise_for_status()
+        data = response.json()
+        return data["choices"][0]["message"]["content"]
 
 
 # Global instance
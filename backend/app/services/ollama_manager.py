@@ -1,11 +1,11 @@
 import asyncio
 import json
 import logging
-from typing import Optional, AsyncGenerator, Dict, Any
-
-import httpx
+import time
+from typing import Optional, AsyncGenerator, Dict, Any, List
 
 from app.config import settings
+from app.services.http_pool import get_http_client, request_timeout
 
 logger = logging.getLogger(__name__)
 
@@ -21,6 +21,14 @@ class OllamaManager:
         self._progress_status: Optional[str] = None
         self._lock = asyncio.Lock()
 
+        # Cached /api/tags result, so is_ready() can answer without a round
+        # trip. None means unknown (never fetched, invalidated, or unreachable).
+        self._inventory: Optional[List[Dict[str, Any]]] = None
+        self._inventory_at = 0.0
+        self._inventory_refresh: Optional[asyncio.Task] = None
+        # Bumped on invalidation so fetches started before it are discarded
+        self._inventory_epoch = 0
+
     @property
     def base_url(self) -> str:
         return f"http://{settings.ollama_host}:{settings.ollama_port}"
@@ -40,35 +48,81 @@ class OllamaManager:
     async def check_server(self) -> bool:
         """Check if Ollama server is responding."""
         try:
-            async with httpx.AsyncClient(timeout=5.0) as client:
-                response = await client.get(f"{self.base_url}/api/tags")
-                return response.status_code == 200
+            client = get_http_client()
+            response = await client.get(f"{self.base_url}/api/tags", timeout=request_timeout(5.0))
+            return response.status_code == 200
         except Exception:
             return False
 
+    async def _fetch_inventory(self) -> List[Dict[str, Any]]:
+        """Fetch the local model list from Ollama and cache it.
+
+        The result is not cached if the inventory was invalidated while the
+        request was in flight (a pull or switch may have changed it).
+        """
+        epoch = self._inventory_epoch
+        client = get_http_client()
+        response = await client.get(f"{self.base_url}/api/tags", timeout=request_timeout(10.0))
+        response.raise_for_status()
+        models = response.json().get("models", [])
+        if epoch == self._inventory_epoch:
+            self._inventory = models
+            self._inventory_at = time.monotonic()
+        return models
+
+    async def _refresh_inventory(self) -> Optional[List[Dict[str, Any]]]:
+        """Refetch the inventory, forgetting it if Ollama is unreachable."""
+        try:
+            return await self._fetch_inventory()
+        except Exception as e:
+            logger.warning(f"Failed to refresh Ollama inventory: {e}")
+            self.invalidate_inventory()
+            return None
+
+    def invalidate_inventory(self) -> None:
+        """Forget the cached inventory; the next is_ready() refetches it."""
+        self._inventory = None
+        self._inventory_at = 0.0
+        self._inventory_epoch += 1
+
+    async def _cached_inventory(self) -> Optional[List[Dict[str, Any]]]:
+        """Get the inventory, fetching only when nothing is cached.
+
+        A cached inventory older than ``ollama_inventory_ttl`` is still
+        returned, but triggers a background refresh (stale-while-revalidate).
+        """
+        if self._inventory is None:
+            return await self._refresh_inventory()
+        age = time.monotonic() - self._inventory_at
+        if age > settings.ollama_inventory_ttl and (
+            self._inventory_refresh is None or self._inventory_refresh.done()
+        ):
+            self._inventory_refresh = asyncio.create_task(self._refresh_inventory())
+        return self._inventory
+
     async def list_models(self) -> list:
-        """List available models."""
+        """List available models (always asks Ollama; refreshes the cache)."""
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(f"{self.base_url}/api/tags")
-                response.raise_for_status()
-                data = response.json()
-                return data.get("models", [])
+            return await self._fetch_inventory()
         except Exception as e:
             logger.error(f"Failed to list models: {e}")
             return []
 
+    @staticmethod
+    def _model_in(model: str, models: List[Dict[str, Any]]) -> bool:
+        model_names = [m.get("name", "") for m in models]
+        # Check exact match or match with default tag
+        return (
+            model in model_names
+            or f"{model}:latest" in model_names
+            or any(m.split(":")[0] == model.split(":")[0] for m in model_names)
+        )
+
     async def has_model(self, model: str) -> bool:
         """Check if a model is available locally."""
         try:
             models = await self.list_models()
-            model_names = [m.get("name", "") for m in models]
-            # Check exact match or match with default tag
-            return (
-                model in model_names
-                or f"{model}:latest" in model_names
-                or any(m.split(":")[0] == model.split(":")[0] for m in model_names)
-            )
+            return self._model_in(model, models)
         except Exception:
             return False
 
@@ -80,26 +134,28 @@ class OllamaManager:
             self._status = "loading"
             self._error = None
             self._current_model = model
+            self.invalidate_inventory()
 
         try:
-            async with httpx.AsyncClient(timeout=None) as client:
-                async with client.stream(
-                    "POST",
-                    f"{self.base_url}/api/pull",
-                    json={"name": model, "stream": True},
-                ) as response:
-                    response.raise_for_status()
-                    async for line in response.aiter_lines():
-                        if line:
-                            try:
-                                data = json.loads(line)
-                                yield data
-                                # Check for completion
-                                if data.get("status") == "success":
-                                    async with self._lock:
-                                        self._status = "ready"
-                            except json.JSONDecodeError:
-                                continue
+            client = get_http_client()
+            async with client.stream(
+                "POST",
+                f"{self.base_url}/api/pull",
+                json={"name": model, "stream": True},
+                timeout=request_timeout(None),
+            ) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if line:
+                        try:
+                            data = json.loads(line)
+                            yield data
+                            # Check for completion
+                            if data.get("status") == "success":
+                                async with self._lock:
+                                    self._status = "ready"
+                        except json.JSONDecodeError:
+                            continue
 
             # Verify model was pulled successfully
             if await self.has_model(model):
@@ -128,6 +184,7 @@ class OllamaManager:
             self._status = "loading"
             self._error = None
             self._current_model = model_id
+            self.invalidate_inventory()
 
         try:
             # Check if server is available
@@ -141,13 +198,13 @@ class OllamaManager:
             if not await self.has_model(model_id):
                 logger.info(f"Model {model_id} not found locally, pulling...")
                 # Pull the model (non-streaming for switch)
-                async with httpx.AsyncClient(timeout=None) as client:
-                    response = await client.post(
-                        f"{self.base_url}/api/pull",
-                        json={"name": model_id, "stream": False},
-                        timeout=None,
-                    )
-                    response.raise_for_status()
+                client = get_http_client()
+                response = await client.post(
+                    f"{self.base_url}/api/pull",
+                    json={"name": model_id, "stream": False},
+                    timeout=request_timeout(None),
+                )
+                response.raise_for_status()
 
             # Verify model is available
             if await self.has_model(model_id):
@@ -169,15 +226,17 @@ class OllamaManager:
             return False
 
     async def is_ready(self) -> bool:
-        """Check if manager is ready to handle requests."""
-        # Always verify server is up and model exists
-        if not await self.check_server():
-            return False
+        """Check if manager is ready to handle requests.
 
+        Answered from the cached inventory when there is one, so the chat
+        hot path makes no extra round trips; otherwise one /api/tags call
+        checks both that the server is up and that the model exists.
+        """
         if not self._current_model:
             return False
 
-        if not await self.has_model(self._current_model):
+        models = await self._cached_inventory()
+        if models is None or not self._model_in(self._current_model, models):
             return False
 
         # Update status if we're ready but weren't marked as such
@@ -212,6 +271,7 @@ class OllamaManager:
             self._progress = None
             self._progress_status = None
             self._current_model = model_id
+            self.invalidate_inventory()
 
         try:
             # Check if server is available
@@ -225,33 +285,34 @@ class OllamaManager:
             # Check if model exists, if not pull it with progress
             if not await self.has_model(model_id):
                 logger.info(f"Model {model_id} not found locally, pulling...")
-                async with httpx.AsyncClient(timeout=None) as client:
-                    async with client.stream(
-                        "POST",
-                        f"{self.base_url}/api/pull",
-                        json={"name": model_id, "stream": True},
-                    ) as response:
-                        response.raise_for_status()
-                        async for line in response.aiter_lines():
-                            if line:
-                                try:
-                                    data = json.loads(line)
-                                    # Update progress from Ollama response
-                                    status_text = data.get("status", "")
-                                    completed = data.get("completed", 0)
-                                    total = data.get("total", 0)
-
-                                    async with self._lock:
-                                        self._progress_status = status_text
-                                        if total > 0:
-                                            self._progress = (completed / total) * 100
-
-                                    yield self.get_status()
-
-                                    if data.get("status") == "success":
-                                        break
-                                except json.JSONDecodeError:
-                                    continue
+                client = get_http_client()
+                async with client.stream(
+                    "POST",
+                    f"{self.base_url}/api/pull",
+                    json={"name": model_id, "stream": True},
+                    timeout=request_timeout(None),
+                ) as response:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        if line:
+                            try:
+                                data = json.loads(line)
+                                # Update progress from Ollama response
+                                status_text = data.get("status", "")
+                                completed = data.get("completed", 0)
+                                total = data.get("total", 0)
+
+                                async with self._lock:
+                                    self._progress_status = status_text
+                                    if total > 0:
+                                        self._progress = (completed / total) * 100
+
+                                yield self.get_status()
+
+                                if data.get("status") == "success":
+                                    break
+                            except json.JSONDecodeError:
+                                continue
 
             # Verify model is available
             if await self.has_model(model_id):
@@ -1,6 +1,8 @@
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
+from app.models.generation import Generation
 from app.models.portfolio import Portfolio
 from app.schemas.portfolio import PortfolioCreate, PortfolioUpdate, PortfolioResponse
 
@@ -12,9 +14,22 @@ class PortfolioService:
         self.db = db
 
     def list_all(self) -> List[PortfolioResponse]:
-        """List all portfolios."""
-        portfolios = self.db.query(Portfolio).order_by(Portfolio.updated_at.desc()).all()
-        return [PortfolioResponse(**p.to_dict()) for p in portfolios]
+        """List all portfolios with their image counts (a single query)."""
+        counts = (
+            self.db.query(
+                Generation.portfolio_id,
+                func.count(Generation.id).label("image_count"),
+            )
+            .group_by(Generation.portfolio_id)
+            .subquery()
+        )
+        rows = (
+            self.db.query(Portfolio, func.coalesce(counts.c.image_count, 0))
+            .outerjoin(counts, counts.c.portfolio_id == Portfolio.id)
+            .order_by(Portfolio.updated_at.desc())
+            .all()
+        )
+        return [PortfolioResponse(**p.to_dict(image_count=count)) for p, count in rows]
 
     def get(self, portfolio_id: str) -> Optional[PortfolioResponse]:
         """Get a portfolio by ID."""
@@ -0,0 +1,57 @@
+"""Stopping a preempted job on its ComfyUI backend.
+
+Used as the job queue's preempt handler: by the time it runs, the job's
+processor task has already been cancelled, so the prompt it submitted is
+left queued or executing in ComfyUI.
+
+ComfyUI can't continue a partly sampled prompt, so resuming a preempted
+job is a full restart: its generations go back to pending with no
+progress, and no ``preempted_state`` is recorded for it.
+"""
+from typing import List, Optional
+
+from app.database import get_db_session
+from app.models.generation import Generation, GenerationStatus
+from app.services.blocking import run_blocking
+from app.services.comfyui_client import ComfyUIClient
+from app.services.event_bus import event_bus
+from app.services.job_queue import Job
+
+
+def _job_generation_ids(job: Job) -> List[str]:
+    return job.params.get("batch_generation_ids") or [job.params["generation_id"]]
+
+
+def _reset_generations(generation_ids: List[str]) -> Optional[str]:
+    """Put a preempted job's generations back to pending (blocking).
+
+    Returns the ComfyUI prompt they were running.
+    """
+    with get_db_session() as db:
+        generations = db.query(Generation).filter(Generation.id.in_(generation_ids)).all()
+        prompt_id = next((g.comfyui_prompt_id for g in generations if g.comfyui_prompt_id), None)
+        for generation in generations:
+            if generation.status == GenerationStatus.PROCESSING:
+                generation.status = GenerationStatus.PENDING
+                generation.progress = 0
+    return prompt_id
+
+
+async def interrupt_job(job: Job, client: ComfyUIClient) -> None:
+    """Stop a preempted job's prompt in ComfyUI and requeue its generations.
+
+    The job is rerun from the start when it resumes.
+    """
+    generation_ids = _job_generation_ids(job)
+    prompt_id = await run_blocking(_reset_generations, generation_ids)
+
+    if prompt_id:
+        # Drop it if still waiting in ComfyUI's queue, stop it if running
+        await client.cancel_prompt(prompt_id)
+
+    for generation_id in generation_ids:
+        await event_bus.publish("generation.preempted", {
+            "id": generation_id,
+            "portfolio_id": job.params.get("portfolio_id"),
+            "status": "pending",
+        })
@@ -0,0 +1,86 @@
+"""Throttled progress reporting for running generations."""
+import time
+from typing import Optional
+
+from app.config import settings
+from app.database import get_db_session
+from app.models.generation import Generation
+from app.services.blocking import run_blocking
+from app.services.event_bus import event_bus
+
+
+def _write_progress(generation_id: str, percent: int) -> None:
+    with get_db_session() as db:
+        db.query(Generation).filter(Generation.id == generation_id).update(
+            {"progress": percent}, synchronize_session=False
+        )
+
+
+class ProgressReporter:
+    """Persists and publishes sampler progress for a generation.
+
+    ComfyUI reports every sampler step over its websocket. Updates are
+    throttled so ``Generation.progress`` is written and a
+    ``generation.progress`` event published at most once per interval
+    (the final step is always reported).
+    """
+
+    def __init__(
+        self,
+        generation_id: str,
+        portfolio_id: Optional[str] = None,
+        interval_ms: Optional[int] = None,
+    ):
+        self.generation_id = generation_id
+        self.portfolio_id = portfolio_id
+        if interval_ms is None:
+            interval_ms = settings.progress_update_interval_ms
+        self.interval = interval_ms / 1000.0
+        self._started_at: Optional[float] = None
+        self._start_value = 0
+        self._last_update: Optional[float] = None
+        self._last_percent = 0
+
+    def _eta_seconds(self, value: int, maximum: int, now: float) -> Optional[float]:
+        """Estimate remaining seconds from the step rate observed so far."""
+        steps_done = value - self._start_value
+        elapsed = now - self._started_at
+        if steps_done <= 0 or elapsed <= 0:
+            return None
+        return round((maximum - value) * elapsed / steps_done, 1)
+
+    async def __call__(self, value: int, maximum: int) -> None:
+        """Handle a (value, max) progress event from ComfyUI."""
+        if maximum <= 0:
+            return
+
+        now = time.monotonic()
+        if self._started_at is None:
+            self._started_at = now
+            self._start_value = value
+
+        percent = max(0, min(100, int(value * 100 / maximum)))
+        if percent <= self._last_percent:
+            return
+        is_final = value >= maximum
+        if (
+            not is_final
+            and self._last_update is not None
+            and now - self._last_update < self.interval
+        ):
+            return
+
+        self._last_update = now
+        self._last_percent = percent
+
+        await run_blocking(_write_progress, self.generation_id, percent)
+
+        await event_bus.publish("generation.progress", {
+            "id": self.generation_id,
+            "portfolio_id": self.portfolio_id,
+            "status": "processing",
+            "progress": percent,
+            "step": value,
+            "total_steps": maximum,
+            "eta_seconds": self._eta_seconds(value, maximum, now),
+        })
@@ -0,0 +1,68 @@
+"""Content-addressed cache of rendered generations.
+
+A prepared ComfyUI workflow fully determines its output: the same prompt,
+seed, sampler settings, checkpoint, LoRA and dimensions render the same
+image. Generations store a canonical hash of their prepared workflow, and
+a new generation whose hash matches a completed one is served by
+hard-linking that generation's files instead of rendering again.
+"""
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models.generation import Generation, GenerationStatus
+
+
+def workflow_hash(workflow: Dict[str, Any]) -> str:
+    """Canonical SHA-256 of a prepared workflow (key order independent)."""
+    canonical = json.dumps(workflow, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def find_cached(db: Session, key: str, exclude_id: Optional[str] = None) -> Optional[Generation]:
+    """Find the most recent completed generation rendered from the same workflow."""
+    query = db.query(Generation).filter(
+        Generation.workflow_hash == key,
+        Generation.status == GenerationStatus.COMPLETED,
+        Generation.image_path.isnot(None),
+        Generation.thumbnail_path.isnot(None),
+    )
+    if exclude_id:
+        query = query.filter(Generation.id != exclude_id)
+    return query.order_by(Generation.completed_at.desc()).first()
+
+
+def _link_or_copy(src: Path, dst: Path) -> None:
+    """Hard-link src to dst, falling back to a copy across filesystems."""
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    if dst.exists():
+        dst.unlink()
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def link_cached_files(
+    storage_path: Path, cached: Generation, generation_id: str
+) -> Optional[Tuple[str, str]]:
+    """Link a cached generation's image and thumbnail for a new generation.
+
+    Returns the new (image_path, thumbnail_path) relative to storage, or None
+    if the cached files no longer exist.
+    """
+    src_image = storage_path / cached.image_path
+    src_thumb = storage_path / cached.thumbnail_path
+    if not src_image.exists() or not src_thumb.exists():
+        return None
+
+    image_path = f"images/{generation_id}.webp"
+    thumbnail_path = f"images/{generation_id}_thumb.webp"
+    _link_or_copy(src_image, storage_path / image_path)
+    _link_or_copy(src_thumb, storage_path / thumbnail_path)
+    return image_path, thumbnail_path
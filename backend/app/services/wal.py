@@ -0,0 +1,240 @@
+"""Append-only JSONL write-ahead log with group commit.
+
+Every entry is written and flushed to the OS as soon as it is appended, so
+a process crash never loses an acknowledged op. What the durability mode
+controls is when ``fsync`` runs, which is what survives power loss:
+
+- ``strict``: fsync after every append (one fsync per op).
+- ``group``: appends wait for the next shared fsync, which runs in a
+  thread so the event loop keeps serving. Ops issued while a sync is
+  pending or in flight are committed together, so concurrent callers pay
+  for one fsync between them.
+- ``periodic``: appends return immediately; dirty data is fsynced on a
+  timer, risking at most one interval of ops on power loss.
+"""
+import asyncio
+import json
+import os
+from enum import Enum
+from pathlib import Path
+from typing import Any, Dict, List, Optional, TextIO
+
+
+class DurabilityMode(str, Enum):
+    """When appended log entries are fsynced."""
+    STRICT = "strict"
+    GROUP = "group"
+    PERIODIC = "periodic"
+
+
+class WriteAheadLog:
+    """Append-only JSONL log file kept open between writes."""
+
+    def __init__(
+        self,
+        path: Path,
+        mode: DurabilityMode = DurabilityMode.GROUP,
+        group_window_ms: float = 0.0,
+        sync_interval_ms: float = 1000.0,
+    ):
+        """Initialize the log.
+
+        Args:
+            path: Log file (created on first append)
+            mode: Durability mode (see module docstring)
+            group_window_ms: How long a group commit waits for more ops to join
+                (0 syncs on the next event loop iteration)
+            sync_interval_ms: fsync interval in periodic mode
+        """
+        self.path = Path(path)
+        self.mode = DurabilityMode(mode)
+        self.group_window = group_window_ms / 1000.0
+        self.sync_interval = sync_interval_ms / 1000.0
+
+        self._file: Optional[TextIO] = None
+        # Files replaced by rotate() that may still hold unsynced writes
+        self._retired: List[TextIO] = []
+        self._dirty = False
+        self._waiters: List[asyncio.Future] = []
+        self._sync_task: Optional[asyncio.Task] = None
+        # Lines appended while a background compaction writes the new file
+        self._capture: Optional[List[str]] = None
+        # Lines whose append() hasn't returned yet, by append order. The
+        # caller applies an op to its in-memory state only after append()
+        # returns, so a snapshot taken meanwhile doesn't include these yet.
+        self._in_flight: Dict[int, str] = {}
+        self._append_seq = 0
+
+        # Size of the log and entries appended since it was last rewritten,
+        # used by callers to decide when to compact
+        self.size_bytes = self.path.stat().st_size if self.path.exists() else 0
+        self.entry_count = 0
+
+        # Number of fsyncs issued (for benchmarks and tests)
+        self.fsync_count = 0
+
+    def _write(self, entry: Dict[str, Any]) -> str:
+        """Write one entry and hand it to the OS (survives a process crash)."""
+        if self._file is None:
+            self._file = open(self.path, "a")
+        line = json.dumps(entry) + "\n"
+        self._file.write(line)
+        self._file.flush()
+        self.size_bytes += len(line)
+        self.entry_count += 1
+        if self._capture is not None:
+            self._capture.append(line)
+        return line
+
+    def _sync_files(self, files: List[TextIO]) -> None:
+        """fsync files (blocking)."""
+        for f in files:
+            os.fsync(f.fileno())
+            self.fsync_count += 1
+
+    async def append(self, entry: Dict[str, Any]) -> None:
+        """Append an entry, returning once it is as durable as the mode promises."""
+        line = self._write(entry)
+
+        if self.mode == DurabilityMode.STRICT:
+            self._sync_files([self._file])
+            return
+
+        self._dirty = True
+        if self.mode == DurabilityMode.PERIODIC:
+            self._ensure_sync_task()
+            return
+
+        self._append_seq += 1
+        seq = self._append_seq
+        self._in_flight[seq] = line
+        try:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            self._ensure_sync_task()
+            await waiter
+        finally:
+            del self._in_flight[seq]
+
+    def _ensure_sync_task(self) -> None:
+        if self._sync_task is None or self._sync_task.done():
+            self._sync_task = asyncio.create_task(self._sync_loop())
+
+    async def _sync_loop(self) -> None:
+        """Background fsync: group commits, or a timer in periodic mode."""
+        delay = self.sync_interval if self.mode == DurabilityMode.PERIODIC else self.group_window
+        while self._dirty:
+            await asyncio.sleep(delay)
+
+            # Everything written so far is covered by this sync; later appends
+            # mark the log dirty again and join the next round
+            waiters, self._waiters = self._waiters, []
+            retired, self._retired = self._retired, []
+            files = retired + ([self._file] if self._file else [])
+            self._dirty = False
+
+            try:
+                await asyncio.to_thread(self._sync_files, files)
+            except Exception as e:
+                for waiter in waiters:
+                    if not waiter.done():
+                        waiter.set_exception(e)
+            else:
+                for waiter in waiters:
+                    if not waiter.done():
+                        waiter.set_result(None)
+            finally:
+                for f in retired:
+                    f.close()
+
+    def rotate(self) -> None:
+        """Stop writing to the current file; the next append reopens ``path``.
+
+        Call after atomically replacing the log file (e.g. compaction).
+        Unsynced writes to the old file are still synced before it is closed.
+        """
+        if self._file is None:
+            return
+        old, self._file = self._file, None
+        if self._dirty:
+            self._retired.append(old)
+        else:
+            old.close()
+
+    @staticmethod
+    def _write_file(path: Path, lines: List[str]) -> None:
+        """Write and fsync a complete file (blocking)."""
+        with open(path, "w") as f:
+            f.writelines(lines)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _swap_in(self, temp_file: Path, entry_count: int) -> None:
+        """Atomically replace the log with ``temp_file`` and start appending to it."""
+        temp_file.replace(self.path)
+        self.rotate()
+        self.size_bytes = self.path.stat().st_size
+        self.entry_count = entry_count
+
+    def replace(self, entries: List[Dict[str, Any]]) -> None:
+        """Atomically rewrite the log as ``entries`` (blocking)."""
+        self.sync()
+        temp_file = self.path.with_name(self.path.name + ".tmp")
+        self._write_file(temp_file, [json.dumps(e) + "\n" for e in entries])
+        self._swap_in(temp_file, len(entries))
+
+    async def compact(self, entries: List[Dict[str, Any]]) -> None:
+        """Rewrite the log as ``entries`` without blocking appends.
+
+        ``entries`` must describe the state as of the call. The new file is
+        serialized and fsynced in a thread while appends keep going to the
+        current file; entries appended meanwhile are copied over before the
+        new file atomically replaces the old one. So are entries whose
+        append() is still waiting for its fsync, since the caller hasn't
+        applied them to the state yet (replaying an op that did make it into
+        the snapshot is harmless: replay is idempotent).
+        """
+        if self._capture is not None:
+            return
+        self._capture = list(self._in_flight.values())
+        temp_file = self.path.with_name(self.path.name + ".tmp")
+        try:
+            await asyncio.to_thread(
+                lambda: self._write_file(temp_file, [json.dumps(e) + "\n" for e in entries])
+            )
+            tail = self._capture
+            with open(temp_file, "a") as f:
+                f.writelines(tail)
+                f.flush()
+                os.fsync(f.fileno())
+        finally:
+            captured, self._capture = self._capture, None
+        self._swap_in(temp_file, len(entries) + len(captured))
+
+    def sync(self) -> None:
+        """Synchronously fsync everything written so far (blocking)."""
+        files = self._retired + ([self._file] if self._file else [])
+        self._sync_files(files)
+        self._dirty = False
+        for f in self._retired:
+            f.close()
+        self._retired = []
+        waiters, self._waiters = self._waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    async def close(self) -> None:
+        """Flush outstanding syncs and close the file."""
+        if self._sync_task is not None and not self._sync_task.done():
+            if self.mode == DurabilityMode.PERIODIC:
+                self._sync_task.cancel()
+            try:
+                await self._sync_task
+            except asyncio.CancelledError:
+                pass
+        self._sync_task = None
+        self.sync()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,93 @@
+"""Chat context assembly cost as conversations grow: full history vs budgeted tail.
+
+Seeds conversations of increasing length into a temporary SQLite database
+and times building the next turn's prompt two ways: loading every message
+through the ``Conversation.messages`` relationship (the old behaviour), and
+``build_context`` reading only the tail that fits the token budget. Also
+reports the prompt size each would send, which is what drives Ollama's
+prompt-processing time (and so time-to-first-token).
+
+Usage (from backend/):
+    python -m benchmarks.bench_chat_context [--lengths 100 1000 10000]
+"""
+import argparse
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401  (register tables)
+from app.database import Base
+from app.models.chat import Conversation, Message, MessageRole
+from app.services.chat_context import build_context, context_budget, message_tokens
+
+TURN = "Tell me more about the lighting in that scene and how to adjust it. " * 3
+
+
+def seed(db, length: int) -> str:
+    conversation = Conversation(model="llama3.2:1b")
+    db.add(conversation)
+    db.flush()
+    start = datetime(2026, 1, 1)
+    db.bulk_insert_mappings(Message, [
+        {
+            "id": f"{conversation.id[:8]}-{i:08d}",
+            "conversation_id": conversation.id,
+            "role": MessageRole.USER if i % 2 == 0 else MessageRole.ASSISTANT,
+            "content": TURN,
+            "created_at": start + timedelta(seconds=i),
+        }
+        for i in range(length)
+    ])
+    db.commit()
+    return conversation.id
+
+
+def full_history(db, conversation_id: str):
+    conversation = db.get(Conversation, conversation_id)
+    return [{"role": m.role.value, "content": m.content} for m in conversation.messages]
+
+
+def timed(fn, repeats: int):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main(lengths, repeats: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{Path(tmp) / 'bench.db'}")
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+
+        print(f"budget {context_budget('llama3.2:1b')} tokens, best of {repeats}")
+        print(
+            f"{'messages':>9}{'full ms':>10}{'full tok':>10}"
+            f"{'budgeted ms':>13}{'budgeted tok':>14}"
+        )
+        for length in lengths:
+            with Session() as db:
+                conversation_id = seed(db, length)
+            with Session() as db:
+                full_s, full = timed(lambda: full_history(db, conversation_id), repeats)
+                db.expire_all()
+            with Session() as db:
+                tail_s, tail = timed(lambda: build_context(db, conversation_id), repeats)
+            print(
+                f"{length:>9}{full_s * 1000:>10.1f}{sum(map(message_tokens, full)):>10}"
+                f"{tail_s * 1000:>13.2f}{sum(map(message_tokens, tail)):>14}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lengths", type=int, nargs="+", default=[100, 1000, 10000, 50000])
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+    main(args.lengths, args.repeats)
@@ -0,0 +1,129 @@
+"""Chat time-to-first-token with per-call HTTP clients vs the shared pool.
+
+Runs the chat endpoint's Ollama path - ``ollama_manager.is_ready()`` then
+``ollama_client.chat_stream()`` - against a local fake Ollama server that
+answers ``/api/tags`` and streams completions with keep-alive. "per-call"
+reproduces the old behaviour of a fresh ``httpx.AsyncClient`` (and TCP
+connection) per request; "pooled" uses ``get_http_client()``. Reports the
+time from the start of the request until the first token arrives.
+
+Usage (from backend/):
+    python -m benchmarks.bench_chat_ttft [--requests 200]
+"""
+import argparse
+import asyncio
+import json
+import time
+from unittest.mock import patch
+
+import httpx
+
+from app.config import settings
+from app.services import http_pool
+from app.services.ollama_client import OllamaClient
+from app.services.ollama_manager import OllamaManager
+
+MODEL = "llama3.2:1b"
+TAGS = json.dumps({"models": [{"name": MODEL}]}).encode()
+
+
+async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """Minimal HTTP/1.1 keep-alive server mimicking Ollama."""
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            method, path, _ = request_line.decode().split(" ", 2)
+            length = 0
+            while (line := await reader.readline()) not in (b"\r\n", b""):
+                name, _, value = line.decode().partition(":")
+                if name.lower() == "content-length":
+                    length = int(value)
+            if length:
+                await reader.readexactly(length)
+
+            if path == "/api/tags":
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    b"Content-Length: %d\r\n\r\n" % len(TAGS) + TAGS
+                )
+            else:
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+                    b"Transfer-Encoding: chunked\r\n\r\n"
+                )
+                for token in ("Hello", " there", "[DONE]"):
+                    if token == "[DONE]":
+                        event = b"data: [DONE]\n\n"
+                    else:
+                        delta = {"choices": [{"delta": {"content": token}}]}
+                        event = b"data: " + json.dumps(delta).encode() + b"\n\n"
+                    writer.write(b"%x\r\n%s\r\n" % (len(event), event))
+                writer.write(b"0\r\n\r\n")
+            await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def ttft(manager: OllamaManager, client: OllamaClient) -> float:
+    start = time.perf_counter()
+    assert await manager.is_ready()
+    async for _ in client.chat_stream(MODEL, [{"role": "user", "content": "Hi"}]):
+        return time.perf_counter() - start
+    raise RuntimeError("no tokens")
+
+
+async def run(pooled: bool, requests: int) -> list:
+    manager = OllamaManager()
+    manager._current_model = MODEL
+    client = OllamaClient()
+    opened = []
+
+    def per_call_client() -> httpx.AsyncClient:
+        opened.append(httpx.AsyncClient(timeout=300.0))
+        return opened[-1]
+
+    factory = http_pool.get_http_client if pooled else per_call_client
+    samples = []
+    with patch("app.services.ollama_manager.get_http_client", factory), \
+            patch("app.services.ollama_client.get_http_client", factory):
+        for _ in range(requests):
+            samples.append(await ttft(manager, client))
+            for c in opened:
+                await c.aclose()
+            opened.clear()
+    await http_pool.close_http_client()
+    return samples
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def main(requests: int) -> None:
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    settings.ollama_host = "127.0.0.1"
+    settings.ollama_port = server.sockets[0].getsockname()[1]
+
+    print(f"{requests} chat requests (is_ready + stream to first token)")
+    print(f"{'mode':<10}{'p50 ms':>10}{'p99 ms':>10}{'mean ms':>10}")
+    async with server:
+        for pooled in (False, True):
+            samples = await run(pooled, requests)
+            mode = "pooled" if pooled else "per-call"
+            print(
+                f"{mode:<10}{percentile(samples, 50) * 1000:>10.2f}"
+                f"{percentile(samples, 99) * 1000:>10.2f}"
+                f"{sum(samples) / len(samples) * 1000:>10.2f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests))
@@ -0,0 +1,72 @@
+"""Event bus publish cost with many subscribers: broadcast vs topic-filtered.
+
+Opens ``--subscribers`` subscriptions spread over ``--portfolios`` portfolios
+and publishes a stream of progress/completed events for generations in
+random portfolios. Compares every subscriber receiving everything (no
+filters, the old behaviour) against each subscriber filtering on its own
+portfolio, where the bus only visits the subscribers indexed under the
+event's portfolio. Subscribers never read, as with a browser tab that
+discards most of what it's sent, so broadcast also pays for queue overflow.
+
+Usage (from backend/):
+    python -m benchmarks.bench_event_fanout [--subscribers 1000] [--events 5000]
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from app.services.event_bus import EventBus
+
+
+def make_events(count: int, portfolios: int):
+    rng = random.Random(0)
+    events = []
+    for i in range(count):
+        portfolio_id = f"p{rng.randrange(portfolios)}"
+        event_type = "generation.completed" if i % 10 == 9 else "generation.progress"
+        events.append((event_type, {
+            "id": f"g{i // 10}",
+            "portfolio_id": portfolio_id,
+            "status": "processing",
+            "progress": (i % 10) * 10,
+        }))
+    return events
+
+
+async def run(filtered: bool, subscribers: int, portfolios: int, events) -> tuple:
+    bus = EventBus(queue_size=256)
+    subscriptions = [
+        bus.subscribe(portfolio_ids=[f"p{i % portfolios}"] if filtered else None)
+        for i in range(subscribers)
+    ]
+
+    start = time.perf_counter()
+    for event_type, data in events:
+        await bus.publish(event_type, data)
+    elapsed = time.perf_counter() - start
+
+    for subscription in subscriptions:
+        bus.unsubscribe(subscription.id)
+    return elapsed, bus.deliveries
+
+
+async def main(subscribers: int, portfolios: int, count: int) -> None:
+    events = make_events(count, portfolios)
+    print(f"{subscribers} subscribers, {portfolios} portfolios, {count} events")
+    print(f"{'mode':>10}{'total ms':>11}{'us/event':>11}{'deliveries':>12}")
+    for mode, filtered in (("broadcast", False), ("filtered", True)):
+        elapsed, deliveries = await run(filtered, subscribers, portfolios, events)
+        print(
+            f"{mode:>10}{elapsed * 1000:>11.1f}"
+            f"{elapsed * 1e6 / count:>11.1f}{deliveries:>12}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--subscribers", type=int, default=1000)
+    parser.add_argument("--portfolios", type=int, default=100)
+    parser.add_argument("--events", type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(main(args.subscribers, args.portfolios, args.events))
@@ -0,0 +1,111 @@
+"""API latency while generation jobs finalize.
+
+Finalizes N large images (write + LANCZOS thumbnail + WEBP encode) either
+inline on the event loop (the old behaviour) or through ``run_blocking``,
+while a client issues requests against a trivial FastAPI endpoint on the
+same loop. Reports request latency percentiles for each mode; with
+``run_blocking`` p99 should stay close to the idle baseline.
+
+Usage (from backend/):
+    python -m benchmarks.bench_event_loop [--jobs 8] [--size 2048]
+"""
+import argparse
+import asyncio
+import io
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+from fastapi import FastAPI
+from PIL import Image
+
+from app.services.blocking import run_blocking, shutdown_executor
+from app.services.generation_service import _save_image_files
+
+
+def make_image(size: int) -> bytes:
+    """Build a PNG similar in weight to a ComfyUI upscale result."""
+    img = Image.merge("RGB", [Image.effect_noise((size, size), 64) for _ in range(3)])
+    buf = io.BytesIO()
+    img.save(buf, "PNG")
+    return buf.getvalue()
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def probe(client: httpx.AsyncClient, stop: asyncio.Event, latencies: list) -> None:
+    """Issue requests on a fixed 5ms schedule.
+
+    Latency is measured from the scheduled send time, so time spent waiting
+    for a blocked loop counts against the request (no coordinated omission).
+    """
+    interval = 0.005
+    scheduled = time.perf_counter()
+    while not stop.is_set():
+        await client.get("/ping")
+        now = time.perf_counter()
+        latencies.append((now - scheduled) * 1000)
+        scheduled += interval
+        if scheduled > now:
+            await asyncio.sleep(scheduled - now)
+
+
+async def run_mode(mode: str, jobs: int, image_bytes: bytes, workdir: Path) -> list:
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    latencies: list = []
+    stop = asyncio.Event()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        probe_task = asyncio.create_task(probe(client, stop, latencies))
+        await asyncio.sleep(0.2)
+
+        async def finalize(i: int) -> None:
+            image_path = workdir / f"{mode}_{i}.webp"
+            thumb_path = workdir / f"{mode}_{i}_thumb.webp"
+            if mode == "inline":
+                _save_image_files(image_bytes, image_path, thumb_path)
+            elif mode == "run_blocking":
+                await run_blocking(_save_image_files, image_bytes, image_path, thumb_path)
+            await asyncio.sleep(0)
+
+        await asyncio.gather(*(finalize(i) for i in range(jobs)))
+        await asyncio.sleep(0.2)
+        stop.set()
+        await probe_task
+    return latencies
+
+
+async def main(jobs: int, size: int) -> None:
+    image_bytes = make_image(size)
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        print(f"{jobs} jobs finalizing {size}x{size} images")
+        print(f"{'mode':<14}{'requests':>10}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+        for mode in ("idle", "inline", "run_blocking"):
+            latencies = await run_mode(mode, jobs, image_bytes, workdir)
+            print(
+                f"{mode:<14}{len(latencies):>10}"
+                f"{statistics.median(latencies):>10.2f}"
+                f"{percentile(latencies, 99):>10.2f}"
+                f"{max(latencies):>10.2f}"
+            )
+    shutdown_executor()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=8)
+    parser.add_argument("--size", type=int, default=2048)
+    args = parser.parse_args()
+    asyncio.run(main(args.jobs, args.size))
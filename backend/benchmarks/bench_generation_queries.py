@@ -0,0 +1,162 @@
+"""Hot generation queries on a 1M-row portfolio, with and without the composite indexes.
+
+Seeds a temporary SQLite database with one large portfolio (``--rows``
+generations, mostly completed txt2img with a share of animations) next to
+``--other-rows`` generations spread over other portfolios, then times the
+query shapes the API and auto-animation run: a newest-first listing page,
+the animation listing, the auto-animate counts, animations of one source
+image and a lookup by ID. The same queries are timed again after dropping
+the ``ix_generations_*`` indexes, which is the schema before they existed.
+
+Usage (from backend/):
+    python -m benchmarks.bench_generation_queries [--rows 1000000]
+"""
+import argparse
+import random
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401  (register tables)
+from app.database import Base
+from app.models.generation import Generation, GenerationStatus
+from app.services.generation_service import GenerationService
+
+INDEXES = [
+    "ix_generations_created",
+    "ix_generations_portfolio_created",
+    "ix_generations_portfolio_type_status",
+    "ix_generations_source",
+]
+
+
+def seed(engine, portfolio_id: str, rows: int, other_rows: int) -> str:
+    """Insert the generations. Returns the ID of a (likely animated) source image."""
+    rng = random.Random(0)
+    start = datetime(2025, 1, 1)
+    others = [str(uuid.uuid4()) for _ in range(20)]
+    sources = []
+
+    def row(i: int, portfolio: str):
+        roll = rng.random()
+        if roll < 0.03 and sources:
+            kind, status, source = "animate", "COMPLETED", rng.choice(sources)
+        elif roll < 0.05:
+            kind, status, source = "txt2img", "FAILED", None
+        else:
+            kind, status, source = "txt2img", "COMPLETED", None
+        generation_id = str(uuid.uuid4())
+        if kind == "txt2img" and status == "COMPLETED" and len(sources) < 1000:
+            sources.append(generation_id)
+        return (
+            generation_id, portfolio, kind, "a lighthouse at dusk", status,
+            f"images/{generation_id}.webp", source, start + timedelta(seconds=i),
+        )
+
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "INSERT INTO portfolios (id, name, created_at, updated_at) VALUES "
+            + ", ".join(["(?, 'p', ?, ?)"] * (len(others) + 1)),
+            tuple(v for p in [portfolio_id, *others] for v in (p, start, start)),
+        )
+        batch = []
+        for i in range(rows + other_rows):
+            portfolio = portfolio_id if i < rows else others[i % len(others)]
+            batch.append(row(i, portfolio))
+            if len(batch) == 50_000:
+                insert(conn, batch)
+                batch = []
+        insert(conn, batch)
+    return sources[0]
+
+
+def insert(conn, batch) -> None:
+    if batch:
+        conn.exec_driver_sql(
+            "INSERT INTO generations (id, portfolio_id, generation_type, prompt, status,"
+            " image_path, source_generation_id, created_at, width, height, steps,"
+            " cfg_scale, sampler, scheduler, progress)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1024, 1024, 30, 5.5, 'dpmpp_2m', 'karras', 100)",
+            batch,
+        )
+
+
+def queries(db, portfolio_id: str, source_id: str):
+    service = GenerationService(db)
+    return {
+        "listing page": lambda: (
+            db.query(Generation)
+            .filter(Generation.portfolio_id == portfolio_id)
+            .order_by(Generation.created_at.desc(), Generation.id.desc())
+            .limit(50)
+            .all()
+        ),
+        "animations": lambda: service.list_animations(portfolio_id),
+        "auto-animate counts": lambda: service.should_auto_animate(portfolio_id),
+        "source animations": lambda: (
+            db.query(Generation)
+            .filter(
+                Generation.source_generation_id == source_id,
+                Generation.status == GenerationStatus.COMPLETED,
+            )
+            .all()
+        ),
+        "by id": lambda: service.get(source_id),
+    }
+
+
+def timed(fn, repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(Session, portfolio_id: str, source_id: str, repeats: int):
+    results = {}
+    with Session() as db:
+        for name, fn in queries(db, portfolio_id, source_id).items():
+            results[name] = timed(fn, repeats)
+            db.expunge_all()
+    return results
+
+
+def main(rows: int, other_rows: int, repeats: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{Path(tmp) / 'bench.db'}")
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+
+        portfolio_id = str(uuid.uuid4())
+        start = time.perf_counter()
+        source_id = seed(engine, portfolio_id, rows, other_rows)
+        print(
+            f"seeded {rows} + {other_rows} generations in "
+            f"{time.perf_counter() - start:.1f}s, best of {repeats}"
+        )
+
+        indexed = run(Session, portfolio_id, source_id, repeats)
+        with engine.begin() as conn:
+            for name in INDEXES:
+                conn.execute(text(f"DROP INDEX {name}"))
+        unindexed = run(Session, portfolio_id, source_id, repeats)
+
+        print(f"{'query':>20}{'no index ms':>14}{'indexed ms':>13}")
+        for name in indexed:
+            print(f"{name:>20}{unindexed[name] * 1000:>14.1f}{indexed[name] * 1000:>13.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--other-rows", type=int, default=200_000)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+    main(args.rows, args.other_rows, args.repeats)
@@ -0,0 +1,98 @@
+"""CRITICAL job time-to-start under mixed load, with and without preemption.
+
+One worker drains a backlog of long LOW jobs (stand-ins for SVD
+animations) and a trickle of HIGH jobs, while CRITICAL jobs (interactive
+inpaints) arrive at random intervals. Job bodies are ``asyncio.sleep`` calls
+so they can be cancelled like a real processor; the preempt handler sleeps
+briefly to stand in for the ComfyUI interrupt round trip. Reports
+enqueue-to-start latency of the CRITICAL jobs.
+
+Usage (from backend/):
+    python -m benchmarks.bench_preemption [--low-seconds 3] [--criticals 10]
+"""
+import argparse
+import asyncio
+import random
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from app.services.job_queue import Job, JobPriority, JobType, PriorityJobQueue
+
+DURATIONS = {JobPriority.CRITICAL: 0.2, JobPriority.HIGH: 0.5}
+
+
+def make_job(job_id: str, priority: JobPriority) -> Job:
+    return Job(
+        id=job_id,
+        job_type=JobType.GENERATION,
+        priority=priority,
+        params={},
+        created_at=datetime.utcnow().isoformat(),
+    )
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run(preemption: bool, low_seconds: float, criticals: int, workdir: Path):
+    queue = PriorityJobQueue(workdir, preempt_check_interval_ms=250)
+    enqueued_at = {}
+    waits = []
+
+    async def processor(job, worker_id):
+        if job.priority == JobPriority.CRITICAL and job.id not in waits:
+            waits.append(time.perf_counter() - enqueued_at[job.id])
+        await asyncio.sleep(DURATIONS.get(job.priority, low_seconds))
+
+    async def handler(job, worker_id):
+        await asyncio.sleep(0.02)
+        return {"preempted_at": datetime.utcnow().isoformat()}
+
+    queue.set_processor(processor)
+    if preemption:
+        queue.set_preempt_handler(handler)
+
+    for i in range(criticals * 2):
+        await queue.enqueue(make_job(f"low-{i}", JobPriority.LOW))
+    await queue.start_worker()
+
+    rng = random.Random(42)
+    for i in range(criticals):
+        await asyncio.sleep(rng.uniform(0.5, 1.5))
+        if i % 3 == 0:
+            await queue.enqueue(make_job(f"high-{i}", JobPriority.HIGH))
+        job = make_job(f"crit-{i}", JobPriority.CRITICAL)
+        enqueued_at[job.id] = time.perf_counter()
+        await queue.enqueue(job)
+
+    while len(waits) < criticals:
+        await asyncio.sleep(0.05)
+    await queue.stop_worker()
+    await queue.close()
+    return waits
+
+
+async def main(low_seconds: float, criticals: int) -> None:
+    print(f"LOW jobs of {low_seconds}s, {criticals} CRITICAL arrivals")
+    print(f"{'mode':<14}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for preemption in (False, True):
+        with tempfile.TemporaryDirectory() as tmp:
+            waits = await run(preemption, low_seconds, criticals, Path(tmp))
+        mode = "preemption" if preemption else "no preemption"
+        print(
+            f"{mode:<14}{percentile(waits, 50) * 1000:>10.0f}"
+            f"{percentile(waits, 99) * 1000:>10.0f}{max(waits) * 1000:>10.0f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--low-seconds", type=float, default=3.0)
+    parser.add_argument("--criticals", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.low_seconds, args.criticals))
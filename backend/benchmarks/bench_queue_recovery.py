@@ -0,0 +1,89 @@
+"""Job queue startup time: full log replay vs snapshot + tail.
+
+Writes a queue.log holding N historic ops (finished jobs going through
+enqueue/dequeue/set_current/complete) plus a small pending backlog, then
+times ``PriorityJobQueue`` startup replaying the whole log, and again after
+compaction has collapsed it into a snapshot followed by a short tail of
+new ops.
+
+Usage (from backend/):
+    python -m benchmarks.bench_queue_recovery [--ops 1000000] [--pending 100]
+"""
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from app.services.job_queue import Job, JobPriority, JobType, PriorityJobQueue
+
+
+def make_job(job_id: str, priority: JobPriority = JobPriority.HIGH) -> Job:
+    return Job(
+        id=job_id,
+        job_type=JobType.GENERATION,
+        priority=priority,
+        params={"generation_id": job_id},
+        created_at=datetime.utcnow().isoformat(),
+    )
+
+
+def write_history(log_file: Path, ops: int, pending: int) -> None:
+    ts = datetime.utcnow().isoformat()
+
+    def line(entry: dict) -> str:
+        return json.dumps({**entry, "ts": ts}) + "\n"
+
+    with open(log_file, "w") as f:
+        for i in range(ops // 4):
+            job_id = f"done-{i}"
+            f.write(line({"op": "enqueue", "job": make_job(job_id).to_dict()}))
+            f.write(line({"op": "dequeue", "job_id": job_id}))
+            f.write(line({"op": "set_current", "job_id": job_id, "worker": 0}))
+            f.write(line({"op": "complete", "job_id": job_id}))
+        for i in range(pending):
+            f.write(line({"op": "enqueue", "job": make_job(f"pending-{i}").to_dict()}))
+
+
+def time_startup(workdir: Path) -> tuple:
+    start = time.perf_counter()
+    queue = PriorityJobQueue(workdir, compact_after_ops=0, compact_after_bytes=0)
+    return time.perf_counter() - start, queue
+
+
+async def main(ops: int, pending: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        log_file = workdir / "queue.log"
+        write_history(log_file, ops, pending)
+        size_mb = log_file.stat().st_size / 1e6
+        print(f"{ops} historic ops + {pending} pending jobs, log {size_mb:.0f} MB")
+
+        elapsed, queue = time_startup(workdir)
+        assert queue.size == pending
+        print(f"{'full replay':<22}{elapsed * 1000:>10.0f} ms")
+
+        # Compact, then add some new activity as the tail (CRITICAL so the
+        # pending backlog is left alone)
+        queue.compact_log()
+        for i in range(100):
+            job = make_job(f"tail-{i}", JobPriority.CRITICAL)
+            await queue.enqueue(job)
+            await queue.dequeue()
+            await queue.complete(job.id)
+        await queue.close()
+
+        elapsed, queue = time_startup(workdir)
+        assert queue.size == pending
+        print(f"{'snapshot + tail':<22}{elapsed * 1000:>10.0f} ms"
+              f"   (log {log_file.stat().st_size / 1e3:.0f} kB)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ops", type=int, default=1_000_000)
+    parser.add_argument("--pending", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(main(args.ops, args.pending))
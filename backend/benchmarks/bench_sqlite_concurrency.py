@@ -0,0 +1,156 @@
+"""API read latency while job workers commit: default SQLite vs WAL + pragmas.
+
+Seeds a temporary database with a portfolio of generations, then for a
+fixed duration runs ``--writers`` threads that complete jobs the way the
+queue workers do (progress writes, then a completion commit per job) while
+``--readers`` threads fetch the portfolio's first listing page, as the
+gallery does on every SSE event. Runs once on a plain engine (rollback
+journal, the old setup) and once on ``create_db_engine`` (WAL,
+synchronous=NORMAL, busy_timeout, cache and mmap), and reports read
+latency percentiles, throughput and "database is locked" errors.
+
+Usage (from backend/):
+    python -m benchmarks.bench_sqlite_concurrency [--seconds 5] [--readers 4] [--writers 2]
+"""
+import argparse
+import statistics
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401  (register tables)
+from app.database import Base, create_db_engine
+from app.models.generation import Generation, GenerationStatus
+from app.models.portfolio import Portfolio
+from app.services.generation_service import GenerationService
+
+
+def seed(Session, rows: int) -> str:
+    with Session() as db:
+        portfolio = Portfolio(name="Bench")
+        db.add(portfolio)
+        db.flush()
+        start = datetime(2026, 1, 1)
+        db.add_all(
+            Generation(
+                portfolio_id=portfolio.id,
+                prompt="a lighthouse at dusk",
+                status=GenerationStatus.COMPLETED,
+                image_path="images/x.webp",
+                created_at=start + timedelta(seconds=i),
+            )
+            for i in range(rows)
+        )
+        db.commit()
+        return portfolio.id
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run(engine, args) -> dict:
+    Session = sessionmaker(bind=engine)
+    Base.metadata.create_all(engine)
+    portfolio_id = seed(Session, args.rows)
+
+    stop = threading.Event()
+    latencies = []
+    stats = {"writes": 0, "reads": 0, "errors": 0}
+    lock = threading.Lock()
+
+    def writer() -> None:
+        while not stop.is_set():
+            try:
+                with Session() as db:
+                    generation = Generation(portfolio_id=portfolio_id, prompt="new")
+                    db.add(generation)
+                    db.commit()
+                    for percent in (25, 50, 75):
+                        generation.progress = percent
+                        db.commit()
+                    generation.status = GenerationStatus.COMPLETED
+                    generation.image_path = f"images/{uuid.uuid4()}.webp"
+                    generation.completed_at = datetime.utcnow()
+                    db.commit()
+                with lock:
+                    stats["writes"] += 5
+            except OperationalError:
+                with lock:
+                    stats["errors"] += 1
+
+    def reader() -> None:
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                with Session() as db:
+                    GenerationService(db).list_page(portfolio_id, limit=50)
+            except OperationalError:
+                with lock:
+                    stats["errors"] += 1
+                continue
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                stats["reads"] += 1
+
+    threads = [threading.Thread(target=writer) for _ in range(args.writers)]
+    threads += [threading.Thread(target=reader) for _ in range(args.readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+
+    return {
+        "reads/s": stats["reads"] / args.seconds,
+        "writes/s": stats["writes"] / args.seconds,
+        "p50 ms": statistics.median(latencies) * 1000 if latencies else float("nan"),
+        "p99 ms": percentile(latencies, 99) * 1000 if latencies else float("nan"),
+        "max ms": max(latencies) * 1000 if latencies else float("nan"),
+        "locked": stats["errors"],
+    }
+
+
+def main(args) -> None:
+    print(
+        f"{args.readers} readers, {args.writers} writers, {args.rows} rows, "
+        f"{args.seconds}s per run"
+    )
+    columns = ["reads/s", "writes/s", "p50 ms", "p99 ms", "max ms", "locked"]
+    print(f"{'engine':>10}" + "".join(f"{c:>11}" for c in columns))
+    with tempfile.TemporaryDirectory() as tmp:
+        engines = {
+            "default": create_engine(
+                f"sqlite:///{Path(tmp) / 'default.db'}",
+                connect_args={"check_same_thread": False},
+            ),
+            "tuned": create_db_engine(f"sqlite:///{Path(tmp) / 'tuned.db'}"),
+        }
+        for name, engine in engines.items():
+            result = run(engine, args)
+            print(f"{name:>10}" + "".join(
+                f"{result[c]:>11.1f}" if isinstance(result[c], float) else f"{result[c]:>11}"
+                for c in columns
+            ))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--rows", type=int, default=5000)
+    args = parser.parse_args()
+    main(args)
@@ -584,3 +584,146 @@ class TestAnimationEndpoints:
 
         routes = [route.path for route in router.routes]
         assert "/portfolios/{portfolio_id}/animations" in routes
+
+
+# Phase 5: Processing Tests
+
+
+def _png_bytes(color=(200, 100, 50), size=(64, 32)) -> bytes:
+    import io
+    from PIL import Image
+
+    buf = io.BytesIO()
+    Image.new("RGB", size, color=color).save(buf, "PNG")
+    return buf.getvalue()
+
+
+class TestAnimationFrameStreaming:
+    """Tests for concurrent frame download and streamed encoding."""
+
+    @pytest.mark.asyncio
+    async def test_download_frames_bounded_and_in_order(self, tmp_path):
+        """Frames download concurrently up to the limit but yield in order."""
+        import asyncio
+        from app.services.animation_processor import _download_frames
+
+        in_flight = 0
+        max_in_flight = 0
+
+        class FakeClient:
+            async def get_image(self, filename, subfolder=""):
+                nonlocal in_flight, max_in_flight
+                in_flight += 1
+                max_in_flight = max(max_in_flight, in_flight)
+                # Later frames finish first
+                await asyncio.sleep(0.01 * (10 - int(filename.split("_")[1])))
+                in_flight -= 1
+                return filename.encode()
+
+        output_dir = tmp_path / "comfyui-output"
+        output_dir.mkdir()
+        images = []
+        for i in range(10):
+            (output_dir / f"frame_{i}").write_bytes(b"x")
+            images.append({"filename": f"frame_{i}", "subfolder": ""})
+
+        frames = [
+            frame async for frame in _download_frames(FakeClient(), images, tmp_path, 3)
+        ]
+
+        assert frames == [f"frame_{i}".encode() for i in range(10)]
+        assert max_in_flight == 3
+        assert list(output_dir.iterdir()) == []
+
+    @pytest.mark.asyncio
+    async def test_download_frames_failure_settles_other_fetches(self, tmp_path):
+        """A failed fetch cancels and awaits the remaining downloads."""
+        import asyncio
+        from app.services.animation_processor import _download_frames
+
+        cancelled = []
+
+        class FakeClient:
+            async def get_image(self, filename, subfolder=""):
+                if filename == "frame_0":
+                    raise RuntimeError("fetch failed")
+                try:
+                    await asyncio.sleep(10)
+                except asyncio.CancelledError:
+                    cancelled.append(filename)
+                    raise
+                return filename.encode()
+
+        images = [{"filename": f"frame_{i}", "subfolder": ""} for i in range(3)]
+
+        with pytest.raises(RuntimeError, match="fetch failed"):
+            async for _ in _download_frames(FakeClient(), images, tmp_path, 3):
+                pass
+
+        assert sorted(cancelled) == ["frame_1", "frame_2"]
+
+    def test_thumbnail_from_first_frame(self, tmp_path):
+        """Thumbnail is built from the first frame, with a placeholder fallback."""
+        from PIL import Image
+        from app.services.animation_processor import AnimationProcessor
+
+        processor = AnimationProcessor(tmp_path)
+
+        thumb = processor._create_thumbnail_from_frame("gen1", _png_bytes(size=(1024, 576)))
+        with Image.open(tmp_path / thumb) as img:
+            assert img.size == (256, 144)
+
+        fallback = processor._create_thumbnail_from_frame("gen2", None)
+        with Image.open(tmp_path / fallback) as img:
+            assert img.size == (256, 256)
+
+    @pytest.mark.asyncio
+    @pytest.mark.skipif(
+        __import__("shutil").which("ffmpeg") is None, reason="ffmpeg not installed"
+    )
+    async def test_create_video_from_stream(self, tmp_path):
+        """Frames piped into ffmpeg should produce an mp4."""
+        from app.services.animation_processor import AnimationProcessor
+
+        processor = AnimationProcessor(tmp_path)
+
+        async def frames():
+            for i in range(8):
+                yield _png_bytes(color=(i * 30, 0, 0))
+
+        video_path = await processor._create_video_from_stream("gen1", frames(), fps=8)
+
+        assert (tmp_path / video_path).stat().st_size > 0
+        assert not (tmp_path / "temp_frames").exists()
+
+    @pytest.mark.asyncio
+    async def test_create_video_reports_ffmpeg_error_on_broken_pipe(self, tmp_path):
+        """If ffmpeg exits early, its stderr is surfaced instead of the pipe error."""
+        from unittest.mock import AsyncMock, MagicMock, patch
+        from app.services.animation_processor import AnimationProcessor
+
+        processor = AnimationProcessor(tmp_path)
+
+        process = MagicMock()
+        process.returncode = None
+        process.stdin.drain = AsyncMock(side_effect=BrokenPipeError())
+        process.stderr.read = AsyncMock(return_value=b"Invalid data found when processing input")
+
+        async def wait():
+            process.returncode = 1
+            return 1
+
+        process.wait = wait
+
+        async def frames():
+            yield b"not an image"
+
+        with patch(
+            "app.services.animation_processor.asyncio.create_subprocess_exec",
+            AsyncMock(return_value=process),
+        ):
+            with pytest.raises(RuntimeError, match="Invalid data found") as exc_info:
+                await processor._create_video_from_stream("gen1", frames(), fps=8)
+
+        assert isinstance(exc_info.value.__cause__, BrokenPipeError)
+        process.kill.assert_not_called()
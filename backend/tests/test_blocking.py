@@ -0,0 +1,44 @@
+"""Tests for the blocking-work thread pool."""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.services.blocking import run_blocking
+
+
+class TestRunBlocking:
+    """Tests for run_blocking."""
+
+    @pytest.mark.asyncio
+    async def test_runs_off_the_event_loop_thread(self):
+        """Blocking callables should execute on a pool thread."""
+        thread_name = await run_blocking(lambda: threading.current_thread().name)
+        assert thread_name != threading.current_thread().name
+        assert thread_name.startswith("folio-blocking")
+
+    @pytest.mark.asyncio
+    async def test_passes_args_and_propagates_errors(self):
+        """Arguments are forwarded and exceptions re-raised in the caller."""
+        assert await run_blocking(pow, 2, 10) == 1024
+        assert await run_blocking(int, "ff", base=16) == 255
+
+        with pytest.raises(ValueError):
+            await run_blocking(int, "not-a-number")
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_waits_for_the_call(self):
+        """Cancellation only lands once the thread is done with the caller's state."""
+        finished = threading.Event()
+
+        def slow():
+            time.sleep(0.1)
+            finished.set()
+
+        task = asyncio.create_task(run_blocking(slow))
+        await asyncio.sleep(0.02)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert finished.is_set()
@@ -1,3 +1,6 @@
+import asyncio
+import time
+
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
 
@@ -6,6 +9,7 @@ from app.services.ollama_client import OllamaClient
 from app.services.ollama_manager import OllamaManager
 from app.models.chat import MessageRole
 from app.schemas.chat import ConversationCreate, ConversationUpdate
+from tests.conftest import recorded_statements
 
 
 class TestChatService:
@@ -42,6 +46,24 @@ class TestChatService:
 
         assert result == []
 
+    def test_list_conversations_counts_messages_in_constant_queries(self, db_session):
+        """Message counts come from one GROUP BY, not per-conversation loads."""
+        service = ChatService(db_session)
+        ids = [
+            service.create_conversation(ConversationCreate(model="m")).id
+            for _ in range(8)
+        ]
+        for i, conversation_id in enumerate(ids):
+            for _ in range(i):
+                service.add_message(conversation_id, MessageRole.USER, "hi")
+        db_session.expunge_all()
+
+        with recorded_statements() as statements:
+            result = service.list_conversations(limit=10)
+
+        assert len(statements) == 2
+        assert sorted(c.message_count for c in result) == list(range(8))
+
     def test_list_conversations(self, db_session):
         """Test listing conversations."""
         service = ChatService(db_session)
@@ -269,14 +291,12 @@ class TestOllamaClient:
         """Test health check when server is responding."""
         client = OllamaClient()
 
-        with patch("httpx.AsyncClient") as mock_client_class:
+        with patch("app.services.ollama_client.get_http_client") as mock_get_client:
             mock_client = AsyncMock()
             mock_response = MagicMock()
             mock_response.status_code = 200
             mock_client.get = AsyncMock(return_value=mock_response)
-            mock_client.__aenter__ = AsyncMock(return_value=mock_client)
-            mock_client.__aexit__ = AsyncMock(return_value=None)
-            mock_client_class.return_value = mock_client
+            mock_get_client.return_value = mock_client
 
             result = await client.check_health()
 
@@ -287,12 +307,10 @@ class TestOllamaClient:
         """Test health check when server is not responding."""
         client = OllamaClient()
 
-        with patch("httpx.AsyncClient") as mock_client_class:
+        with patch("app.services.ollama_client.get_http_client") as mock_get_client:
             mock_client = AsyncMock()
             mock_client.get = AsyncMock(side_effect=Exception("Connection refused"))
-            mock_client.__aenter__ = AsyncMock(return_value=mock_client)
-            mock_client.__aexit__ = AsyncMock(return_value=None)
-            mock_client_class.return_value = mock_client
+            mock_get_client.return_value = mock_client
 
             result = await client.check_health()
 
@@ -303,14 +321,12 @@ class TestOllamaClient:
         """Test health check with non-200 response."""
         client = OllamaClient()
 
-        with patch("httpx.AsyncClient") as mock_client_class:
+        with patch("app.services.ollama_client.get_http_client") as mock_get_client:
             mock_client = AsyncMock()
             mock_response = MagicMock()
             mock_response.status_code = 500
             mock_client.get = AsyncMock(return_value=mock_response)
-            mock_client.__aenter__ = AsyncMock(return_value=mock_client)
-            mock_client.__aexit__ = AsyncMock(return_value=None)
-            mock_client_class.return_value = mock_client
+            mock_get_client.return_value = mock_client
 
             result = await client.check_health()
 
@@ -327,15 +343,13 @@ class TestOllamaClient:
             ]
         }
 
-        with patch("httpx.AsyncClient") as mock_client_class:
+        with patch("app.services.ollama_client.get_http_client") as mock_get_client:
             mock_client = AsyncMock()
             mock_response = MagicMock()
             mock_response.json.return_value = mock_response_data
             mock_response.raise_for_status = MagicMock()
             mock_client.get = AsyncMock(return_value=mock_response)
-            mock_client.__aenter__ = AsyncMock(return_value=mock_client)
-            mock_client.__aexit__ = AsyncMock(return_value=None)
-            mock_client_class.return_value = mock_client
+            mock_get_client.return_value = mock_client
 
             result = await client.list_models()
 
@@ -349,15 +363,13 @@ class TestOllamaClient:
 
         mock_response_data = {"models": []}
 
-        with patch("httpx.AsyncClient") as mock_client_class:
+        with patch("app.services.ollama_client.get_http_client") as mock_get_client:
             mock_client = AsyncMock()
             mock_response = MagicMock()
             mock_response.json.return_value = mock_response_data
             mock_response.raise_for_status = MagicMock()
             mock_client.get = AsyncMock(return_value=mock_response)
-            mock_client.__aenter__ = AsyncMock(return_value=mock_client)
-            mock_client.__aexit__ = AsyncMock(return_value=None)
-            mock_client_class.return_value = mock_client
+            mock_get_client.return_value = mock_client
 
             result = await client.list_models()
 
@@ -372,15 +384,13 @@ class TestOllamaClient:
             "models": [{"name": "llama3.2:1b"}]
         }
 
-        with patch("httpx.AsyncClient") as mock_client_class:
+        with patch("app.services.ollama_client.get_http_client") as mock_get_client:
             mock_client = AsyncMock()
             mock_response = MagicMock()
             mock_response.json.return_value = mock_response_data
             mock_response.raise_for_status = MagicMock()
             mock_client.get = AsyncMock(return_value=mock_response)
-            mock_client.__aenter__ = AsyncMock(return_value=mock_client)
-            mock_client.__aexit__ = AsyncMock(return_value=None)
-            mock_client_class.return_value = mock_client
+            mock_get_client.return_value = mock_client
 
             result = await client.has_model("llama3.2:1b")
 
@@ -395,15 +405,13 @@ class TestOllamaClient:
             "models": [{"name": "llama3.2:1b"}]
         }
 
-        with patch("httpx.AsyncClient") as mock_client_class:
+        with patch("app.services.ollama_client.get_http_client") as mock_get_client:
             mock_client = AsyncMock()
             mock_response = MagicMock()
             mock_response.json.return_value = mock_response_data
             mock_response.raise_for_status = MagicMock()
             mock_client.get = AsyncMock(return_value=mock_response)
-            mock_client.__aenter__ = AsyncMock(return_value=mock_client)
-            mock_client.__aexit__ = AsyncMock(return_value=None)
-            mock_client_class.return_value = mock_client
+            mock_get_client.return_value = mock_client
 
             result = await client.has_model("mistral:7b")
 
@@ -420,7 +428,7 @@ class TestOllamaClient:
             yield 'data: {"choices":[{"delta":{"content":" world"}}]}'
             yield "data: [DONE]"
 
-        with patch("httpx.AsyncClient") as mock_client_class:
+        with patch("app.services.ollama_client.get_http_client") as mock_get_client:
             mock_client = AsyncMock()
             mock_response = MagicMock()
             mock_response.raise_for_status = MagicMock()
@@ -428,9 +436,7 @@ class TestOllamaClient:
             mock_response.__aenter__ = AsyncMock(return_value=mock_response)
             mock_response.__aexit__ = AsyncMock(return_value=None)
             mock_client.stream = MagicMock(return_value=mock_response)
-            mock_client.__aenter__ = AsyncMock(return_value=mock_client)
-            mock_client.__aexit__ = AsyncMock(return_value=None)
-            mock_client_class.return_value = mock_client
+            mock_get_client.return_value = mock_client
 
             chunks = []
             async for chunk in client.chat_stream(
@@ -440,6 +446,50 @@ class TestOllamaClient:
 
             assert chunks == ["Hello", " world"]
 
+    @pytest.mark.asyncio
+    async def test_native_chat_stream(self):
+        """Native /api/chat pins keep_alive/num_ctx and reports timings."""
+        client = OllamaClient()
+
+        async def mock_aiter_lines():
+            yield '{"message":{"role":"assistant","content":"Hello"},"done":false}'
+            yield '{"message":{"role":"assistant","content":" world"},"done":false}'
+            yield (
+                '{"message":{"role":"assistant","content":""},"done":true,'
+                '"prompt_eval_count":12,"prompt_eval_duration":3000000,'
+                '"eval_count":2,"eval_duration":40000000,'
+                '"load_duration":0,"total_duration":50000000}'
+            )
+
+        with patch("app.services.ollama_client.settings.ollama_native_chat", True), \
+                patch("app.services.ollama_client.get_http_client") as mock_get_client:
+            mock_client = AsyncMock()
+            mock_response = MagicMock()
+            mock_response.raise_for_status = MagicMock()
+            mock_response.aiter_lines = mock_aiter_lines
+            mock_response.__aenter__ = AsyncMock(return_value=mock_response)
+            mock_response.__aexit__ = AsyncMock(return_value=None)
+            mock_client.stream = MagicMock(return_value=mock_response)
+            mock_get_client.return_value = mock_client
+
+            timings = []
+            chunks = []
+            async for chunk in client.chat_stream(
+                "model", [{"role": "user", "content": "Hi"}], on_timings=timings.append
+            ):
+                chunks.append(chunk)
+
+            assert chunks == ["Hello", " world"]
+            args, kwargs = mock_client.stream.call_args
+            assert args[1].endswith("/api/chat")
+            payload = kwargs["json"]
+            assert payload["keep_alive"]
+            assert payload["options"]["num_ctx"] > 0
+            assert payload["options"]["num_predict"] == 2048
+            assert timings[0].prompt_tokens == 12
+            assert timings[0].prompt_eval_ms == 3.0
+            assert timings[0].to_dict()["tokens_per_second"] == 50.0
+
     @pytest.mark.asyncio
     async def test_chat_stream_empty_content(self):
         """Test streaming handles empty content chunks."""
@@ -450,7 +500,7 @@ class TestOllamaClient:
             yield 'data: {"choices":[{"delta":{"content":"text"}}]}'
             yield "data: [DONE]"
 
-        with patch("httpx.AsyncClient") as mock_client_class:
+        with patch("app.services.ollama_client.get_http_client") as mock_get_client:
             mock_client = AsyncMock()
             mock_response = MagicMock()
             mock_response.raise_for_status = MagicMock()
@@ -458,9 +508,7 @@ class TestOllamaClient:
             mock_response.__aenter__ = AsyncMock(return_value=mock_response)
             mock_response.__aexit__ = AsyncMock(return_value=None)
             mock_client.stream = MagicMock(return_value=mock_response)
-            mock_client.__aenter__ = AsyncMock(return_value=mock_client)
-            mock_client.__aexit__ = AsyncMock(return_value=None)
-            mock_client_class.return_value = mock_client
+            mock_get_client.return_value = mock_client
 
             chunks = []
             async for chunk in client.chat_stream(
@@ -479,15 +527,13 @@ class TestOllamaClient:
             "choices": [{"message": {"content": "Hello, how can I help?"}}]
         }
 
-        with patch("httpx.AsyncClient") as mock_client_class:
+        with patch("app.services.ollama_client.get_http_client") as mock_get_client:
             mock_client = AsyncMock()
             mock_response = MagicMock()
             mock_response.json.return_value = mock_response_data
             mock_response.raise_for_status = MagicMock()
             mock_client.post = AsyncMock(return_value=mock_response)
-            mock_client.__aenter__ = AsyncMock(return_value=mock_client)
-            mock_client.__aexit__ = AsyncMock(return_value=None)
-            mock_client_class.return_value = mock_client
+            mock_get_client.return_value = mock_client
 
             result = await client.chat(
                 "model", [{"role": "user", "content": "Hello"}]
@@ -533,14 +579,12 @@ class TestOllamaManager:
         """Test server check when Ollama is responding."""
         manager = OllamaManager()
 
-        with patch("httpx.AsyncClient") as mock_client_class:
+        with patch("app.services.ollama_manager.get_http_client") as mock_get_client:
             mock_client = AsyncMock()
             mock_response = MagicMock()
             mock_response.status_code = 200
             mock_client.get = AsyncMock(return_value=mock_response)
-            mock_client.__aenter__ = AsyncMock(return_value=mock_client)
-            mock_client.__aexit__ = AsyncMock(return_value=None)
-            mock_client_class.return_value = mock_client
+            mock_get_client.return_value = mock_client
 
             result = await manager.check_server()
 
@@ -551,12 +595,10 @@ class TestOllamaManager:
         """Test server check when Ollama is down."""
         manager = OllamaManager()
 
-        with patch("httpx.AsyncClient") as mock_client_class:
+        with patch("app.services.ollama_manager.get_http_client") as mock_get_client:
             mock_client = AsyncMock()
             mock_client.get = AsyncMock(side_effect=Exception("Connection refused"))
-            mock_client.__aenter__ = AsyncMock(return_value=mock_client)
-            mock_client.__aexit__ = AsyncMock(return_value=None)
-            mock_client_class.return_value = mock_client
+            mock_get_client.return_value = mock_client
 
             result = await manager.check_server()
 
@@ -617,14 +659,97 @@ class TestOllamaManager:
         manager._status = "ready"
         manager._current_model = "llama3.2:1b"
 
-        with patch.object(manager, "check_server", new_callable=AsyncMock) as mock_check:
-            with patch.object(manager, "has_model", new_callable=AsyncMock) as mock_has:
-                mock_check.return_value = True
-                mock_has.return_value = True
+        with patch.object(manager, "_fetch_inventory", new_callable=AsyncMock) as mock_fetch:
+            mock_fetch.return_value = [{"name": "llama3.2:1b"}]
 
-                result = await manager.is_ready()
+            result = await manager.is_ready()
 
-                assert result is True
+            assert result is True
+
+    @pytest.mark.asyncio
+    async def test_is_ready_uses_cached_inventory(self):
+        """A fresh cached inventory answers is_ready without calling Ollama."""
+        manager = OllamaManager()
+        manager._current_model = "llama3.2:1b"
+
+        with patch.object(manager, "_fetch_inventory", new_callable=AsyncMock) as mock_fetch:
+            async def fetch():
+                manager._inventory = [{"name": "llama3.2:1b"}]
+                manager._inventory_at = time.monotonic()
+                return manager._inventory
+
+            mock_fetch.side_effect = fetch
+            assert await manager.is_ready() is True
+            assert await manager.is_ready() is True
+            assert await manager.is_ready() is True
+
+            assert mock_fetch.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_is_ready_refreshes_stale_inventory_in_background(self):
+        """A stale inventory is still used, with a refresh kicked off behind it."""
+        manager = OllamaManager()
+        manager._current_model = "llama3.2:1b"
+        manager._inventory = [{"name": "llama3.2:1b"}]
+        manager._inventory_at = time.monotonic() - 3600
+
+        with patch.object(manager, "_fetch_inventory", new_callable=AsyncMock) as mock_fetch:
+            mock_fetch.return_value = []
+
+            assert await manager.is_ready() is True
+            await manager._inventory_refresh
+
+            mock_fetch.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_invalidation_discards_in_flight_refresh(self):
+        """A refresh started before an invalidation must not restore its stale list."""
+        manager = OllamaManager()
+        manager._current_model = "llama3.2:1b"
+        manager._inventory = [{"name": "llama3.2:1b"}]
+        manager._inventory_at = time.monotonic() - 3600
+        release = asyncio.Event()
+
+        async def get(url, timeout):
+            await release.wait()
+            response = MagicMock()
+            response.json.return_value = {"models": [{"name": "llama3.2:1b"}]}
+            return response
+
+        http = MagicMock()
+        http.get = get
+        with patch("app.services.ollama_manager.get_http_client", return_value=http):
+            assert await manager.is_ready() is True
+            await asyncio.sleep(0)  # Refresh request now in flight
+            manager.invalidate_inventory()
+            release.set()
+            await manager._inventory_refresh
+
+        assert manager._inventory is None
+
+    @pytest.mark.asyncio
+    async def test_is_ready_false_when_unreachable(self):
+        """No cache and no server means not ready, and nothing is cached."""
+        manager = OllamaManager()
+        manager._current_model = "llama3.2:1b"
+
+        with patch.object(manager, "_fetch_inventory", new_callable=AsyncMock) as mock_fetch:
+            mock_fetch.side_effect = Exception("Connection refused")
+
+            assert await manager.is_ready() is False
+            assert manager._inventory is None
+
+    @pytest.mark.asyncio
+    async def test_switch_model_invalidates_inventory(self):
+        """Switching models drops the cached inventory."""
+        manager = OllamaManager()
+        manager._inventory = [{"name": "llama3.2:1b"}]
+
+        with patch.object(manager, "check_server", new_callable=AsyncMock) as mock_check:
+            mock_check.return_value = False
+            await manager.switch_model("mistral:7b")
+
+        assert manager._inventory is None
 
     @pytest.mark.asyncio
     async def test_switch_model_same_model_when_ready(self):
@@ -664,14 +789,12 @@ class TestOllamaManager:
                 # First call: model doesn't exist, second call: model exists after pull
                 mock_has.side_effect = [False, True]
 
-                with patch("httpx.AsyncClient") as mock_client_class:
+                with patch("app.services.ollama_manager.get_http_client") as mock_get_client:
                     mock_client = AsyncMock()
                     mock_response = MagicMock()
                     mock_response.raise_for_status = MagicMock()
                     mock_client.post = AsyncMock(return_value=mock_response)
-                    mock_client.__aenter__ = AsyncMock(return_value=mock_client)
-                    mock_client.__aexit__ = AsyncMock(return_value=None)
-                    mock_client_class.return_value = mock_client
+                    mock_get_client.return_value = mock_client
 
                     result = await manager.switch_model("llama3.2:1b")
 
@@ -0,0 +1,101 @@
+"""Tests for token-budgeted chat context assembly."""
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from app.models.chat import Conversation, Message, MessageRole
+from app.services.chat_context import build_context, context_budget, message_tokens
+
+
+def _conversation(db, turns, system=None):
+    """Create a conversation of alternating user/assistant messages."""
+    conversation = Conversation(model="llama3.2:1b")
+    db.add(conversation)
+    db.commit()
+    start = datetime(2026, 1, 1)
+    if system:
+        db.add(Message(
+            conversation_id=conversation.id, role=MessageRole.SYSTEM,
+            content=system, created_at=start,
+        ))
+    for i, content in enumerate(turns):
+        role = MessageRole.USER if i % 2 == 0 else MessageRole.ASSISTANT
+        db.add(Message(
+            conversation_id=conversation.id, role=role, content=content,
+            created_at=start + timedelta(seconds=i + 1),
+        ))
+    db.commit()
+    return conversation
+
+
+class TestBuildContext:
+    """Tests for build_context."""
+
+    def test_everything_fits(self, db_session):
+        conversation = _conversation(db_session, ["q1", "a1", "q2"], system="be brief")
+        context = build_context(db_session, conversation.id, budget=1000)
+        assert [m["content"] for m in context] == ["be brief", "q1", "a1", "q2"]
+
+    def test_drops_oldest_turns_over_budget(self, db_session):
+        turns = ["x" * 40 for _ in range(9)]
+        conversation = _conversation(db_session, turns)
+        per_message = message_tokens({"content": turns[0]})
+
+        with patch("app.services.chat_context.settings.chat_context_trim_to", 1.0):
+            context = build_context(db_session, conversation.id, budget=per_message * 4)
+
+        assert len(context) == 3  # 4 fit, then the leading assistant reply is trimmed
+        assert context[0]["role"] == "user"
+        assert context[-1]["role"] == "user"
+
+    def test_system_messages_always_kept(self, db_session):
+        conversation = _conversation(db_session, ["q1", "a1", "q2"], system="s" * 400)
+        context = build_context(db_session, conversation.id, budget=10)
+        assert context[0]["role"] == "system"
+        # The newest message is kept even when nothing else fits
+        assert [m["content"] for m in context[1:]] == ["q2"]
+
+    def test_pages_through_history(self, db_session):
+        """Reading newest-first in small keyset pages yields the same context."""
+        turns = [f"message {i}" for i in range(25)]
+        conversation = _conversation(db_session, turns)
+
+        with patch("app.services.chat_context.settings.chat_context_page_size", 4):
+            context = build_context(db_session, conversation.id, budget=10_000)
+
+        assert [m["content"] for m in context] == turns
+
+    def test_prefix_stays_stable_across_turns(self, db_session):
+        """After a trim, later turns extend the same prefix until it overflows again."""
+        turns = ["x" * 40 for _ in range(9)]
+        conversation = _conversation(db_session, turns)
+        budget = message_tokens({"content": turns[0]}) * 6
+
+        first = build_context(db_session, conversation.id, budget=budget)
+        assert len(first) == 3  # trimmed to half the budget
+
+        start = datetime(2026, 1, 1) + timedelta(seconds=len(turns) + 1)
+        for i, role in enumerate([MessageRole.ASSISTANT, MessageRole.USER]):
+            db_session.add(Message(
+                conversation_id=conversation.id, role=role, content="y" * 40,
+                created_at=start + timedelta(seconds=i),
+            ))
+        db_session.commit()
+
+        second = build_context(db_session, conversation.id, budget=budget)
+        assert second[:len(first)] == first
+        assert len(second) == 5
+
+    def test_unknown_conversation(self, db_session):
+        assert build_context(db_session, "non-existent-id", budget=100) == []
+
+
+class TestContextBudget:
+    """Tests for per-model budgets."""
+
+    def test_per_model_override(self):
+        settings = "app.services.chat_context.settings"
+        with patch(f"{settings}.chat_context_model_tokens", {"big": 32768}), \
+                patch(f"{settings}.chat_reply_reserve_tokens", 1024), \
+                patch(f"{settings}.chat_context_tokens", 4096):
+            assert context_budget("big") == 31744
+            assert context_budget("other") == 3072
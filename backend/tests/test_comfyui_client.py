@@ -0,0 +1,210 @@
+"""Tests for ComfyUI client completion tracking."""
+import asyncio
+
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from app.services.comfyui_client import ComfyUIClient
+
+
+COMPLETED_HISTORY = {
+    "status": {"completed": True, "status_str": "success"},
+    "outputs": {
+        "9": {"images": [{"filename": "out.png", "subfolder": "", "type": "output"}]}
+    },
+}
+
+
+class TestWebsocketCompletion:
+    """Tests for event-driven completion via the websocket channel."""
+
+    def _connected_client(self) -> ComfyUIClient:
+        client = ComfyUIClient("http://comfyui:8188", use_websocket=True)
+        client._ws_connected = True
+        client._ws_epoch = 1
+        client._submit_epochs["p1"] = 1
+        return client
+
+    def test_ws_url_uses_client_id(self):
+        """Websocket URL should target /ws with this client's ID."""
+        client = ComfyUIClient("http://comfyui:8188")
+        assert client.ws_url == f"ws://comfyui:8188/ws?clientId={client.client_id}"
+
+        secure = ComfyUIClient("https://comfy.example")
+        assert secure.ws_url.startswith("wss://comfy.example/ws?clientId=")
+
+    @pytest.mark.asyncio
+    async def test_executing_none_resolves_waiter(self):
+        """executing with node=None should complete the prompt immediately."""
+        client = self._connected_client()
+
+        with patch.object(client, "get_history", new_callable=AsyncMock) as mock_history:
+            mock_history.return_value = COMPLETED_HISTORY
+
+            task = asyncio.create_task(client.wait_for_completion("p1", timeout=5.0))
+            await asyncio.sleep(0)
+            # No polling while the socket is connected
+            assert mock_history.await_count == 0
+
+            client._handle_ws_message(
+                {"type": "executing", "data": {"node": None, "prompt_id": "p1"}}
+            )
+            result = await asyncio.wait_for(task, timeout=1.0)
+
+        assert result.status == "completed"
+        assert result.images[0]["filename"] == "out.png"
+        mock_history.assert_awaited_once_with("p1")
+
+    @pytest.mark.asyncio
+    async def test_completion_before_wait_is_not_lost(self):
+        """A completion event arriving before wait_for_completion is remembered."""
+        client = self._connected_client()
+        client._handle_ws_message(
+            {"type": "executing", "data": {"node": None, "prompt_id": "p1"}}
+        )
+        # Finished prompts don't keep their submit bookkeeping
+        assert "p1" not in client._submit_epochs
+
+        with patch.object(client, "get_history", new_callable=AsyncMock) as mock_history:
+            mock_history.return_value = COMPLETED_HISTORY
+            result = await client.wait_for_completion("p1", timeout=1.0)
+
+        assert result.status == "completed"
+
+    @pytest.mark.asyncio
+    async def test_execution_error_fails_job(self):
+        """execution_error should fail the job with the exception message."""
+        client = self._connected_client()
+
+        with patch.object(client, "get_history", new_callable=AsyncMock) as mock_history:
+            task = asyncio.create_task(client.wait_for_completion("p1", timeout=5.0))
+            await asyncio.sleep(0)
+            client._handle_ws_message({
+                "type": "execution_error",
+                "data": {"prompt_id": "p1", "exception_message": "CUDA out of memory"},
+            })
+            client._handle_ws_message(
+                {"type": "executing", "data": {"node": None, "prompt_id": "p1"}}
+            )
+            result = await asyncio.wait_for(task, timeout=1.0)
+
+        assert result.status == "failed"
+        assert result.error == "CUDA out of memory"
+        mock_history.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_polling_without_socket(self):
+        """History polling should be used when the socket is down."""
+        client = ComfyUIClient("http://comfyui:8188", use_websocket=False)
+
+        with patch.object(client, "get_history", new_callable=AsyncMock) as mock_history:
+            mock_history.side_effect = [None, None, COMPLETED_HISTORY]
+            result = await client.wait_for_completion("p1", timeout=5.0, poll_interval=0.01)
+
+        assert result.status == "completed"
+        assert mock_history.await_count == 3
+
+    @pytest.mark.asyncio
+    async def test_polls_when_socket_connected_after_submit(self):
+        """If the socket came up after submit, check history once before trusting it."""
+        client = ComfyUIClient("http://comfyui:8188", use_websocket=True)
+        client._ws_connected = True
+        client._ws_epoch = 2
+        client._submit_epochs["p1"] = None
+
+        with patch.object(client, "get_history", new_callable=AsyncMock) as mock_history:
+            mock_history.return_value = COMPLETED_HISTORY
+            result = await client.wait_for_completion("p1", timeout=1.0)
+
+        assert result.status == "completed"
+        mock_history.assert_awaited_once_with("p1")
+
+    @pytest.mark.asyncio
+    async def test_timeout(self):
+        """Should fail with a timeout when no completion arrives."""
+        client = self._connected_client()
+        result = await client.wait_for_completion("p1", timeout=0.05)
+        assert result.status == "failed"
+        assert "Timeout" in result.error
+
+    @pytest.mark.asyncio
+    async def test_progress_events_reach_callback(self):
+        """progress events should be forwarded to the prompt's callback."""
+        client = self._connected_client()
+        steps = []
+
+        async def on_progress(value, maximum):
+            steps.append((value, maximum))
+
+        with patch.object(client, "get_history", new_callable=AsyncMock) as mock_history:
+            mock_history.return_value = COMPLETED_HISTORY
+            task = asyncio.create_task(
+                client.wait_for_completion("p1", timeout=5.0, on_progress=on_progress)
+            )
+            await asyncio.sleep(0)
+            await client._dispatch_ws_message(
+                {"type": "progress", "data": {"value": 1, "max": 20, "prompt_id": "p1"}}
+            )
+            await client._dispatch_ws_message(
+                {"type": "progress", "data": {"value": 2, "max": 20, "prompt_id": "other"}}
+            )
+            await client._dispatch_ws_message(
+                {"type": "executing", "data": {"node": None, "prompt_id": "p1"}}
+            )
+            await asyncio.wait_for(task, timeout=1.0)
+
+        assert steps == [(1, 20)]
+        assert "p1" not in client._progress_callbacks
+
+
+class TestCancelPrompt:
+    """Tests for stopping a single prompt on a shared backend."""
+
+    def _client_with_queue(self, running, pending):
+        client = ComfyUIClient("http://comfyui:8188")
+        client.get_queue = AsyncMock(return_value={
+            "queue_running": [[0, pid, {}, {}, []] for pid in running],
+            "queue_pending": [[1, pid, {}, {}, []] for pid in pending],
+        })
+        client.interrupt = AsyncMock(return_value=True)
+        client.delete_queued = AsyncMock(return_value=True)
+        return client
+
+    @pytest.mark.asyncio
+    async def test_interrupts_running_prompt(self):
+        client = self._client_with_queue(running=["p1"], pending=["p2"])
+        assert await client.cancel_prompt("p1") is True
+        client.interrupt.assert_awaited_once()
+        client.delete_queued.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_pending_prompt_does_not_interrupt_other_job(self):
+        """Cancelling a pending prompt must not stop the one executing."""
+        client = self._client_with_queue(running=["p1"], pending=["p2"])
+        assert await client.cancel_prompt("p2") is True
+        client.interrupt.assert_not_awaited()
+        client.delete_queued.assert_awaited_once_with(["p2"])
+
+    @pytest.mark.asyncio
+    async def test_cancel_forgets_submit_epoch(self):
+        """A prompt cancelled before anyone waited on it leaves no bookkeeping behind."""
+        client = self._client_with_queue(running=["p1"], pending=["p2"])
+        client._submit_epochs["p2"] = 1
+        await client.cancel_prompt("p2")
+        assert "p2" not in client._submit_epochs
+
+
+class TestAppShutdown:
+    """Tests for releasing backend clients with the app."""
+
+    def test_shutdown_closes_every_backend_client(self, tmp_path):
+        """Websocket listeners and HTTP clients are closed when the app stops."""
+        from fastapi.testclient import TestClient
+        from app.main import app
+        from app.services.comfyui_client import comfyui_clients
+
+        with patch("app.main.settings.storage_path", str(tmp_path)), \
+                patch.object(ComfyUIClient, "close", new_callable=AsyncMock) as mock_close:
+            with TestClient(app):
+                mock_close.assert_not_awaited()
+        assert mock_close.await_count == len(comfyui_clients)
@@ -0,0 +1,34 @@
+"""Tests for engine setup."""
+from unittest.mock import patch
+
+from app.database import create_db_engine
+
+
+class TestSQLiteEngine:
+    def pragma(self, engine, name):
+        with engine.connect() as conn:
+            return conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+
+    def test_pragmas_applied_to_connections(self, tmp_path):
+        engine = create_db_engine(f"sqlite:///{tmp_path / 'test.db'}")
+        try:
+            assert self.pragma(engine, "journal_mode") == "wal"
+            assert self.pragma(engine, "synchronous") == 1  # NORMAL
+            assert self.pragma(engine, "busy_timeout") == 5000
+            assert self.pragma(engine, "cache_size") == -65536
+        finally:
+            engine.dispose()
+
+    def test_pragmas_follow_settings(self, tmp_path):
+        with patch("app.database.settings.sqlite_journal_mode", "delete"), \
+                patch("app.database.settings.sqlite_busy_timeout_ms", 250):
+            engine = create_db_engine(f"sqlite:///{tmp_path / 'test.db'}")
+        try:
+            assert self.pragma(engine, "journal_mode") == "delete"
+            assert self.pragma(engine, "busy_timeout") == 250
+        finally:
+            engine.dispose()
+
+    def test_in_memory_database(self):
+        engine = create_db_engine("sqlite://")
+        assert self.pragma(engine, "busy_timeout") == 5000
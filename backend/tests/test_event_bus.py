@@ -0,0 +1,233 @@
+"""Tests for the SSE event bus."""
+import asyncio
+import json
+
+import pytest
+
+from app.services.event_bus import EventBus, RESYNC_EVENT
+
+
+async def drain(subscription):
+    events = []
+    while subscription.lag:
+        events.append(await subscription.get())
+    return events
+
+
+class TestBoundedSubscriptions:
+    """Tests for per-subscriber bounded queues and coalescing."""
+
+    @pytest.mark.asyncio
+    async def test_progress_is_coalesced_per_id(self):
+        bus = EventBus(queue_size=16)
+        subscription = bus.subscribe()
+
+        for percent in (10, 20, 30):
+            await bus.publish("generation.progress", {"id": "a", "progress": percent})
+        await bus.publish("generation.progress", {"id": "b", "progress": 5})
+        await bus.publish("generation.completed", {"id": "a"})
+
+        events = await drain(subscription)
+        assert [(e["type"], json.loads(e["data"]).get("progress")) for e in events] == [
+            ("generation.progress", 30),
+            ("generation.progress", 5),
+            ("generation.completed", None),
+        ]
+        assert subscription.coalesced == 2
+
+    @pytest.mark.asyncio
+    async def test_progress_dropped_before_terminal_events(self):
+        bus = EventBus(queue_size=3)
+        subscription = bus.subscribe()
+
+        await bus.publish("generation.progress", {"id": "a", "progress": 50})
+        await bus.publish("generation.completed", {"id": "b"})
+        await bus.publish("generation.completed", {"id": "c"})
+        await bus.publish("generation.completed", {"id": "d"})
+
+        events = await drain(subscription)
+        assert [json.loads(e["data"])["id"] for e in events] == ["b", "c", "d"]
+        assert subscription.dropped == 1
+
+    @pytest.mark.asyncio
+    async def test_overflow_of_terminal_events_requests_resync(self):
+        bus = EventBus(queue_size=2)
+        subscription = bus.subscribe()
+
+        for i in range(3):
+            await bus.publish("generation.completed", {"id": str(i)})
+
+        events = await drain(subscription)
+        assert [e["type"] for e in events] == [RESYNC_EVENT]
+        assert bus.stats()["resyncs"] == 1
+
+    @pytest.mark.asyncio
+    async def test_memory_bounded_with_idle_subscribers(self):
+        """500 subscribers that never read stay within their queue bound."""
+        bus = EventBus(queue_size=32)
+        subscriptions = [bus.subscribe() for _ in range(500)]
+
+        for step in range(100):
+            for job in range(20):
+                await bus.publish("generation.progress", {"id": str(job), "progress": step})
+            if step % 10 == 0:
+                await bus.publish("generation.completed", {"id": f"done-{step}"})
+
+        assert max(s.lag for s in subscriptions) <= 32
+        stats = bus.stats()
+        assert stats["max_lag"] <= 32
+        assert stats["coalesced"] > 0
+
+    @pytest.mark.asyncio
+    async def test_get_waits_for_events(self):
+        bus = EventBus(queue_size=4)
+        subscription = bus.subscribe()
+        getter = asyncio.create_task(subscription.get())
+        await asyncio.sleep(0.01)
+        assert not getter.done()
+
+        await bus.publish("generation.created", {"id": "a"})
+        event = await asyncio.wait_for(getter, timeout=1)
+        assert event["type"] == "generation.created"
+
+    @pytest.mark.asyncio
+    async def test_unsubscribe_keeps_lifetime_totals(self):
+        bus = EventBus(queue_size=4)
+        subscription = bus.subscribe()
+        await bus.publish("generation.progress", {"id": "a", "progress": 1})
+        await bus.publish("generation.progress", {"id": "a", "progress": 2})
+        bus.unsubscribe(subscription.id)
+
+        await bus.publish("generation.created", {"id": "b"})
+        stats = bus.stats()
+        assert stats["subscribers"] == 0
+        assert stats["coalesced"] == 1
+
+
+class TestFilteredSubscriptions:
+    """Tests for topic-filtered subscriptions."""
+
+    @pytest.mark.asyncio
+    async def test_portfolio_filter(self):
+        bus = EventBus(queue_size=16)
+        mine = bus.subscribe(portfolio_ids=["p1"])
+        everything = bus.subscribe()
+
+        await bus.publish("generation.created", {"id": "a", "portfolio_id": "p1"})
+        await bus.publish("generation.created", {"id": "b", "portfolio_id": "p2"})
+
+        assert [json.loads(e["data"])["id"] for e in await drain(mine)] == ["a"]
+        assert [json.loads(e["data"])["id"] for e in await drain(everything)] == ["a", "b"]
+
+    @pytest.mark.asyncio
+    async def test_filters_combine(self):
+        """Values within a filter are alternatives; all filters must match."""
+        bus = EventBus(queue_size=16)
+        subscription = bus.subscribe(
+            event_types=["generation.completed", "generation.failed"],
+            portfolio_ids=["p1"],
+            generation_ids=["a", "b"],
+        )
+
+        await bus.publish("generation.completed", {"id": "a", "portfolio_id": "p1"})
+        await bus.publish("generation.progress", {"id": "a", "portfolio_id": "p1"})
+        await bus.publish("generation.failed", {"id": "b", "portfolio_id": "p1"})
+        await bus.publish("generation.completed", {"id": "c", "portfolio_id": "p1"})
+        await bus.publish("generation.completed", {"id": "b", "portfolio_id": "p2"})
+
+        events = await drain(subscription)
+        assert [(e["type"], json.loads(e["data"])["id"]) for e in events] == [
+            ("generation.completed", "a"),
+            ("generation.failed", "b"),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_publish_only_visits_interested_subscribers(self):
+        bus = EventBus(queue_size=16)
+        others = [bus.subscribe(portfolio_ids=[f"p{i}"]) for i in range(100)]
+        target = bus.subscribe(portfolio_ids=["target"])
+
+        await bus.publish("generation.created", {"id": "a", "portfolio_id": "target"})
+
+        assert target.lag == 1
+        assert all(s.lag == 0 for s in others)
+        assert bus.stats()["deliveries"] == 1
+
+    @pytest.mark.asyncio
+    async def test_unsubscribe_removes_from_index(self):
+        bus = EventBus(queue_size=16)
+        subscription = bus.subscribe(generation_ids=["a"])
+        bus.unsubscribe(subscription.id)
+
+        await bus.publish("generation.created", {"id": "a", "portfolio_id": "p1"})
+        assert subscription.lag == 0
+        assert bus._by_generation == {}
+
+
+class TestReplay:
+    """Tests for event IDs and Last-Event-ID replay."""
+
+    @pytest.mark.asyncio
+    async def test_event_ids_increase(self):
+        bus = EventBus(queue_size=16)
+        subscription = bus.subscribe()
+        for i in range(3):
+            await bus.publish("generation.created", {"id": str(i)})
+
+        ids = [e["id"] for e in await drain(subscription)]
+        assert [int(i.rpartition("-")[2]) for i in ids] == [1, 2, 3]
+        assert bus.last_event_id == ids[-1]
+
+    @pytest.mark.asyncio
+    async def test_reconnect_replays_only_the_gap(self):
+        bus = EventBus(queue_size=16, history_size=8)
+        first = bus.subscribe(portfolio_ids=["p1"])
+        await bus.publish("generation.created", {"id": "a", "portfolio_id": "p1"})
+        seen = await drain(first)
+        bus.unsubscribe(first.id)
+
+        await bus.publish("generation.completed", {"id": "a", "portfolio_id": "p1"})
+        await bus.publish("generation.completed", {"id": "b", "portfolio_id": "p2"})
+        await bus.publish("generation.created", {"id": "c", "portfolio_id": "p1"})
+
+        resumed = bus.subscribe(portfolio_ids=["p1"], last_event_id=seen[-1]["id"])
+        await bus.publish("generation.completed", {"id": "c", "portfolio_id": "p1"})
+
+        events = await drain(resumed)
+        assert [(e["type"], json.loads(e["data"])["id"]) for e in events] == [
+            ("generation.completed", "a"),
+            ("generation.created", "c"),
+            ("generation.completed", "c"),
+        ]
+        assert bus.stats()["replayed"] == 2
+
+    @pytest.mark.asyncio
+    async def test_gap_beyond_buffer_requests_resync(self):
+        bus = EventBus(queue_size=16, history_size=4)
+        subscription = bus.subscribe()
+        await bus.publish("generation.created", {"id": "a"})
+        last_seen = (await drain(subscription))[-1]["id"]
+
+        for i in range(10):
+            await bus.publish("generation.created", {"id": str(i)})
+
+        resumed = bus.subscribe(last_event_id=last_seen)
+        events = await drain(resumed)
+        assert [e["type"] for e in events] == [RESYNC_EVENT]
+        assert events[0]["id"] == bus.last_event_id
+
+    @pytest.mark.asyncio
+    async def test_id_from_another_process_requests_resync(self):
+        bus = EventBus(queue_size=16)
+        await bus.publish("generation.created", {"id": "a"})
+
+        resumed = bus.subscribe(last_event_id="deadbeef-1")
+        assert [e["type"] for e in await drain(resumed)] == [RESYNC_EVENT]
+
+    @pytest.mark.asyncio
+    async def test_up_to_date_client_gets_nothing(self):
+        bus = EventBus(queue_size=16)
+        await bus.publish("generation.created", {"id": "a"})
+
+        resumed = bus.subscribe(last_event_id=bus.last_event_id)
+        assert resumed.lag == 0
@@ -0,0 +1,131 @@
+"""Query-plan tests: the hot generation queries must use an index."""
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from app.models.generation import Generation, GenerationStatus
+from app.models.portfolio import Portfolio
+from app.services.generation_service import GenerationService
+from app.services.result_cache import find_cached
+
+
+@contextmanager
+def captured_plans(db):
+    """Collect ``EXPLAIN QUERY PLAN`` details of the SELECTs run inside the block."""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", capture)
+    plans = []
+    try:
+        yield plans
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    for statement, parameters in statements:
+        rows = db.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        plans.append((statement, [row[-1] for row in rows]))
+
+
+def assert_indexed(plans, allow_sort=False):
+    """No full table scans; listings also mustn't sort in a temp B-tree."""
+    assert plans
+    for statement, details in plans:
+        for detail in details:
+            if "generations" in detail and detail.startswith("SCAN"):
+                assert "INDEX" in detail, f"full scan: {detail}\n{statement}"
+            if not allow_sort:
+                assert "TEMP B-TREE" not in detail, f"sort: {detail}\n{statement}"
+
+
+def seed(db):
+    portfolio = Portfolio(name="Test")
+    db.add(portfolio)
+    db.flush()
+    source = Generation(
+        portfolio_id=portfolio.id,
+        prompt="a cat",
+        status=GenerationStatus.COMPLETED,
+        image_path="images/a.webp",
+        thumbnail_path="images/a_thumb.webp",
+        workflow_hash="abc",
+    )
+    db.add(source)
+    db.flush()
+    db.add(Generation(
+        portfolio_id=portfolio.id,
+        prompt="a cat",
+        generation_type="animate",
+        source_generation_id=source.id,
+        status=GenerationStatus.COMPLETED,
+    ))
+    db.commit()
+    return portfolio, source
+
+
+class TestGenerationQueryPlans:
+    def test_portfolio_listing(self, db_session):
+        portfolio, _ = seed(db_session)
+        service = GenerationService(db_session)
+        with captured_plans(db_session) as plans:
+            service.list_page(portfolio.id)
+            service.list_page()
+        assert_indexed(plans)
+
+    def test_listing_pages(self, db_session):
+        portfolio, _ = seed(db_session)
+        service = GenerationService(db_session)
+        cursor = service.list_page(portfolio.id, limit=1).next_cursor
+        with captured_plans(db_session) as plans:
+            service.list_page(portfolio.id, cursor=cursor, limit=1)
+            service.list_page(cursor=cursor, limit=1)
+        assert_indexed(plans)
+
+    def test_viewer_lookups(self, db_session):
+        _, source = seed(db_session)
+        service = GenerationService(db_session)
+        with captured_plans(db_session) as plans:
+            service.neighbors(source.id, statuses=[GenerationStatus.COMPLETED])
+        assert_indexed(plans)
+        # Keyset probes only; nothing is counted
+        assert not any("count(" in statement.lower() for statement, _ in plans)
+
+        with captured_plans(db_session) as plans:
+            service.list_page(source_generation_id=source.id)
+        # Sorts only the few images derived from one source
+        assert_indexed(plans, allow_sort=True)
+
+    def test_counts(self, db_session):
+        portfolio, _ = seed(db_session)
+        service = GenerationService(db_session)
+        with captured_plans(db_session) as plans:
+            service.count(portfolio_id=portfolio.id)
+        # Grouping the one portfolio's rows by status
+        assert_indexed(plans, allow_sort=True)
+
+    def test_animations_listing(self, db_session):
+        portfolio, _ = seed(db_session)
+        service = GenerationService(db_session)
+        with captured_plans(db_session) as plans:
+            service.list_animations(portfolio.id)
+        assert_indexed(plans)
+
+    def test_auto_animate_checks(self, db_session):
+        portfolio, _ = seed(db_session)
+        service = GenerationService(db_session)
+        with captured_plans(db_session) as plans:
+            service.should_auto_animate(portfolio.id)
+            service.get_unanimated_generation(portfolio.id)
+        assert_indexed(plans)
+
+    def test_lookups_by_id_and_workflow(self, db_session):
+        _, source = seed(db_session)
+        service = GenerationService(db_session)
+        with captured_plans(db_session) as plans:
+            service.get(source.id)
+            find_cached(db_session, "abc", exclude_id="other")
+        # find_cached sorts only the few renders of one workflow
+        assert_indexed(plans, allow_sort=True)
@@ -8,7 +8,7 @@ class TestGenerationAPI:
         """Test listing generations when none exist."""
         response = client.get("/api/generations")
         assert response.status_code == 200
-        assert response.json() == []
+        assert response.json() == {"items": [], "next_cursor": None}
 
     def test_list_generations_filtered_by_portfolio(self, client):
         """Test listing generations filtered by portfolio."""
@@ -22,7 +22,7 @@ class TestGenerationAPI:
         # Request generations for this portfolio
         response = client.get(f"/api/generations?portfolio_id={portfolio_id}")
         assert response.status_code == 200
-        assert response.json() == []
+        assert response.json()["items"] == []
 
     @patch("app.services.generation_service.get_job_queue")
     @patch("app.services.generation_service.event_bus")
@@ -70,3 +70,435 @@ class TestGenerationAPI:
         """Test deleting a non-existent generation."""
         response = client.delete("/api/generations/non-existent-id")
         assert response.status_code == 404
+
+
+class TestGenerationPagination:
+    """Tests for keyset-paginated, filtered generation listing."""
+
+    def seed(self, db_session, count=5):
+        from datetime import datetime, timedelta
+        from app.models.generation import Generation, GenerationStatus
+        from app.models.portfolio import Portfolio
+
+        portfolio = Portfolio(name="P")
+        other = Portfolio(name="Other")
+        db_session.add_all([portfolio, other])
+        db_session.flush()
+        start = datetime(2026, 1, 1)
+        for i in range(count):
+            db_session.add(Generation(
+                id=f"gen-{i}",
+                portfolio_id=portfolio.id,
+                prompt=f"image {i}",
+                generation_type="animate" if i == 3 else "txt2img",
+                status=GenerationStatus.FAILED if i == 1 else GenerationStatus.COMPLETED,
+                model_filename="sdxl.safetensors" if i % 2 == 0 else "flux.safetensors",
+                # Two share a timestamp: the ID breaks the tie
+                created_at=start + timedelta(minutes=min(i, 3)),
+            ))
+        db_session.add(Generation(portfolio_id=other.id, prompt="elsewhere", created_at=start))
+        db_session.commit()
+        return portfolio.id
+
+    def test_pages_cover_all_rows_once(self, client, db_session):
+        portfolio_id = self.seed(db_session)
+
+        ids, cursor = [], None
+        while True:
+            params = {"portfolio_id": portfolio_id, "limit": 2}
+            if cursor:
+                params["cursor"] = cursor
+            page = client.get("/api/generations", params=params).json()
+            ids += [g["id"] for g in page["items"]]
+            cursor = page["next_cursor"]
+            if not cursor:
+                break
+
+        assert ids == ["gen-4", "gen-3", "gen-2", "gen-1", "gen-0"]
+
+    def test_filters(self, client, db_session):
+        portfolio_id = self.seed(db_session)
+
+        def ids(**params):
+            response = client.get(
+                "/api/generations", params={"portfolio_id": portfolio_id, **params}
+            )
+            return [g["id"] for g in response.json()["items"]]
+
+        assert ids(status="failed") == ["gen-1"]
+        assert ids(status=["failed", "completed"], generation_type="animate") == ["gen-3"]
+        assert ids(model="sdxl.safetensors") == ["gen-4", "gen-2", "gen-0"]
+        assert ids(
+            created_after="2026-01-01T00:01:00", created_before="2026-01-01T00:03:00"
+        ) == ["gen-2", "gen-1"]
+
+    def test_source_filter(self, client, db_session):
+        from app.models.generation import Generation
+
+        portfolio_id = self.seed(db_session)
+        db_session.add(Generation(
+            id="derived", portfolio_id=portfolio_id, prompt="up", generation_type="upscale",
+            source_generation_id="gen-2",
+        ))
+        db_session.commit()
+
+        page = client.get("/api/generations", params={"source_generation_id": "gen-2"}).json()
+        assert [g["id"] for g in page["items"]] == ["derived"]
+
+    def test_counts(self, client, db_session):
+        portfolio_id = self.seed(db_session)
+
+        counts = client.get("/api/generations/counts", params={"portfolio_id": portfolio_id}).json()
+        assert counts == {"total": 5, "by_status": {"completed": 4, "failed": 1}}
+
+        active = client.get(
+            "/api/generations/counts", params={"status": ["pending", "processing"]}
+        ).json()
+        # Only the other portfolio's generation is still pending
+        assert active == {"total": 1, "by_status": {"pending": 1}}
+
+    def test_neighbors(self, client, db_session):
+        self.seed(db_session)
+
+        def neighbors(generation_id):
+            response = client.get(
+                f"/api/generations/{generation_id}/neighbors", params={"status": "completed"}
+            )
+            data = response.json()
+            return (
+                data["previous"] and data["previous"]["id"],
+                data["next"] and data["next"]["id"],
+            )
+
+        # Completed, newest first: gen-4, gen-3 (same timestamp), gen-2, gen-0
+        assert neighbors("gen-4") == (None, "gen-3")
+        assert neighbors("gen-3") == ("gen-4", "gen-2")
+        assert neighbors("gen-2") == ("gen-3", "gen-0")
+        assert neighbors("gen-0") == ("gen-2", None)
+        assert client.get("/api/generations/missing/neighbors").status_code == 404
+
+    def test_limit_is_capped(self, client, db_session):
+        portfolio_id = self.seed(db_session)
+        with patch("app.services.generation_service.settings.generation_page_size_max", 3):
+            page = client.get(
+                "/api/generations", params={"portfolio_id": portfolio_id, "limit": 100}
+            ).json()
+        assert len(page["items"]) == 3
+        assert page["next_cursor"]
+
+    def test_invalid_cursor(self, client):
+        response = client.get("/api/generations", params={"cursor": "not-a-cursor"})
+        assert response.status_code == 400
+
+
+class TestGenerationImageFiles:
+    """Tests for saving generation output files."""
+
+    def test_save_image_files_writes_image_and_thumbnail(self, tmp_path):
+        """Should write the original bytes and a thumbnail within 256px."""
+        import io
+        from PIL import Image
+        from app.services.generation_service import _save_image_files
+
+        buf = io.BytesIO()
+        Image.new("RGB", (1024, 512), color=(10, 20, 30)).save(buf, "PNG")
+        image_bytes = buf.getvalue()
+
+        image_path = tmp_path / "images" / "gen.webp"
+        thumb_path = tmp_path / "images" / "gen_thumb.webp"
+        _save_image_files(image_bytes, image_path, thumb_path)
+
+        assert image_path.read_bytes() == image_bytes
+        with Image.open(thumb_path) as thumb:
+            assert thumb.format == "WEBP"
+            assert thumb.size == (256, 128)
+
+
+class TestResultCache:
+    """Tests for the content-addressed result cache."""
+
+    def test_workflow_hash_is_canonical(self):
+        """Key order must not affect the hash; values must."""
+        from app.services.result_cache import workflow_hash
+
+        a = {"3": {"inputs": {"seed": 1, "steps": 30}}, "6": {"inputs": {"text": "cat"}}}
+        b = {"6": {"inputs": {"text": "cat"}}, "3": {"inputs": {"steps": 30, "seed": 1}}}
+        c = {"3": {"inputs": {"seed": 2, "steps": 30}}, "6": {"inputs": {"text": "cat"}}}
+
+        assert workflow_hash(a) == workflow_hash(b)
+        assert workflow_hash(a) != workflow_hash(c)
+
+    @patch("app.services.generation_service.get_job_queue")
+    @patch("app.services.generation_service.event_bus")
+    def test_identical_generation_served_from_cache(
+        self, mock_event_bus, mock_get_job_queue, client, db_session, tmp_path
+    ):
+        """A fixed-seed resubmit should complete immediately via hard links."""
+        from app.models.generation import Generation, GenerationStatus
+
+        mock_queue = AsyncMock()
+        mock_get_job_queue.return_value = mock_queue
+        mock_event_bus.publish = AsyncMock()
+
+        portfolio_id = client.post("/api/portfolios", json={"name": "P"}).json()["id"]
+        payload = {"portfolio_id": portfolio_id, "prompt": "a cat", "seed": 42}
+        auto_animate = AsyncMock()
+
+        with patch("app.services.generation_service.settings.storage_path", str(tmp_path)), \
+                patch(
+                    "app.services.generation_service.GenerationService.maybe_auto_animate",
+                    auto_animate,
+                ):
+            first = client.post("/api/generations", json=payload).json()
+            assert first["status"] == "pending"
+            assert mock_queue.enqueue.await_count == 1
+
+            # Simulate the first render completing
+            images = tmp_path / "images"
+            images.mkdir()
+            (images / f"{first['id']}.webp").write_bytes(b"image")
+            (images / f"{first['id']}_thumb.webp").write_bytes(b"thumb")
+            gen = db_session.query(Generation).filter(Generation.id == first["id"]).first()
+            gen.status = GenerationStatus.COMPLETED
+            gen.image_path = f"images/{first['id']}.webp"
+            gen.thumbnail_path = f"images/{first['id']}_thumb.webp"
+            db_session.commit()
+
+            second = client.post("/api/generations", json=payload).json()
+
+            # Different seed is a different workflow
+            third = client.post(
+                "/api/generations", json={**payload, "seed": 43}
+            ).json()
+
+        assert second["status"] == "completed"
+        assert second["progress"] == 100
+        assert second["image_path"] == f"images/{second['id']}.webp"
+        assert (images / f"{second['id']}.webp").stat().st_ino == (
+            images / f"{first['id']}.webp"
+        ).stat().st_ino
+        assert third["status"] == "pending"
+        assert mock_queue.enqueue.await_count == 2
+        # Only the cache hit completed, so only it checks the animation ratio
+        auto_animate.assert_awaited_once_with(portfolio_id)
+
+
+class TestBatchedGeneration:
+    """Tests for batched txt2img rendering (quantity > 1)."""
+
+    @patch("app.services.generation_service.get_job_queue")
+    @patch("app.services.generation_service.event_bus")
+    def test_quantity_split_into_batched_jobs(
+        self, mock_event_bus, mock_get_job_queue, client, db_session
+    ):
+        """quantity=6 with max batch 4 should enqueue a 4-batch and a 2-batch."""
+        from app.models.generation import Generation
+
+        mock_queue = AsyncMock()
+        mock_get_job_queue.return_value = mock_queue
+        mock_event_bus.publish = AsyncMock()
+
+        portfolio_id = client.post("/api/portfolios", json={"name": "P"}).json()["id"]
+        with patch("app.api.generations.settings.generation_max_batch_size", 4), \
+                patch("app.services.generation_service.settings.generation_max_batch_size", 4):
+            response = client.post("/api/generations", json={
+                "portfolio_id": portfolio_id,
+                "prompt": "a cat",
+                "seed": 100,
+                "quantity": 6,
+            })
+
+        assert response.status_code == 201
+        assert response.json()["batch_index"] == 0
+
+        rows = db_session.query(Generation).all()
+        assert sorted((g.seed, g.batch_index) for g in rows) == [
+            (100, 0), (100, 1), (100, 2), (100, 3), (104, 0), (104, 1),
+        ]
+
+        jobs = [call.args[0] for call in mock_queue.enqueue.await_args_list]
+        assert [len(j.params["batch_generation_ids"]) for j in jobs] == [4, 2]
+        assert jobs[0].id == jobs[0].params["batch_generation_ids"][0]
+
+    @patch("app.services.generation_service.get_job_queue")
+    @patch("app.services.generation_service.event_bus")
+    async def test_batch_insert_runs_off_event_loop(
+        self, mock_event_bus, mock_get_job_queue, db_session
+    ):
+        """Rows are stored in one blocking call that loads the template once."""
+        import threading
+        from sqlalchemy import event
+        from app.models.portfolio import Portfolio
+        from app.models.workflow import WorkflowTemplate
+        from app.schemas.generation import GenerationCreate
+        from app.services.generation_service import GenerationService
+        from tests.conftest import engine
+
+        mock_event_bus.publish = AsyncMock()
+        mock_get_job_queue.return_value = AsyncMock()
+        portfolio = Portfolio(name="P")
+        template = WorkflowTemplate(
+            name="Custom",
+            workflow_json=GenerationService(db_session)._load_workflow("txt2img_sdxl"),
+        )
+        db_session.add_all([portfolio, template])
+        db_session.flush()
+        data = GenerationCreate(
+            portfolio_id=portfolio.id, prompt="a cat", quantity=6, workflow_id=template.id
+        )
+        db_session.commit()
+
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append((statement, threading.get_ident()))
+
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            with patch("app.services.generation_service.settings.generation_max_batch_size", 4):
+                generations = await GenerationService(db_session).create_batch(data)
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+
+        assert len(generations) == 6
+        assert threading.get_ident() not in {thread for _, thread in statements}
+        template_queries = [s for s, _ in statements if "FROM workflow_templates" in s]
+        assert len(template_queries) == 1
+
+    def test_batch_member_workflow_reproduces_single_image(self, db_session):
+        """A batch member's own workflow samples up to its index and selects it."""
+        from app.models.generation import Generation
+        from app.services.generation_service import GenerationService
+
+        service = GenerationService(db_session)
+        generation = Generation(
+            portfolio_id="p", prompt="a cat", width=512, height=512, seed=7,
+            steps=20, cfg_scale=5.0, sampler="euler", batch_index=2,
+        )
+
+        single = service._prepare_workflow(generation)
+        assert single["5"]["inputs"]["batch_size"] == 3
+        assert single["latent_from_batch"]["inputs"]["batch_index"] == 2
+        assert single["8"]["inputs"]["samples"] == ["latent_from_batch", 0]
+
+        batch = service._prepare_workflow(generation, batch_size=4)
+        assert batch["5"]["inputs"]["batch_size"] == 4
+        assert "latent_from_batch" not in batch
+        assert batch["8"]["inputs"]["samples"] == ["3", 0]
+
+    @patch("app.services.generation_service.event_bus")
+    async def test_batch_job_fans_images_out(self, mock_event_bus, db_session, tmp_path):
+        """One ComfyUI prompt should complete every generation in the batch."""
+        import io
+        from contextlib import contextmanager
+        from PIL import Image
+        from app.models.generation import Generation, GenerationStatus
+        from app.models.portfolio import Portfolio
+        from app.services.comfyui_client import JobResult
+        from app.services.generation_service import process_generation_job
+        from app.services.job_queue import Job, JobType, JobPriority
+        from tests.conftest import TestingSessionLocal
+
+        mock_event_bus.publish = AsyncMock()
+        portfolio = Portfolio(name="P")
+        db_session.add(portfolio)
+        db_session.commit()
+        rows = [
+            Generation(portfolio_id=portfolio.id, prompt="a cat", seed=5, batch_index=i)
+            for i in range(3)
+        ]
+        db_session.add_all(rows)
+        db_session.commit()
+        ids = [g.id for g in rows]
+
+        buf = io.BytesIO()
+        Image.new("RGB", (64, 64), "red").save(buf, "PNG")
+        client = AsyncMock()
+        client.submit_workflow.return_value = "prompt-1"
+        client.wait_for_completion.return_value = JobResult(
+            prompt_id="prompt-1",
+            status="completed",
+            images=[{"filename": f"folio_{i}.png", "subfolder": ""} for i in range(3)],
+        )
+        client.get_image.return_value = buf.getvalue()
+
+        @contextmanager
+        def session():
+            db = TestingSessionLocal()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        job = Job(
+            id=ids[0],
+            job_type=JobType.GENERATION,
+            priority=JobPriority.HIGH,
+            params={"generation_id": ids[0], "batch_generation_ids": ids},
+            created_at="2026-01-01T00:00:00",
+        )
+        with patch("app.database.get_db_session", session), \
+                patch("app.services.generation_service.settings.storage_path", str(tmp_path)), \
+                patch(
+                    "app.services.generation_service.GenerationService.maybe_auto_animate",
+                    AsyncMock(),
+                ):
+            await process_generation_job(job, client)
+
+        workflow = client.submit_workflow.await_args.args[0]
+        assert workflow["5"]["inputs"]["batch_size"] == 3
+        assert client.submit_workflow.await_count == 1
+
+        db_session.expire_all()
+        for generation_id in ids:
+            generation = db_session.get(Generation, generation_id)
+            assert generation.status == GenerationStatus.COMPLETED
+            assert (tmp_path / generation.image_path).exists()
+
+
+
+class TestAutoAnimate:
+    """Tests for keeping a portfolio's animation ratio."""
+
+    @patch("app.services.generation_service.get_job_queue")
+    @patch("app.services.generation_service.event_bus")
+    async def test_queries_run_off_event_loop(self, mock_event_bus, mock_get_job_queue, db_session):
+        """Called from finalize stages, so none of its SQL may run on the loop thread."""
+        import threading
+        from sqlalchemy import event
+        from app.models.generation import Generation, GenerationStatus
+        from app.models.portfolio import Portfolio
+        from app.services.generation_service import GenerationService
+        from tests.conftest import engine
+
+        mock_event_bus.publish = AsyncMock()
+        mock_get_job_queue.return_value = AsyncMock()
+        portfolio = Portfolio(name="P")
+        db_session.add(portfolio)
+        db_session.flush()
+        source = Generation(
+            portfolio_id=portfolio.id,
+            prompt="a cat",
+            status=GenerationStatus.COMPLETED,
+            image_path="images/a.webp",
+        )
+        db_session.add(source)
+        db_session.flush()
+        portfolio_id, source_id = portfolio.id, source.id
+        db_session.commit()
+
+        threads = []
+
+        def record(*args):
+            threads.append(threading.get_ident())
+
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            animation = await GenerationService(db_session).maybe_auto_animate(portfolio_id)
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+
+        assert animation.generation_type == "animate"
+        assert animation.source_generation_id == source_id
+        assert threads
+        assert threading.get_ident() not in threads
@@ -0,0 +1,41 @@
+"""Tests for the shared HTTP connection pool."""
+from unittest.mock import patch
+
+import pytest
+
+from app.services import http_pool
+
+
+class TestHttpPool:
+    """Tests for the lifespan-managed shared client."""
+
+    @pytest.mark.asyncio
+    async def test_client_is_shared_until_closed(self):
+        client = http_pool.get_http_client()
+        assert http_pool.get_http_client() is client
+
+        await http_pool.close_http_client()
+        assert client.is_closed
+        replacement = http_pool.get_http_client()
+        assert replacement is not client
+        await http_pool.close_http_client()
+
+    @pytest.mark.asyncio
+    async def test_http2_falls_back_without_h2(self):
+        """Asking for HTTP/2 without h2 installed should not break the client."""
+        with patch.object(http_pool.settings, "http_pool_http2", True), \
+                patch.object(http_pool, "_http2_available", return_value=False):
+            client = http_pool.get_http_client()
+        assert client is not None
+        await http_pool.close_http_client()
+
+    def test_request_timeout_keeps_pool_connect_limit(self):
+        """Per-call timeouts change the read budget, not the connect limit."""
+        with patch.object(http_pool.settings, "http_pool_connect_timeout", 2.5):
+            timeout = http_pool.request_timeout(300.0)
+            streaming = http_pool.request_timeout(None)
+
+        assert timeout.read == 300.0
+        assert timeout.connect == 2.5
+        assert streaming.read is None
+        assert streaming.connect == 2.5
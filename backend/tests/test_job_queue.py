@@ -1,10 +1,13 @@
 """TDD tests for priority job queue with WAL persistence."""
+import asyncio
 import pytest
 import json
 from datetime import datetime
 
+from app.config import settings
 from app.services.job_queue import (
     PriorityJobQueue,
+    JobLane,
     Job,
     JobPriority,
     JobType,
@@ -578,3 +581,593 @@ class TestRemoveJob:
         """Should return False for nonexistent job."""
         removed = await queue.remove_job("nonexistent")
         assert removed is False
+
+
+class TestMultiWorker:
+    """Tests for tracking one current job per worker."""
+
+    @pytest.fixture
+    def temp_storage(self, tmp_path):
+        return tmp_path
+
+    @pytest.fixture
+    def queue(self, temp_storage):
+        return PriorityJobQueue(temp_storage)
+
+    def _make_job(self, id: str, priority: JobPriority) -> Job:
+        return Job(
+            id=id,
+            job_type=JobType.GENERATION,
+            priority=priority,
+            params={"prompt": f"test-{id}"},
+            created_at=datetime.utcnow().isoformat(),
+        )
+
+    @pytest.mark.asyncio
+    async def test_current_job_tracked_per_worker(self, queue):
+        """Each worker should have its own current job."""
+        job1 = self._make_job("job1", JobPriority.HIGH)
+        job2 = self._make_job("job2", JobPriority.LOW)
+        await queue.set_current_job(job1, worker_id=0)
+        await queue.set_current_job(job2, worker_id=1)
+
+        assert (await queue.get_current_job(0)).id == "job1"
+        assert (await queue.get_current_job(1)).id == "job2"
+
+        status = await queue.get_status()
+        assert status["running"] == 2
+        assert [j["worker"] for j in status["current_jobs"]] == [0, 1]
+
+        await queue.complete("job1")
+        assert await queue.get_current_job(0) is None
+        assert (await queue.get_current_job(1)).id == "job2"
+
+    @pytest.mark.asyncio
+    async def test_preempt_only_affects_target_worker(self, queue):
+        """Preemption should be evaluated and applied per worker."""
+        high_job = self._make_job("high1", JobPriority.HIGH)
+        low_job = self._make_job("low1", JobPriority.LOW)
+        await queue.set_current_job(high_job, worker_id=0)
+        await queue.set_current_job(low_job, worker_id=1)
+
+        await queue.enqueue(self._make_job("high2", JobPriority.HIGH))
+
+        assert await queue.should_preempt(worker_id=0) is False
+        assert await queue.should_preempt(worker_id=1) is True
+
+        preempted = await queue.preempt_current({"progress": 10}, worker_id=1)
+        assert preempted.id == "low1"
+        assert (await queue.get_current_job(0)).id == "high1"
+        assert await queue.get_current_job(1) is None
+
+    @pytest.mark.asyncio
+    async def test_recovery_restores_current_job_per_worker(self, temp_storage):
+        """Current jobs should be restored to the worker that owned them."""
+        queue1 = PriorityJobQueue(temp_storage)
+        job1 = self._make_job("job1", JobPriority.HIGH)
+        job2 = self._make_job("job2", JobPriority.HIGH)
+        await queue1.enqueue(job1)
+        await queue1.enqueue(job2)
+        await queue1.set_current_job(await queue1.dequeue(), worker_id=0)
+        await queue1.set_current_job(await queue1.dequeue(), worker_id=1)
+        await queue1.clear_current_job(worker_id=0)
+        del queue1
+
+        queue2 = PriorityJobQueue(temp_storage)
+        assert await queue2.get_current_job(0) is None
+        assert (await queue2.get_current_job(1)).id == "job2"
+
+    @pytest.mark.asyncio
+    async def test_workers_process_jobs_concurrently(self, queue):
+        """Jobs should run in parallel across workers sharing one queue."""
+        started = []
+        release = asyncio.Event()
+
+        async def processor(job, worker_id):
+            started.append((job.id, worker_id))
+            await release.wait()
+
+        queue.set_processor(processor)
+        await queue.enqueue(self._make_job("job1", JobPriority.HIGH))
+        await queue.enqueue(self._make_job("job2", JobPriority.HIGH))
+        await queue.start_worker(num_workers=2)
+        try:
+            for _ in range(50):
+                if len(started) == 2:
+                    break
+                await asyncio.sleep(0.05)
+            assert sorted(job_id for job_id, _ in started) == ["job1", "job2"]
+            assert sorted(worker_id for _, worker_id in started) == [0, 1]
+        finally:
+            release.set()
+            await queue.stop_worker()
+
+
+class TestGroupCommit:
+    """Tests for queue durability modes."""
+
+    def _make_job(self, id: str) -> Job:
+        return Job(
+            id=id,
+            job_type=JobType.GENERATION,
+            priority=JobPriority.HIGH,
+            params={},
+            created_at=datetime.utcnow().isoformat(),
+        )
+
+    @pytest.mark.asyncio
+    async def test_concurrent_enqueues_share_fsync(self, tmp_path):
+        """A bulk submit should cost far fewer fsyncs than jobs, and survive restart."""
+        queue = PriorityJobQueue(tmp_path, durability="group")
+        await asyncio.gather(*(queue.enqueue(self._make_job(f"job{i}")) for i in range(20)))
+
+        assert queue._wal.fsync_count < 20
+        await queue.close()
+
+        restored = PriorityJobQueue(tmp_path)
+        assert restored.size == 20
+        assert (await restored.dequeue()).id == "job0"
+
+
+class TestAutomaticCompaction:
+    """Tests for background compaction and snapshot+tail recovery."""
+
+    def _make_job(self, id: str, priority: JobPriority = JobPriority.HIGH) -> Job:
+        return Job(
+            id=id,
+            job_type=JobType.GENERATION,
+            priority=priority,
+            params={},
+            created_at=datetime.utcnow().isoformat(),
+        )
+
+    @pytest.mark.asyncio
+    async def test_log_compacts_automatically(self, tmp_path):
+        """Passing the op threshold should rewrite the log as a snapshot + tail."""
+        queue = PriorityJobQueue(tmp_path, compact_after_ops=20)
+        for i in range(10):
+            job = self._make_job(f"done{i}")
+            await queue.enqueue(job)
+            await queue.dequeue()
+            await queue.complete(job.id)
+        await queue.enqueue(self._make_job("pending"))
+        await queue.close()
+
+        entries = [json.loads(line) for line in (tmp_path / "queue.log").read_text().splitlines()]
+        assert entries[0]["op"] == "snapshot"
+        assert len(entries) < 20
+
+        restored = PriorityJobQueue(tmp_path)
+        assert restored.size == 1
+        assert (await restored.dequeue()).id == "pending"
+
+    @pytest.mark.asyncio
+    async def test_ops_during_compaction_are_kept(self, tmp_path):
+        """Ops appended while the snapshot is being written must survive the swap."""
+        queue = PriorityJobQueue(tmp_path, compact_after_ops=0)
+        await queue.enqueue(self._make_job("job0"))
+
+        compaction = asyncio.create_task(queue._wal.compact([queue._snapshot_entry()]))
+        await asyncio.sleep(0)
+        await queue.enqueue(self._make_job("job1"))
+        await compaction
+        await queue.enqueue(self._make_job("job2"))
+        await queue.close()
+
+        restored = PriorityJobQueue(tmp_path)
+        assert [(await restored.dequeue()).id for _ in range(3)] == ["job0", "job1", "job2"]
+
+    @pytest.mark.asyncio
+    async def test_concurrent_enqueues_survive_background_compaction(self, tmp_path):
+        """Ops logged but still awaiting their group fsync when a compaction
+        snapshot is taken must be carried into the new log's tail."""
+        queue = PriorityJobQueue(tmp_path, durability="group", compact_after_ops=7)
+
+        async def producer(p: int) -> None:
+            for i in range(30):
+                await queue.enqueue(self._make_job(f"p{p}-{i}"))
+
+        await asyncio.gather(*(producer(p) for p in range(5)))
+        assert queue.size == 150
+        await queue.close()
+
+        restored = PriorityJobQueue(tmp_path)
+        assert restored.size == 150
+
+    @pytest.mark.asyncio
+    async def test_snapshot_restores_preempted_and_running(self, tmp_path):
+        """Snapshots keep preempted jobs (even stateless) and running jobs."""
+        queue = PriorityJobQueue(tmp_path)
+        low = self._make_job("low", JobPriority.LOW)
+        high = self._make_job("high")
+        await queue.enqueue(low)
+        await queue.set_current_job(await queue.dequeue(), worker_id=0)
+        await queue.preempt_current(worker_id=0)
+        await queue.enqueue(high)
+        await queue.set_current_job(await queue.dequeue(), worker_id=1)
+        queue.compact_log()
+
+        restored = PriorityJobQueue(tmp_path)
+        assert (await restored.get_current_job(1)).id == "high"
+        assert (await restored.get_status())["preempted"] == 1
+
+
+class TestJobLane:
+    """Tests for indexed lanes and weighted-fair scheduling."""
+
+    def _make_job(self, id: str, portfolio: str = "p1") -> Job:
+        return Job(
+            id=id,
+            job_type=JobType.GENERATION,
+            priority=JobPriority.HIGH,
+            params={"portfolio_id": portfolio},
+            created_at=datetime.utcnow().isoformat(),
+        )
+
+    def test_fifo_with_removal_by_id(self):
+        """Removing from the middle of a large backlog keeps FIFO order."""
+        lane = JobLane()
+        for i in range(10_000):
+            lane.append(self._make_job(f"job{i}"))
+
+        assert lane.remove("job5000").id == "job5000"
+        assert lane.remove("job5000") is None
+        assert "job5000" not in lane
+        assert len(lane) == 9_999
+        assert [lane.popleft().id for _ in range(2)] == ["job0", "job1"]
+
+    def test_fair_lane_interleaves_portfolios(self):
+        """A bulk submitter should not starve a portfolio that enqueues later."""
+        lane = JobLane(fair=True)
+        for i in range(500):
+            lane.append(self._make_job(f"bulk{i}", "bulk"))
+        lane.append(self._make_job("other0", "other"))
+        lane.append(self._make_job("other1", "other"))
+
+        served = [lane.popleft().id for _ in range(4)]
+        assert served == ["bulk0", "other0", "bulk1", "other1"]
+
+    def test_fair_lane_respects_weights(self):
+        """A portfolio with weight 3 gets three jobs per one of weight 1."""
+        lane = JobLane(fair=True, weights={"heavy": 3.0})
+        for i in range(30):
+            lane.append(self._make_job(f"heavy{i}", "heavy"))
+            lane.append(self._make_job(f"light{i}", "light"))
+
+        served = [lane.popleft().params["portfolio_id"] for _ in range(20)]
+        assert served.count("heavy") == 15
+        assert served.count("light") == 5
+
+    def test_fair_lane_removal_of_last_job(self):
+        """Cancelling a tenant's only job must not break scheduling."""
+        lane = JobLane(fair=True)
+        lane.append(self._make_job("a0", "a"))
+        lane.append(self._make_job("b0", "b"))
+        lane.remove("a0")
+        lane.append(self._make_job("a1", "a"))
+
+        assert [lane.popleft().id for _ in range(2)] == ["b0", "a1"]
+        assert lane.popleft() is None
+
+    @pytest.mark.asyncio
+    async def test_queue_fair_share_mode(self, tmp_path):
+        """Fair mode applies within a priority level of the queue."""
+        queue = PriorityJobQueue(tmp_path, fair_share=True)
+        for i in range(3):
+            await queue.enqueue(self._make_job(f"bulk{i}", "bulk"))
+        await queue.enqueue(self._make_job("other0", "other"))
+
+        assert [(await queue.dequeue()).id for _ in range(2)] == ["bulk0", "other0"]
+
+
+class TestPreemptionWatchdog:
+    """Tests for interrupting running jobs when higher-priority work arrives."""
+
+    def _make_job(self, id: str, priority: JobPriority) -> Job:
+        return Job(
+            id=id,
+            job_type=JobType.GENERATION,
+            priority=priority,
+            params={},
+            created_at=datetime.utcnow().isoformat(),
+        )
+
+    async def _wait_for(self, condition, timeout: float = 2.0):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while not condition():
+            assert loop.time() < deadline, "timed out"
+            await asyncio.sleep(0.005)
+
+    @pytest.mark.asyncio
+    async def test_critical_preempts_running_low_job(self, tmp_path):
+        """A CRITICAL arrival should interrupt LOW work, which resumes afterwards."""
+        queue = PriorityJobQueue(tmp_path, preempt_check_interval_ms=5)
+        started = []
+        cancelled = []
+        handled = []
+
+        async def processor(job, worker_id):
+            started.append(job.id)
+            if job.id == "low" and started.count("low") == 1:
+                try:
+                    await asyncio.Event().wait()
+                except asyncio.CancelledError:
+                    cancelled.append(job.id)
+                    raise
+
+        async def handler(job, worker_id):
+            handled.append((job.id, worker_id))
+            return {"progress": 40}
+
+        queue.set_processor(processor)
+        queue.set_preempt_handler(handler)
+        await queue.enqueue(self._make_job("low", JobPriority.LOW))
+        await queue.start_worker()
+        await self._wait_for(lambda: started == ["low"])
+
+        await queue.enqueue(self._make_job("crit", JobPriority.CRITICAL))
+        await self._wait_for(lambda: started == ["low", "crit", "low"])
+        await queue.stop_worker()
+
+        assert cancelled == ["low"]
+        assert handled == [("low", 0)]
+        log = [json.loads(line) for line in (tmp_path / "queue.log").read_text().splitlines()]
+        preempt = next(e for e in log if e["op"] == "preempt")
+        assert preempt["job_id"] == "low"
+        assert preempt["state"] == {"progress": 40}
+
+    @pytest.mark.asyncio
+    async def test_one_arrival_preempts_one_worker(self, tmp_path):
+        """With every worker busy on LOW jobs, one CRITICAL preempts only one of them."""
+        queue = PriorityJobQueue(tmp_path, preempt_check_interval_ms=5)
+        started = []
+        handled = []
+
+        async def processor(job, worker_id):
+            started.append(job.id)
+            if job.priority == JobPriority.LOW:
+                await asyncio.Event().wait()
+
+        async def handler(job, worker_id):
+            handled.append(job.id)
+
+        queue.set_processor(processor)
+        queue.set_preempt_handler(handler)
+        await queue.enqueue(self._make_job("low0", JobPriority.LOW))
+        await queue.enqueue(self._make_job("low1", JobPriority.LOW))
+        await queue.start_worker(num_workers=2)
+        await self._wait_for(lambda: len(started) == 2)
+
+        await queue.enqueue(self._make_job("crit", JobPriority.CRITICAL))
+        await self._wait_for(lambda: "crit" in started)
+        await asyncio.sleep(0.05)
+        await queue.stop_worker()
+
+        assert len(handled) == 1
+
+    @pytest.mark.asyncio
+    async def test_pipelined_sibling_preempts_job_ahead_on_backend(self, tmp_path):
+        """With pipeline workers on one backend, a CRITICAL picked up by the idle
+        sibling must still interrupt the LOW prompt it is queued behind."""
+        queue = PriorityJobQueue(tmp_path, preempt_check_interval_ms=5)
+        backend_free = asyncio.Event()
+        started = []
+        handled = []
+
+        async def processor(job, worker_id):
+            started.append(job.id)
+            if job.id == "low" and started.count("low") == 1:
+                await asyncio.Event().wait()
+            elif job.id == "crit":
+                # Queued in the backend behind the LOW prompt
+                await backend_free.wait()
+
+        async def handler(job, worker_id):
+            handled.append((job.id, worker_id))
+            backend_free.set()
+
+        queue.set_processor(processor)
+        queue.set_preempt_handler(handler)
+        await queue.enqueue(self._make_job("low", JobPriority.LOW))
+        await queue.start_worker(num_workers=settings.queue_pipeline_depth, num_backends=1)
+        await self._wait_for(lambda: started == ["low"])
+
+        await queue.enqueue(self._make_job("crit", JobPriority.CRITICAL))
+        await self._wait_for(lambda: started == ["low", "crit", "low"])
+        await asyncio.sleep(0.05)
+        await queue.stop_worker()
+
+        assert handled == [("low", 0)]
+
+    @pytest.mark.asyncio
+    async def test_no_preemption_without_handler(self, tmp_path):
+        """Without a preempt handler, running jobs are never interrupted."""
+        queue = PriorityJobQueue(tmp_path, preempt_check_interval_ms=5)
+        release = asyncio.Event()
+        started = []
+
+        async def processor(job, worker_id):
+            started.append(job.id)
+            if job.id == "low":
+                await release.wait()
+
+        queue.set_processor(processor)
+        await queue.enqueue(self._make_job("low", JobPriority.LOW))
+        await queue.start_worker()
+        await self._wait_for(lambda: started == ["low"])
+        await queue.enqueue(self._make_job("crit", JobPriority.CRITICAL))
+        await asyncio.sleep(0.05)
+        assert started == ["low"]
+
+        release.set()
+        await self._wait_for(lambda: started == ["low", "crit"])
+        await queue.stop_worker()
+
+
+class TestWakeOnEnqueue:
+    """Tests for event-driven job pickup."""
+
+    def _make_job(self, id: str, priority: JobPriority = JobPriority.HIGH) -> Job:
+        return Job(
+            id=id,
+            job_type=JobType.GENERATION,
+            priority=priority,
+            params={},
+            created_at=datetime.utcnow().isoformat(),
+        )
+
+    @pytest.mark.asyncio
+    async def test_get_waits_for_enqueue(self, tmp_path):
+        """get() should block while empty and return the job once enqueued."""
+        queue = PriorityJobQueue(tmp_path)
+        getter = asyncio.create_task(queue.get())
+        await asyncio.sleep(0.02)
+        assert not getter.done()
+
+        await queue.enqueue(self._make_job("job1"))
+        job = await asyncio.wait_for(getter, timeout=1)
+        assert job.id == "job1"
+
+    @pytest.mark.asyncio
+    async def test_idle_worker_does_not_poll(self, tmp_path):
+        """An idle worker should not call dequeue until there is work."""
+        queue = PriorityJobQueue(tmp_path)
+        calls = []
+        dequeue = queue.dequeue
+
+        async def counting_dequeue():
+            calls.append(1)
+            return await dequeue()
+
+        queue.dequeue = counting_dequeue
+        started = asyncio.Event()
+
+        async def processor(job, worker_id):
+            started.set()
+
+        queue.set_processor(processor)
+        await queue.start_worker()
+        await asyncio.sleep(0.3)
+        assert calls == []
+
+        enqueued_at = asyncio.get_running_loop().time()
+        await queue.enqueue(self._make_job("job1"))
+        await asyncio.wait_for(started.wait(), timeout=1)
+        assert asyncio.get_running_loop().time() - enqueued_at < 0.05
+        await queue.stop_worker()
+
+    @pytest.mark.asyncio
+    async def test_critical_enqueue_wakes_watchdog(self, tmp_path):
+        """Preemption should not wait for the fallback check interval."""
+        queue = PriorityJobQueue(tmp_path, preempt_check_interval_ms=10_000)
+        started = []
+
+        async def processor(job, worker_id):
+            started.append(job.id)
+            if job.id == "low" and started.count("low") == 1:
+                await asyncio.Event().wait()
+
+        async def handler(job, worker_id):
+            return None
+
+        queue.set_processor(processor)
+        queue.set_preempt_handler(handler)
+        await queue.enqueue(self._make_job("low", JobPriority.LOW))
+        await queue.start_worker()
+        while not started:
+            await asyncio.sleep(0.005)
+
+        await queue.enqueue(self._make_job("crit", JobPriority.CRITICAL))
+        for _ in range(100):
+            if "crit" in started:
+                break
+            await asyncio.sleep(0.005)
+        await queue.stop_worker()
+        assert "crit" in started
+
+
+class TestStagedProcessor:
+    """Tests for processors that hand their tail off to a finalize stage."""
+
+    def _make_job(self, id: str, priority: JobPriority = JobPriority.HIGH) -> Job:
+        return Job(
+            id=id,
+            job_type=JobType.GENERATION,
+            priority=priority,
+            params={},
+            created_at=datetime.utcnow().isoformat(),
+        )
+
+    def _log_ops(self, tmp_path):
+        lines = (tmp_path / "queue.log").read_text().splitlines()
+        return [(e["op"], e.get("job_id")) for e in map(json.loads, lines)]
+
+    @pytest.mark.asyncio
+    async def test_worker_takes_next_job_during_finalize(self, tmp_path):
+        """The worker is freed at the stage boundary; complete waits for finalize."""
+        queue = PriorityJobQueue(tmp_path)
+        executed = []
+        release = asyncio.Event()
+
+        def processor(job, worker_id):
+            async def stages():
+                executed.append(job.id)
+                yield
+                if job.id == "job1":
+                    await release.wait()
+            return stages()
+
+        queue.set_processor(processor)
+        await queue.enqueue(self._make_job("job1"))
+        await queue.enqueue(self._make_job("job2"))
+        await queue.start_worker()
+
+        for _ in range(200):
+            if ("complete", "job2") in self._log_ops(tmp_path):
+                break
+            await asyncio.sleep(0.005)
+
+        # job2 ran end to end while job1 was still finalizing
+        assert executed == ["job1", "job2"]
+        assert ("complete", "job1") not in self._log_ops(tmp_path)
+        assert await queue.get_current_job(0) is None
+
+        release.set()
+        for _ in range(200):
+            if ("complete", "job1") in self._log_ops(tmp_path):
+                break
+            await asyncio.sleep(0.005)
+        await queue.stop_worker()
+        assert ("complete", "job1") in self._log_ops(tmp_path)
+
+    @pytest.mark.asyncio
+    async def test_finalize_concurrency_applies_backpressure(self, tmp_path):
+        """With every finalize slot busy, the worker stops taking new jobs."""
+        queue = PriorityJobQueue(tmp_path, finalize_concurrency=1)
+        executed = []
+        release = asyncio.Event()
+
+        def processor(job, worker_id):
+            async def stages():
+                executed.append(job.id)
+                yield
+                await release.wait()
+            return stages()
+
+        queue.set_processor(processor)
+        for i in range(3):
+            await queue.enqueue(self._make_job(f"job{i}"))
+        await queue.start_worker()
+        await asyncio.sleep(0.05)
+
+        # job0 holds the only slot; job1 waits for it before job2 can start
+        assert executed == ["job0", "job1"]
+
+        release.set()
+        for _ in range(200):
+            if len(executed) == 3 and queue.size == 0:
+                break
+            await asyncio.sleep(0.005)
+        await queue.stop_worker()
+        assert executed == ["job0", "job1", "job2"]
@@ -0,0 +1,135 @@
+"""Tests for write-behind persistence of streamed chat replies."""
+from contextlib import contextmanager
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.models.chat import Conversation, Message, MessageRole
+from app.services.message_writer import StreamingMessageWriter
+from tests.conftest import TestingSessionLocal
+
+
+@contextmanager
+def session():
+    db = TestingSessionLocal()
+    try:
+        yield db
+        db.commit()
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def conversation(db_session):
+    conversation = Conversation(model="llama3.2:1b")
+    db_session.add(conversation)
+    db_session.commit()
+    return conversation
+
+
+def _stored(db_session, message_id):
+    db_session.expire_all()
+    return db_session.get(Message, message_id)
+
+
+class TestStreamingMessageWriter:
+    """Tests for StreamingMessageWriter."""
+
+    @pytest.mark.asyncio
+    async def test_checkpoints_then_finalizes(self, db_session, conversation):
+        with patch("app.services.message_writer.get_db_session", session):
+            writer = StreamingMessageWriter(conversation.id, checkpoint_interval_ms=0)
+            message_id = await writer.start()
+
+            started = _stored(db_session, message_id)
+            assert started.role == MessageRole.ASSISTANT
+            assert started.content == ""
+            assert started.truncated is True
+
+            writer.append("Hello")
+            await writer._pending
+            assert _stored(db_session, message_id).content == "Hello"
+
+            writer.append(" world")
+            await writer.finish()
+
+        message = _stored(db_session, message_id)
+        assert message.content == "Hello world"
+        assert message.truncated is False
+
+    @pytest.mark.asyncio
+    async def test_no_writes_between_checkpoints(self, db_session, conversation):
+        """Within the interval, chunks are only buffered."""
+        with patch("app.services.message_writer.get_db_session", session):
+            writer = StreamingMessageWriter(conversation.id, checkpoint_interval_ms=60_000)
+            await writer.start()
+            for i in range(500):
+                writer.append(f"{i} ")
+            await writer.finish()
+
+        assert writer.write_count == 2  # insert + final update
+        assert _stored(db_session, writer.message_id).content.startswith("0 1 2 ")
+
+    @pytest.mark.asyncio
+    async def test_truncated_finish_keeps_partial_reply(self, db_session, conversation):
+        with patch("app.services.message_writer.get_db_session", session):
+            writer = StreamingMessageWriter(conversation.id, checkpoint_interval_ms=60_000)
+            await writer.start()
+            writer.append("Partial")
+            await writer.finish(truncated=True)
+
+        message = _stored(db_session, writer.message_id)
+        assert message.content == "Partial"
+        assert message.truncated is True
+
+
+class TestChatEndpointPersistence:
+    """The chat endpoint keeps partial replies when the stream fails."""
+
+    def test_failed_stream_saves_truncated_reply(self, client, db_session, conversation):
+        async def failing_stream(**kwargs):
+            yield "Half an "
+            yield "answer"
+            raise RuntimeError("connection reset")
+
+        with patch("app.services.message_writer.get_db_session", session), \
+                patch("app.api.chat.ollama_manager.is_ready", AsyncMock(return_value=True)), \
+                patch("app.api.chat.ollama_client.chat_stream", failing_stream):
+            response = client.post(
+                f"/api/conversations/{conversation.id}/chat", json={"message": "Hi"}
+            )
+
+        assert response.status_code == 200
+        assert "connection reset" in response.text
+        db_session.expire_all()
+        reply = (
+            db_session.query(Message)
+            .filter(
+                Message.conversation_id == conversation.id,
+                Message.role == MessageRole.ASSISTANT,
+            )
+            .one()
+        )
+        assert reply.content == "Half an answer"
+        assert reply.truncated is True
+
+    def test_stream_failing_before_output_saves_no_reply(self, client, db_session, conversation):
+        async def failing_stream(**kwargs):
+            raise RuntimeError("model not found")
+            yield
+
+        with patch("app.services.message_writer.get_db_session", session), \
+                patch("app.api.chat.ollama_manager.is_ready", AsyncMock(return_value=True)), \
+                patch("app.api.chat.ollama_client.chat_stream", failing_stream):
+            response = client.post(
+                f"/api/conversations/{conversation.id}/chat", json={"message": "Hi"}
+            )
+
+        assert response.status_code == 200
+        assert "model not found" in response.text
+        db_session.expire_all()
+        roles = [
+            m.role for m in
+            db_session.query(Message).filter(Message.conversation_id == conversation.id)
+        ]
+        assert roles == [MessageRole.USER]
@@ -1,3 +1,9 @@
+from app.models.generation import Generation
+from app.models.portfolio import Portfolio
+from app.services.portfolio_service import PortfolioService
+from tests.conftest import recorded_statements
+
+
 
 
 class TestPortfolioAPI:
@@ -90,3 +96,37 @@ class TestPortfolioAPI:
         """Test deleting a non-existent portfolio."""
         response = client.delete("/api/portfolios/non-existent-id")
         assert response.status_code == 404
+
+
+class TestPortfolioImageCounts:
+    """Image counts must come from an aggregate, not by loading generations."""
+
+    def seed(self, db_session, portfolios, images_each):
+        for i in range(portfolios):
+            portfolio = Portfolio(name=f"P{i}")
+            db_session.add(portfolio)
+            db_session.flush()
+            db_session.add_all(
+                Generation(portfolio_id=portfolio.id, prompt="x") for _ in range(images_each)
+            )
+        db_session.add(Portfolio(name="Empty"))
+        db_session.commit()
+        db_session.expunge_all()
+
+    def test_counts(self, db_session):
+        self.seed(db_session, portfolios=2, images_each=3)
+        counts = {p.name: p.image_count for p in PortfolioService(db_session).list_all()}
+        assert counts == {"P0": 3, "P1": 3, "Empty": 0}
+
+    def test_listing_is_one_query(self, db_session):
+        self.seed(db_session, portfolios=20, images_each=5)
+        with recorded_statements() as statements:
+            portfolios = PortfolioService(db_session).list_all()
+        assert len(portfolios) == 21
+        assert len(statements) == 1
+
+    def test_single_portfolio_counts_without_loading(self, db_session):
+        self.seed(db_session, portfolios=1, images_each=4)
+        portfolio = db_session.query(Portfolio).filter(Portfolio.name == "P0").one()
+        assert portfolio.to_dict()["image_count"] == 4
+        assert "generations" not in portfolio.__dict__
@@ -0,0 +1,68 @@
+"""Tests for stopping preempted jobs on ComfyUI."""
+from contextlib import contextmanager
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.models.generation import Generation, GenerationStatus
+from app.models.portfolio import Portfolio
+from app.services.job_queue import Job, JobPriority, JobType
+from app.services.preemption import interrupt_job
+from tests.conftest import TestingSessionLocal
+
+
+@contextmanager
+def session():
+    db = TestingSessionLocal()
+    try:
+        yield db
+        db.commit()
+    finally:
+        db.close()
+
+
+class TestInterruptJob:
+    """Tests for the queue preempt handler."""
+
+    @pytest.mark.asyncio
+    @patch("app.services.preemption.event_bus")
+    async def test_resets_generation_and_interrupts_prompt(self, mock_event_bus, db_session):
+        """The running prompt is removed/interrupted and the generation requeued."""
+        mock_event_bus.publish = AsyncMock()
+        portfolio = Portfolio(name="P")
+        db_session.add(portfolio)
+        db_session.commit()
+        generation = Generation(
+            portfolio_id=portfolio.id,
+            prompt="a cat",
+            generation_type="animate",
+            status=GenerationStatus.PROCESSING,
+            progress=40,
+            comfyui_prompt_id="prompt-1",
+        )
+        db_session.add(generation)
+        db_session.commit()
+
+        client = AsyncMock()
+        job = Job(
+            id=generation.id,
+            job_type=JobType.ANIMATION,
+            priority=JobPriority.LOW,
+            params={"generation_id": generation.id, "portfolio_id": portfolio.id},
+            created_at="2026-01-01T00:00:00",
+        )
+        with patch("app.services.preemption.get_db_session", session):
+            state = await interrupt_job(job, client)
+
+        # Resuming restarts the job, so there is no state to record
+        assert state is None
+        client.cancel_prompt.assert_awaited_once_with("prompt-1")
+
+        db_session.expire_all()
+        generation = db_session.get(Generation, generation.id)
+        assert generation.status == GenerationStatus.PENDING
+        assert generation.progress == 0
+        mock_event_bus.publish.assert_awaited_with(
+            "generation.preempted",
+            {"id": generation.id, "portfolio_id": portfolio.id, "status": "pending"},
+        )
@@ -0,0 +1,86 @@
+"""Tests for throttled generation progress reporting."""
+from contextlib import contextmanager
+
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from app.models.generation import Generation, GenerationStatus
+from app.models.portfolio import Portfolio
+from app.services.progress import ProgressReporter
+
+
+@pytest.fixture
+def generation(db_session):
+    portfolio = Portfolio(name="Test Portfolio")
+    db_session.add(portfolio)
+    db_session.commit()
+    gen = Generation(
+        portfolio_id=portfolio.id,
+        prompt="Test",
+        status=GenerationStatus.PROCESSING,
+    )
+    db_session.add(gen)
+    db_session.commit()
+    db_session.refresh(gen)
+    return gen
+
+
+@pytest.fixture
+def patched_db(db_session):
+    @contextmanager
+    def session():
+        yield db_session
+        db_session.commit()
+
+    with patch("app.services.progress.get_db_session", session):
+        yield db_session
+
+
+class TestProgressReporter:
+    """Tests for ProgressReporter."""
+
+    @pytest.mark.asyncio
+    async def test_writes_progress_and_publishes(self, generation, patched_db):
+        """A progress step should update the row and publish an event."""
+        with patch("app.services.progress.event_bus") as mock_bus:
+            mock_bus.publish = AsyncMock()
+            reporter = ProgressReporter(generation.id, interval_ms=0)
+
+            await reporter(5, 20)
+
+        patched_db.refresh(generation)
+        assert generation.progress == 25
+        event_type, data = mock_bus.publish.await_args.args
+        assert event_type == "generation.progress"
+        assert data["id"] == generation.id
+        assert data["progress"] == 25
+        assert data["step"] == 5
+        assert data["total_steps"] == 20
+
+    @pytest.mark.asyncio
+    async def test_throttles_updates_within_interval(self, generation, patched_db):
+        """Steps inside the interval are dropped, but the final step is always sent."""
+        with patch("app.services.progress.event_bus") as mock_bus:
+            mock_bus.publish = AsyncMock()
+            reporter = ProgressReporter(generation.id, interval_ms=60_000)
+
+            for step in range(1, 21):
+                await reporter(step, 20)
+
+        progresses = [call.args[1]["progress"] for call in mock_bus.publish.await_args_list]
+        assert progresses == [5, 100]
+        patched_db.refresh(generation)
+        assert generation.progress == 100
+
+    @pytest.mark.asyncio
+    async def test_ignores_invalid_and_regressing_steps(self, generation, patched_db):
+        """Zero max and backwards progress should not publish."""
+        with patch("app.services.progress.event_bus") as mock_bus:
+            mock_bus.publish = AsyncMock()
+            reporter = ProgressReporter(generation.id, interval_ms=0)
+
+            await reporter(0, 0)
+            await reporter(10, 20)
+            await reporter(4, 20)
+
+        assert mock_bus.publish.await_count == 1
@@ -2,6 +2,10 @@ import axios from 'axios'
 import type {
   Portfolio,
   Generation,
+  GenerationCounts,
+  GenerationFilters,
+  GenerationNeighbors,
+  GenerationPage,
   GenerationParams,
   ModelInfo,
   WorkflowTemplate,
@@ -47,10 +51,41 @@ export const portfolioApi = {
 }
 
 // Generation API
+const generationParams = (filters: GenerationFilters) => ({
+  portfolio_id: filters.portfolioId,
+  status: filters.status,
+  generation_type: filters.generationType,
+  model: filters.model,
+  created_after: filters.createdAfter,
+  created_before: filters.createdBefore,
+  source_generation_id: filters.sourceGenerationId,
+})
+
+// Repeat list params (status=a&status=b), which is what FastAPI expects
+const repeatListParams = { indexes: null }
+
 export const generationApi = {
-  list: async (portfolioId?: string): Promise<Generation[]> => {
-    const params = portfolioId ? { portfolio_id: portfolioId } : {}
-    const response = await api.get('/generations', { params })
+  list: async (filters: GenerationFilters = {}, cursor?: string): Promise<GenerationPage> => {
+    const response = await api.get('/generations', {
+      params: { ...generationParams(filters), cursor },
+      paramsSerializer: repeatListParams,
+    })
+    return response.data
+  },
+
+  counts: async (filters: GenerationFilters = {}): Promise<GenerationCounts> => {
+    const response = await api.get('/generations/counts', {
+      params: generationParams(filters),
+      paramsSerializer: repeatListParams,
+    })
+    return response.data
+  },
+
+  neighbors: async (id: string, status?: Generation['status'][]): Promise<GenerationNeighbors> => {
+    const response = await api.get(`/generations/${id}/neighbors`, {
+      params: { status },
+      paramsSerializer: repeatListParams,
+    })
     return response.data
   },
 
@@ -1,4 +1,4 @@
-import { useState, useRef, useCallback, useEffect, useMemo } from 'react'
+import { useState, useRef, useCallback, useEffect } from 'react'
 import { useNavigate } from 'react-router-dom'
 import { useQueryClient } from '@tanstack/react-query'
 import CloseIcon from '@mui/icons-material/Close'
@@ -13,7 +13,13 @@ import MovieIcon from '@mui/icons-material/Movie'
 import InfoOutlinedIcon from '@mui/icons-material/InfoOutlined'
 import { TransformViewport, ImageToolbar, ViewportPanel, Input, Spinner } from '../ui'
 import type { TransformViewportHandle } from '../ui'
-import { useGeneration, useGenerations, useDeleteGeneration, useCreateGeneration } from '../../hooks/useGenerations'
+import {
+  useGeneration,
+  useGenerations,
+  useGenerationNeighbors,
+  useDeleteGeneration,
+  useCreateGeneration,
+} from '../../hooks/useGenerations'
 import { useGenerationStore } from '../../stores/generationStore'
 import { getVideoUrl } from '../../api/client'
 import type { GenerationParams } from '../../types'
@@ -39,47 +45,31 @@ export default function ImageViewer({ generationId, onClose }: ImageViewerProps)
   const createGeneration = useCreateGeneration()
   const loadFromGeneration = useGenerationStore((state) => state.loadFromGeneration)
 
-  // Get all generations for navigation
-  const { data: allGenerations } = useGenerations(generation?.portfolio_id)
+  // Adjacent completed images, looked up by ID so navigation works however
+  // far back in the portfolio the image is
+  const { data: neighbors } = useGenerationNeighbors(generationId, ['completed'])
+  const hasNeighbors = !!(neighbors?.previous || neighbors?.next)
 
-  // Calculate navigation indices - only show completed images
-  const completedGenerations = useMemo(
-    () => allGenerations?.filter(g => g.status === 'completed') || [],
-    [allGenerations]
-  )
-  const currentIndex = completedGenerations.findIndex(g => g.id === generationId)
-  const totalImages = completedGenerations.length
-
-  // Find derived generations (children that use this image as source)
-  const derivedGenerations = useMemo(
-    () => allGenerations?.filter(g =>
-      g.source_generation_id === generationId &&
-      g.status === 'completed'
-    ) || [],
-    [allGenerations, generationId]
-  )
+  // Derived generations (children that use this image as source)
+  const { data: derivedGenerations = [] } = useGenerations(undefined, {
+    sourceGenerationId: generationId,
+    status: ['completed'],
+  })
 
-  // Find source generation if this is a derived generation
-  const sourceGeneration = useMemo(
-    () => generation?.source_generation_id
-      ? allGenerations?.find(g => g.id === generation.source_generation_id)
-      : null,
-    [allGenerations, generation?.source_generation_id]
-  )
+  // Source generation if this is a derived generation
+  const { data: sourceGeneration } = useGeneration(generation?.source_generation_id ?? '')
 
   const handlePrev = useCallback(() => {
-    if (currentIndex > 0 && generation) {
-      const prevGeneration = completedGenerations[currentIndex - 1]
-      navigate(`/portfolio/${generation.portfolio_id}/image/${prevGeneration.id}`, { replace: true })
+    if (neighbors?.previous && generation) {
+      navigate(`/portfolio/${generation.portfolio_id}/image/${neighbors.previous.id}`, { replace: true })
     }
-  }, [currentIndex, completedGenerations, generation, navigate])
+  }, [neighbors, generation, navigate])
 
   const handleNext = useCallback(() => {
-    if (currentIndex < totalImages - 1 && generation) {
-      const nextGeneration = completedGenerations[currentIndex + 1]
-      navigate(`/portfolio/${generation.portfolio_id}/image/${nextGeneration.id}`, { replace: true })
+    if (neighbors?.next && generation) {
+      navigate(`/portfolio/${generation.portfolio_id}/image/${neighbors.next.id}`, { replace: true })
     }
-  }, [currentIndex, totalImages, completedGenerations, generation, navigate])
+  }, [neighbors, generation, navigate])
 
   const viewportRef = useRef<TransformViewportHandle>(null)
   const [activePanel, setActivePanel] = useState<ActivePanel>('none')
@@ -409,11 +399,9 @@ export default function ImageViewer({ generationId, onClose }: ImageViewerProps)
             contentHeight={generation.height}
             className="w-full h-full"
             showZoomControls
-            showNavigation={totalImages > 1}
+            showNavigation={hasNeighbors}
             onPrev={handlePrev}
             onNext={handleNext}
-            currentIndex={currentIndex}
-            totalItems={totalImages}
             maskMode={activePanel === 'inpaint'}
             brushSize={brushSize}
             onMaskChange={setHasMask}
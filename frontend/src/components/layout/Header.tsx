@@ -1,14 +1,15 @@
 import { Link } from 'react-router-dom'
 import { useUIStore } from '../../stores/uiStore'
-import { useGenerations } from '../../hooks/useGenerations'
+import { useGenerationCounts } from '../../hooks/useGenerations'
 import { ThemeToggle, QueueIndicator } from '../ui'
 
 export default function Header() {
  const toggleSidebar = useUIStore((state) => state.toggleSidebar)
- const { data: generations } = useGenerations()
+ // Only the active jobs, counted server-side
+ const { data: counts } = useGenerationCounts({ status: ['pending', 'processing'] })
 
- const pendingCount = generations?.filter((g) => g.status === 'pending').length ?? 0
- const processingCount = generations?.filter((g) => g.status === 'processing').length ?? 0
+ const pendingCount = counts?.by_status.pending ?? 0
+ const processingCount = counts?.by_status.processing ?? 0
 
  return (
   <header className="h-14 bg-white dark:bg-neutral-800 border-b border-neutral-200 dark:border-neutral-700 flex items-center px-4 shrink-0">
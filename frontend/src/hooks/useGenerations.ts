@@ -1,11 +1,33 @@
-import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query'
+import { useQuery, useInfiniteQuery, useMutation, useQueryClient } from '@tanstack/react-query'
 import { generationApi } from '../api/client'
-import type { GenerationParams } from '../types'
+import type { Generation, GenerationFilters, GenerationParams } from '../types'
 
-export function useGenerations(portfolioId?: string) {
+// Pages of generations, newest first; `data` is the loaded pages flattened.
+// Call fetchNextPage (while hasNextPage) to load older ones.
+export function useGenerations(portfolioId?: string, filters: Omit<GenerationFilters, 'portfolioId'> = {}) {
+  return useInfiniteQuery({
+    queryKey: ['generations', { portfolioId, ...filters }],
+    queryFn: ({ pageParam }) => generationApi.list({ ...filters, portfolioId }, pageParam),
+    initialPageParam: undefined as string | undefined,
+    getNextPageParam: (lastPage) => lastPage.next_cursor ?? undefined,
+    select: (data) => data.pages.flatMap((page) => page.items),
+  })
+}
+
+// Per-status totals for the filters, without loading any pages
+export function useGenerationCounts(filters: GenerationFilters = {}) {
+  return useQuery({
+    queryKey: ['generations', 'counts', filters],
+    queryFn: () => generationApi.counts(filters),
+  })
+}
+
+// The images either side of one in its portfolio (newest first)
+export function useGenerationNeighbors(id: string, status?: Generation['status'][]) {
   return useQuery({
-    queryKey: ['generations', { portfolioId }],
-    queryFn: () => generationApi.list(portfolioId),
+    queryKey: ['generations', 'neighbors', id, status],
+    queryFn: () => generationApi.neighbors(id, status),
+    enabled: !!id,
   })
 }
 
@@ -1,5 +1,6 @@
 import { useEffect, useRef, useCallback } from 'react'
-import { useQueryClient } from '@tanstack/react-query'
+import { useQueryClient, type InfiniteData } from '@tanstack/react-query'
+import type { Generation, GenerationPage } from '../types'
 
 interface SSEEvent {
   type: string
@@ -9,10 +10,12 @@ interface SSEEvent {
 interface UseSSEOptions {
   onEvent?: (event: SSEEvent) => void
   enabled?: boolean
+  // Only receive events for this portfolio
+  portfolioId?: string
 }
 
 export function useSSE(options: UseSSEOptions = {}) {
-  const { onEvent, enabled = true } = options
+  const { onEvent, enabled = true, portfolioId } = options
   const queryClient = useQueryClient()
   const eventSourceRef = useRef<EventSource | null>(null)
 
@@ -25,8 +28,24 @@ export function useSSE(options: UseSSEOptions = {}) {
           data,
         }
 
-        // Invalidate relevant queries based on event type
-        if (event.type.startsWith('generation.')) {
+        // Progress events patch cached generations in place (no refetch)
+        if (event.type === 'generation.progress' && data.id) {
+          const applyProgress = (g: Generation): Generation =>
+            g.id === data.id ? { ...g, status: 'processing', progress: data.progress } : g
+          queryClient.setQueriesData<InfiniteData<GenerationPage>>(
+            { queryKey: ['generations'] },
+            (old) =>
+              // Counts and neighbours share the key prefix but aren't pages
+              old?.pages && {
+                ...old,
+                pages: old.pages.map((page) => ({ ...page, items: page.items.map(applyProgress) })),
+              }
+          )
+          queryClient.setQueryData<Generation>(['generation', data.id], (old) =>
+            old ? applyProgress(old) : old
+          )
+        } else if (event.type.startsWith('generation.')) {
+          // Invalidate relevant queries based on event type
           queryClient.invalidateQueries({ queryKey: ['generations'] })
           if (data.id) {
             queryClient.invalidateQueries({ queryKey: ['generation', data.id] })
@@ -37,6 +56,13 @@ export function useSSE(options: UseSSEOptions = {}) {
           queryClient.invalidateQueries({ queryKey: ['portfolios'] })
         }
 
+        // Events were dropped for this connection; refetch instead
+        if (event.type === 'resync') {
+          queryClient.invalidateQueries({ queryKey: ['generations'] })
+          queryClient.invalidateQueries({ queryKey: ['generation'] })
+          queryClient.invalidateQueries({ queryKey: ['portfolios'] })
+        }
+
         onEvent?.(sseEvent)
       } catch (e) {
         console.error('Failed to parse SSE event:', e)
@@ -48,7 +74,10 @@ export function useSSE(options: UseSSEOptions = {}) {
   useEffect(() => {
     if (!enabled) return
 
-    const eventSource = new EventSource('/api/events/stream')
+    const url = portfolioId
+      ? `/api/events/stream?portfolio_id=${encodeURIComponent(portfolioId)}`
+      : '/api/events/stream'
+    const eventSource = new EventSource(url)
     eventSourceRef.current = eventSource
 
     eventSource.onopen = () => {
@@ -66,8 +95,11 @@ export function useSSE(options: UseSSEOptions = {}) {
       'ping',
       'generation.created',
       'generation.processing',
+      'generation.progress',
       'generation.completed',
       'generation.failed',
+      'generation.preempted',
+      'resync',
     ]
 
     eventTypes.forEach((type) => {
@@ -81,7 +113,7 @@ export function useSSE(options: UseSSEOptions = {}) {
       eventSource.close()
       eventSourceRef.current = null
     }
-  }, [enabled, handleEvent])
+  }, [enabled, portfolioId, handleEvent])
 
   return {
     isConnected: eventSourceRef.current?.readyState === EventSource.OPEN,
@@ -1,6 +1,6 @@
 import { Link } from 'react-router-dom'
 import { useGenerations } from '../hooks/useGenerations'
-import { Spinner } from '../components/ui'
+import { Button, Spinner } from '../components/ui'
 import type { Generation, GenerationType } from '../types'
 
 function StatusBadge({ status }: { status: Generation['status'] }) {
@@ -40,7 +40,14 @@ function TypeBadge({ type }: { type: GenerationType | undefined }) {
 }
 
 export default function HistoryPage() {
- const { data: generations, isLoading: generationsLoading, error: generationsError } = useGenerations()
+ const {
+  data: generations,
+  isLoading: generationsLoading,
+  error: generationsError,
+  hasNextPage,
+  fetchNextPage,
+  isFetchingNextPage,
+ } = useGenerations()
 
  if (generationsLoading) {
   return (
@@ -168,6 +175,14 @@ export default function HistoryPage() {
      ))}
     </div>
    )}
+
+   {hasNextPage && (
+    <div className="flex justify-center mt-6">
+     <Button variant="outline" onClick={() => fetchNextPage()} loading={isFetchingNextPage}>
+      Load more
+     </Button>
+    </div>
+   )}
   </div>
  )
 }
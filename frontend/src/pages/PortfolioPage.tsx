@@ -10,7 +10,13 @@ export default function PortfolioPage() {
  const { id, imageId } = useParams<{ id: string; imageId?: string }>()
  const navigate = useNavigate()
  const { data: portfolio, isLoading: portfolioLoading } = usePortfolio(id!)
- const { data: generations, isLoading: generationsLoading } = useGenerations(id)
+ const {
+  data: generations,
+  isLoading: generationsLoading,
+  hasNextPage,
+  fetchNextPage,
+  isFetchingNextPage,
+ } = useGenerations(id)
  const deletePortfolio = useDeletePortfolio()
  const deleteGeneration = useDeleteGeneration()
  const updatePortfolio = useUpdatePortfolio()
@@ -191,13 +197,22 @@ export default function PortfolioPage() {
      </Link>
     </div>
    ) : (
-    <ImageGrid
-     generations={generations ?? []}
-     onImageClick={handleImageClick}
-     onImageDelete={handleImageDelete}
-     onSetCover={handleSetCover}
-     coverImageId={portfolio.cover_image_id}
-    />
+    <>
+     <ImageGrid
+      generations={generations ?? []}
+      onImageClick={handleImageClick}
+      onImageDelete={handleImageDelete}
+      onSetCover={handleSetCover}
+      coverImageId={portfolio.cover_image_id}
+     />
+     {hasNextPage && (
+      <div className="flex justify-center mt-6">
+       <Button variant="outline" onClick={() => fetchNextPage()} loading={isFetchingNextPage}>
+        Load more
+       </Button>
+      </div>
+     )}
+    </>
    )}
   </div>
  )
@@ -19,6 +19,7 @@ export interface Generation {
   width: number
   height: number
   seed: number | null
+  batch_index: number | null
   steps: number
   cfg_scale: number
   sampler: string
@@ -57,6 +58,34 @@ export interface Generation {
   completed_at: string | null
 }
 
+// One page of GET /generations (newest first)
+export interface GenerationPage {
+  items: Generation[]
+  next_cursor: string | null
+}
+
+export interface GenerationFilters {
+  portfolioId?: string
+  status?: Generation['status'][]
+  generationType?: GenerationType[]
+  model?: string
+  createdAfter?: string
+  createdBefore?: string
+  sourceGenerationId?: string
+}
+
+// GET /generations/counts: how many generations match the filters
+export interface GenerationCounts {
+  total: number
+  by_status: Partial<Record<Generation['status'], number>>
+}
+
+// GET /generations/{id}/neighbors: the images either side in listing order
+export interface GenerationNeighbors {
+  previous: Generation | null
+  next: Generation | null
+}
+
 export interface GenerationParams {
   portfolio_id: string
   prompt: string
@@ -135,6 +164,7 @@ export interface Message {
   conversation_id: string
   role: MessageRole
   content: string
+  truncated: boolean
   created_at: string
 }
 
@@ -159,8 +189,19 @@ export interface ChatStatus {
   progress_status: string | null
 }
 
+export interface ChatTimings {
+  prompt_tokens: number
+  prompt_eval_ms: number
+  completion_tokens: number
+  eval_ms: number
+  load_ms: number
+  total_ms: number
+  tokens_per_second: number | null
+}
+
 export interface ChatStreamChunk {
   content: string
   done: boolean
   error?: string
+  timings?: ChatTimings
 }